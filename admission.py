@@ -0,0 +1,133 @@
+import threading
+import time
+
+# =============================================================================
+# Coalescing and admission control for synchronous solves
+# =============================================================================
+# A shared dashboard link sends many identical /run-model requests at once.
+# SingleFlight lets the first of them run the solve while the rest wait for
+# its result, and Admission bounds how many solves run at the same time, in
+# total and per client, so a burst gets fast 429/503 answers instead of a
+# growing pile of busy server threads.
+
+
+class Rejected(Exception):
+    """A solve not admitted; status is 429 (client over its limit) or 503 (server busy)."""
+
+    def __init__(self, message, status, retry_after=1):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Run fn once per key among concurrent callers; the others share its outcome.
+
+    Only calls overlapping in time are coalesced: the key is forgotten as
+    soon as the leading call finishes. An exception raised by the leader is
+    raised to every waiter too, except those listed in retry: then the
+    waiters try again, and one of them leads a fresh call of its own fn.
+    """
+
+    def __init__(self, retry=(Rejected,)):
+        self.retry = retry
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """Return (result, shared); shared is True when another caller's solve was reused."""
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                else:
+                    call.waiters += 1
+            if leader:
+                break
+            call.done.wait()
+            if isinstance(call.error, self.retry):
+                continue
+            with self._lock:
+                self.coalesced += 1
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": len(self._calls), "coalesced": self.coalesced}
+
+
+class Admission:
+    """At most limit solves at once, and at most per_client of them for one client.
+
+    acquire(client) waits up to wait seconds for a free global slot before
+    raising Rejected (503); a client already holding per_client slots is
+    rejected at once (429). A limit of 0 disables that check.
+    """
+
+    def __init__(self, limit=4, per_client=2, wait=0.1):
+        self.limit = limit
+        self.per_client = per_client
+        self.wait = wait
+        self._running = 0
+        self._clients = {}
+        self._cond = threading.Condition()
+        self.rejected = {"client": 0, "busy": 0}
+
+    def acquire(self, client):
+        with self._cond:
+            if self.per_client and self._clients.get(client, 0) >= self.per_client:
+                self.rejected["client"] += 1
+                raise Rejected(f"Too many concurrent solves for this client (limit {self.per_client})", 429)
+            deadline = time.monotonic() + self.wait
+            while self.limit and self._running >= self.limit:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.rejected["busy"] += 1
+                    raise Rejected(f"Server busy ({self.limit} solves running)", 503)
+                self._cond.wait(remaining)
+            self._running += 1
+            self._clients[client] = self._clients.get(client, 0) + 1
+
+    def release(self, client):
+        with self._cond:
+            self._running -= 1
+            if self._clients[client] <= 1:
+                del self._clients[client]
+            else:
+                self._clients[client] -= 1
+            self._cond.notify()
+
+    def run(self, client, fn, *args, **kwargs):
+        """fn(*args, **kwargs) inside a slot held for client."""
+        self.acquire(client)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.release(client)
+
+    def stats(self):
+        with self._cond:
+            return {"running": self._running, "clients": len(self._clients), "rejected": dict(self.rejected)}
@@ -0,0 +1,237 @@
+import numpy as np
+
+# =============================================================================
+# Closed-form solver for the underground well model (no Gurobi needed)
+# =============================================================================
+# Once the depth D is fixed, every cooling period t is independent:
+#
+#   K_well * (B_t * Q_t + alpha * z_t) >= IT_Load_t
+#
+# with z_t inside the McCormick envelope of Q_t * D. Maximising z_t over the
+# envelope leaves two linear conditions on Q_t:
+#
+#   a_t * Q_t >= r_t                                  (z_t <= D_max * Q_t)
+#   s_t * Q_t >= r_t - alpha * Q_max * (D - D_min)    (z_t <= Q_max*D + D_min*Q_t - Q_max*D_min)
+#
+# where r_t = IT_Load_t / K_well, a_t = B_t + alpha*D_max, s_t = B_t + alpha*D_min.
+# Each period's cost is w_t(D) * Q_t with w_t linear in D, so the cheapest
+# flow rate is the lowest (or highest, if w_t < 0) feasible Q_t: a piecewise
+# linear function of D. The total cost is therefore piecewise quadratic in D
+# and is minimised exactly by sweeping its breakpoints.
+
+# Rows are solved in chunks to bound the size of the (rows, cells, pieces) arrays
+CHUNK_CELLS = 1 << 18
+_FEAS_TOL = 1e-9
+
+
+def _lines(r, a, s, alpha_qmax, d_min, q_max):
+    # Bounds on Q as lines p + q*D; lower bounds use -inf and upper bounds +inf
+    # where a constraint does not bind in that direction.
+    a = np.where(a == 0.0, 1e-12, a)
+    s = np.where(s == 0.0, 1e-12, s)
+    zero = np.zeros_like(r)
+    pa = r / a
+    pb = (r + alpha_qmax * d_min) / s
+    qb = -alpha_qmax / s
+    inf = np.full_like(r, np.inf)
+    lower = (
+        np.stack([zero, np.where(a > 0, pa, -inf), np.where(s > 0, pb, -inf)], axis=-1),
+        np.stack([zero, zero, np.where(s > 0, qb, 0.0)], axis=-1),
+    )
+    upper = (
+        np.stack([q_max + zero, np.where(a < 0, pa, inf), np.where(s < 0, pb, inf)], axis=-1),
+        np.stack([zero, zero, np.where(s < 0, qb, 0.0)], axis=-1),
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        breakpoints = np.stack([
+            (zero - pb) / qb,
+            (q_max - pb) / qb,
+            (pa - pb) / qb,
+        ], axis=-1)
+    return lower, upper, breakpoints
+
+
+def _active(lines, depth, pick):
+    # Value and (p, q) of the binding line at each depth
+    p, q = lines
+    values = p + q * depth[..., None]
+    idx = pick(values, axis=-1)[..., None]
+    return (np.take_along_axis(values, idx, -1)[..., 0],
+            np.take_along_axis(p, idx, -1)[..., 0],
+            np.take_along_axis(q, idx, -1)[..., 0])
+
+
+def _flow_at(lower, upper, w0, w1, depth):
+    lo, lo_p, lo_q = _active(lower, depth, np.argmax)
+    hi, hi_p, hi_q = _active(upper, depth, np.argmin)
+    feasible = lo <= hi + _FEAS_TOL * (1.0 + np.abs(hi))
+    use_lo = (w0 + w1 * depth) >= 0.0
+    return (np.where(use_lo, lo, hi), np.where(use_lo, lo_p, hi_p),
+            np.where(use_lo, lo_q, hi_q), feasible)
+
+
+def _pieces(r, a, s, w0, w1, alpha_qmax, q_max, d_min, d_max):
+    """Cost of every cell as a piecewise quadratic in D.
+
+    Returns the start depth of each piece (rows, cells*pieces) and the change
+    it makes to (c0, c1, c2, infeasible count) of the row total, so summing
+    the deltas of all pieces starting at or below D gives the total at D.
+    Pieces of disjoint blocks of cells can be built apart and concatenated.
+    """
+    n, m = r.shape
+    lower, upper, bp = _lines(r, a, s, alpha_qmax, d_min[:, None], q_max)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        w_root = np.where(w1 != 0.0, -w0 / w1, np.nan)
+    bp = np.concatenate([bp, w_root[..., None]], axis=-1)
+    lo_d = d_min[:, None, None]
+    hi_d = d_max[:, None, None]
+    bp = np.clip(np.nan_to_num(bp, nan=np.inf, posinf=np.inf, neginf=-np.inf), lo_d, hi_d)
+    bp.sort(axis=-1)
+
+    # Piece j of each cell runs from edges[j] to edges[j+1]
+    edges = np.concatenate([np.broadcast_to(lo_d, (n, m, 1)), bp], axis=-1)
+    ends = np.concatenate([bp, np.broadcast_to(hi_d, (n, m, 1))], axis=-1)
+    mid = 0.5 * (edges + ends)
+
+    pieces = edges.shape[-1]
+    lower_p = tuple(np.repeat(x[:, :, None, :], pieces, axis=2) for x in lower)
+    upper_p = tuple(np.repeat(x[:, :, None, :], pieces, axis=2) for x in upper)
+    w0_p = w0[..., None]
+    w1_p = w1[..., None]
+    _, u, v, feasible = _flow_at(lower_p, upper_p, w0_p, w1_p, mid)
+
+    # Cost of each piece as c0 + c1*D + c2*D^2 plus an infeasibility count
+    coef = np.stack([
+        np.where(feasible, w0_p * u, 0.0),
+        np.where(feasible, w0_p * v + w1_p * u, 0.0),
+        np.where(feasible, w1_p * v, 0.0),
+        (~feasible).astype(float),
+    ], axis=-1)
+    delta = np.diff(coef, axis=2, prepend=0.0)
+    return edges.reshape(n, m * pieces), delta.reshape(n, m * pieces, 4)
+
+
+def _sweep(pos, delta, d_min, d_max, depth_cost):
+    # Sweep all cell pieces of a row in depth order; returns depth and feasibility
+    n = pos.shape[0]
+    order = np.argsort(pos, axis=1, kind="stable")
+    pos = np.take_along_axis(pos, order, axis=1)
+    acc = np.cumsum(np.take_along_axis(delta, order[..., None], axis=1), axis=1)
+    nxt = np.concatenate([pos[:, 1:], d_max[:, None]], axis=1)
+
+    c0, c1, c2, bad = (acc[..., k] for k in range(4))
+    c1 = c1 + depth_cost[:, None]
+    usable = (nxt > pos) & (bad < 0.5)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vertex = np.where(c2 > 0, -c1 / (2.0 * c2), pos)
+    vertex = np.clip(vertex, pos, nxt)
+    cand = np.stack([pos, nxt, vertex], axis=-1)
+    cost = c0[..., None] + c1[..., None] * cand + c2[..., None] * cand ** 2
+    cost = np.where(usable[..., None], cost, np.inf).reshape(n, -1)
+    best = np.argmin(cost, axis=1)
+    depth = cand.reshape(n, -1)[np.arange(n), best]
+    feasible_row = np.isfinite(cost[np.arange(n), best])
+    # A model with a single feasible depth has no positive-length interval
+    return np.where(feasible_row, depth, d_min), feasible_row
+
+
+def flows_at(r, a, s, w0, w1, alpha_qmax, q_max, d_min, depth):
+    """Cheapest flow rates (rows, cells) and per-cell feasibility at given depths (rows,)."""
+    n, m = r.shape
+    lower, upper, _ = _lines(r, a, s, alpha_qmax, d_min[:, None], q_max)
+    flow, _, _, ok = _flow_at(lower, upper, w0, w1, np.broadcast_to(depth[:, None], (n, m)))
+    return flow, ok
+
+
+def _solve_chunk(r, a, s, w0, w1, alpha_qmax, q_max, d_min, d_max, const, depth_cost):
+    pos, delta = _pieces(r, a, s, w0, w1, alpha_qmax, q_max, d_min, d_max)
+    depth, feasible_row = _sweep(pos, delta, d_min, d_max, depth_cost)
+
+    # Re-evaluate the flow rates and cost exactly at the chosen depth
+    flow, cell_ok = flows_at(r, a, s, w0, w1, alpha_qmax, q_max, d_min, depth)
+    feasible_row &= cell_ok.all(axis=1)
+    total = (np.sum((w0 + w1 * depth[:, None]) * flow, axis=1) + const + depth_cost * depth)
+    return depth, flow, total, feasible_row
+
+
+def solve_depth(r, a, s, w0, w1, alpha_qmax, q_max, d_min, d_max, const=0.0, depth_cost=0.0):
+    """Minimise sum_t (w0 + w1*D) * Q_t + const + depth_cost*D over D and Q.
+
+    Cell arrays (r, a, s, w0, w1) have shape (rows, cells); the remaining
+    arguments are per row and broadcast to (rows,). Returns depth (rows,),
+    flow (rows, cells), total cost (rows,) and a feasibility mask (rows,).
+    """
+    r = np.atleast_2d(np.asarray(r, dtype=float))
+    n, m = r.shape
+    cells = [np.broadcast_to(np.asarray(x, dtype=float), (n, m)) for x in (a, s, w0, w1)]
+    rows = [np.broadcast_to(np.asarray(x, dtype=float), (n,)).copy()
+            for x in (alpha_qmax, q_max, d_min, d_max, const, depth_cost)]
+
+    depth = np.empty(n)
+    flow = np.empty((n, m))
+    total = np.empty(n)
+    feasible = np.empty(n, dtype=bool)
+    step = max(1, CHUNK_CELLS // max(m, 1))
+    for lo in range(0, n, step):
+        sl = slice(lo, lo + step)
+        alpha_qmax_c, q_max_c, d_min_c, d_max_c, const_c, depth_cost_c = (x[sl] for x in rows)
+        depth[sl], flow[sl], total[sl], feasible[sl] = _solve_chunk(
+            r[sl], *(x[sl] for x in cells),
+            alpha_qmax_c[:, None], q_max_c[:, None], d_min_c, d_max_c, const_c, depth_cost_c,
+        )
+    return depth, flow, total, feasible
+
+
+def well_terms(it_load, T_surface, cost_energy, cost_water, leakage_rate, constants, depth_cap=None):
+    """The closed-form terms of the well model.
+
+    Returns the cell arrays (r, a, s, w0, w1), each (rows, periods), and the
+    per-row (alpha_qmax, q_max, d_min, d_max, const), each (rows,). Inputs
+    are as for solve_well.
+    """
+    it_load = np.atleast_2d(np.asarray(it_load, dtype=float))
+    n, m = it_load.shape
+
+    def row(x):
+        x = np.asarray(x, dtype=float)
+        return x.reshape(-1, 1) if x.ndim == 1 else x
+
+    alpha = row(constants["alpha"])
+    K_well = row(constants["K_well"])
+    Q_max = row(constants["Q_max"])
+    D_min = row(constants["D_min"])
+    D_max = row(constants["D_max"])
+    Delta_t = row(constants["Delta_t"])
+    k_energy = row(constants["g"]) * row(constants["rho"]) * Delta_t / (1000 * row(constants["eta"]))
+    cost_energy = row(cost_energy)
+    cost_water = row(cost_water)
+    leakage_rate = row(leakage_rate)
+
+    B = row(constants["T_dc_target"]) - row(T_surface)
+    r = it_load / K_well
+    a = B + alpha * D_max + np.zeros_like(r)
+    s = B + alpha * D_min + np.zeros_like(r)
+    w0 = cost_water * leakage_rate * Delta_t + np.zeros_like(r)
+    w1 = cost_energy * k_energy + np.zeros_like(r)
+    const = (cost_water * row(constants["V_initial"])).reshape(-1)
+
+    def per_row(x):
+        return np.broadcast_to(np.asarray(x, dtype=float).reshape(-1), (n,))
+
+    d_max = D_max if depth_cap is None else np.minimum(D_max, row(depth_cap))
+    return ((r, a, s, w0, w1),
+            (per_row(alpha * Q_max), per_row(Q_max), per_row(D_min), per_row(d_max), per_row(const)))
+
+
+def solve_well(it_load, T_surface, cost_energy, cost_water, leakage_rate, constants,
+               depth_cost=0.0, depth_cap=None):
+    """Vectorised equivalent of the Gurobi well model.
+
+    it_load has shape (rows, periods) (or (periods,) for a single site). The
+    other inputs, including the values of the MODEL_CONSTANTS-style mapping
+    constants, are scalars, 1-D per-row arrays or 2-D (rows, periods) arrays.
+    depth_cap limits the depth searched without changing D_max (which also
+    shapes the McCormick envelope).
+    """
+    cells, rows = well_terms(it_load, T_surface, cost_energy, cost_water, leakage_rate, constants, depth_cap)
+    return solve_depth(*cells, *rows, depth_cost=depth_cost)
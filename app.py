@@ -1,8 +1,135 @@
-from flask import Flask, render_template, request, jsonify
-from model import run_model
+import atexit
+import json
+import math
+
+from flask import Flask, Response, render_template, request, jsonify
+from admission import Admission, Rejected, SingleFlight
+import baseline
+from model import CLIENT_FIELDS, MODEL_CONSTANTS, batch_rows, run_model, run_model_batch, on_constants_changed, set_surrogate
+from cache import ResultCache, canonical_key
+from controller import FlowController
+from detect import Detectors, MassBalance
+from graph import Memo
+from jobs import JobQueue, QueueFull
+import metrics
+import responses
+from metrics import phase
+from portfolio import optimise_portfolio
+from solvers import BackendUnavailable, available_backends
+from stochastic import run_stochastic
+from surrogate import Table
+from sweep import iter_sweep, run_sweep, to_jsonable, SWEEP_OUTPUTS
+from telemetry import TelemetryHub, parse_readings
+from timeseries import SeriesStore, parse_levels
+from uncertainty import iter_uncertainty, run_uncertainty
+from history import MATCH_FILTERS, RANGE_FILTERS, RunStore
+import config
 
 app = Flask(__name__)
 
+# Parse the baseline datasets once at startup rather than per request
+baseline.store.load_all()
+
+# Precomputed answers for flat monthly queries (built with surrogate.py)
+surrogate_table = Table(config.SURROGATE_TABLE, config.SURROGATE_RTOL) if config.SURROGATE_TABLE else None
+set_surrogate(surrogate_table)
+
+result_cache = ResultCache(maxsize=config.CACHE_SIZE, ttl=config.CACHE_TTL)
+# Cached results are stale once alpha, K_well, Q_max etc. change
+on_constants_changed(result_cache.invalidate)
+
+# Stage results of each dashboard session, so what-if edits only recompute
+# the stages that depend on the edited fields
+session_memos = ResultCache(maxsize=config.SESSION_MAX, ttl=config.SESSION_TTL)
+
+# Identical concurrent /run-model requests share one solve, and synchronous
+# solves are bounded in total and per client (429/503 beyond the limits)
+in_flight = SingleFlight()
+admission = Admission(limit=config.SOLVE_CONCURRENCY, per_client=config.SOLVE_PER_CLIENT,
+                      wait=config.SOLVE_QUEUE_WAIT)
+
+job_queue = JobQueue(workers=config.JOB_WORKERS, max_pending=config.JOB_QUEUE_DEPTH,
+                     retention=config.JOB_RESULT_TTL)
+
+detectors = Detectors(
+    mass_balance=MassBalance(config.TANK_CAPACITY_M3, loss_fraction=config.MASS_BALANCE_LOSS_FRACTION,
+                             tolerance=config.MASS_BALANCE_TOLERANCE, k=config.DETECT_CUSUM_K,
+                             h=config.DETECT_CUSUM_H, hold=config.DETECT_HOLD,
+                             window=config.MASS_BALANCE_WINDOW),
+    alpha=config.DETECT_ALPHA, k=config.DETECT_CUSUM_K, h=config.DETECT_CUSUM_H,
+    z_alarm=config.DETECT_Z_ALARM, warmup=config.DETECT_WARMUP, hold=config.DETECT_HOLD)
+telemetry_hub = TelemetryHub(push_interval=config.TELEMETRY_PUSH_INTERVAL,
+                             keepalive=config.TELEMETRY_KEEPALIVE,
+                             stale_after=config.TELEMETRY_STALE_AFTER,
+                             detectors=detectors)
+
+# Rolled-up sensor history; the open buckets are written out on shutdown
+series_store = SeriesStore(parse_levels(config.TIMESERIES_LEVELS), directory=config.TIMESERIES_DIR)
+atexit.register(series_store.close)
+
+# Every solved /run-model and batch row, kept for querying and export
+run_store = RunStore(config.RUN_STORE, max_pending=config.RUN_STORE_MAX_PENDING) if config.RUN_STORE else None
+if run_store is not None:
+    atexit.register(run_store.close)
+
+# Live pump flow setpoints at the built depth
+flow_controller = FlowController(
+    config.CONTROL_DEPTH, MODEL_CONSTANTS, horizon=config.CONTROL_HORIZON,
+    interval=config.CONTROL_INTERVAL, max_step=config.CONTROL_MAX_STEP,
+    tank_capacity=config.TANK_CAPACITY_M3, reserve=config.CONTROL_RESERVE,
+    budget=config.CONTROL_BUDGET_MS / 1000.0, bias_weight=config.CONTROL_BIAS_WEIGHT)
+
+metrics.registry.gauge("pipelong_cache_hits_total", "Result cache hits",
+                       lambda: result_cache.stats()["hits"], kind="counter")
+metrics.registry.gauge("pipelong_cache_misses_total", "Result cache misses",
+                       lambda: result_cache.stats()["misses"], kind="counter")
+metrics.registry.gauge("pipelong_jobs_pending", "Queued plus running background jobs",
+                       lambda: job_queue.stats()["pending"])
+metrics.registry.gauge("pipelong_solves_running", "Synchronous solves holding an admission slot",
+                       lambda: admission.stats()["running"])
+metrics.registry.gauge("pipelong_solves_coalesced_total", "Requests that shared another request's solve",
+                       lambda: in_flight.stats()["coalesced"], kind="counter")
+metrics.registry.gauge("pipelong_solves_rejected_client_total", "Solves refused with 429 (client limit)",
+                       lambda: admission.stats()["rejected"]["client"], kind="counter")
+metrics.registry.gauge("pipelong_solves_rejected_busy_total", "Solves refused with 503 (server busy)",
+                       lambda: admission.stats()["rejected"]["busy"], kind="counter")
+if run_store is not None:
+    metrics.registry.gauge("pipelong_runs_recorded_total", "Runs written to the run history",
+                           lambda: run_store.stats()["written"], kind="counter")
+    metrics.registry.gauge("pipelong_runs_dropped_total", "Runs not recorded because the writer was behind",
+                           lambda: run_store.stats()["dropped"], kind="counter")
+metrics.registry.gauge("pipelong_telemetry_subscribers", "Open telemetry streams",
+                       lambda: telemetry_hub.stats()["subscribers"])
+metrics.registry.gauge("pipelong_control_fallbacks_total", "Control steps that reused the previous plan",
+                       lambda: flow_controller.fallbacks, kind="counter")
+
+
+@app.before_request
+def start_timing():
+    metrics.start_request()
+
+
+@app.after_request
+def record_timing(response):
+    elapsed, timings = metrics.finish_request()
+    if elapsed is not None:
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.HTTP_SECONDS.observe(elapsed, endpoint=endpoint, method=request.method,
+                                     status=response.status_code)
+        if config.SERVER_TIMING:
+            response.headers["Server-Timing"] = metrics.server_timing(timings, elapsed)
+    return response
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    return Response(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/engines")
+def engines():
+    # Solver backends this worker can run, and the one used by default
+    return jsonify({"default": config.ENGINE, "available": available_backends()})
+
 @app.route("/")
 def home():
     return render_template("home.html")
@@ -15,14 +142,508 @@ def dashboard():
 def monitoring():
     return render_template("monitoring.html")
 
+def _negotiate():
+    # ((media type, content coding, layout), None) or (None, error response)
+    media, coding = responses.negotiate(request)
+    if media is None:
+        return None, (jsonify({"error": f"Can only produce: {', '.join(responses.media_types())}"}), 406)
+    # Arrow carries the per-period columns, so it is always columnar
+    layout = "columnar" if media == responses.ARROW else request.args.get("layout", "records")
+    if layout not in responses.LAYOUTS:
+        expected = ", ".join(responses.LAYOUTS)
+        return None, (jsonify({"error": f"Unknown layout '{layout}' (expected one of: {expected})"}), 400)
+    return (media, coding, layout), None
+
+
+def _results_tag(inputs, engine, representation):
+    # Everything a result body depends on besides the code itself
+    conventional = baseline.store.get("conventional")
+    table = surrogate_table.version if surrogate_table is not None and not engine else None
+    return responses.etag(inputs, engine or config.ENGINE, MODEL_CONSTANTS,
+                          conventional.mtime if conventional is not None else None, table, representation)
+
+
+def _rejected(e):
+    return jsonify({"error": str(e)}), e.status, {"Retry-After": str(e.retry_after)}
+
+
+def _holding_slot(response, client):
+    # A streamed solve keeps its admission slot until the response is closed
+    response.call_on_close(lambda: admission.release(client))
+    return response
+
+
+def _session_memo():
+    # Sessions are named by the client (X-Session-Id); without one nothing is reused
+    session = request.headers.get("X-Session-Id")
+    if not session:
+        return None
+    memo = session_memos.get(session)
+    if memo is None:
+        memo = Memo()
+        session_memos.put(session, memo)
+    return memo
+
+
 @app.route("/run-model", methods=["POST"])
 def run_simulation():
+    # ?layout=columnar returns flow_data as arrays; Accept selects JSON,
+    # MessagePack or Arrow and Accept-Encoding gzip or brotli
+    with phase("decode"):
+        data = request.json
+    representation, error = _negotiate()
+    if error is not None:
+        return error
+    try:
+        with phase("cache"):
+            key = canonical_key(data)
+            tag = _results_tag(key, data.get("engine"), representation)
+            if responses.not_modified(request, tag):
+                return responses.not_modified_response(tag)
+            results = result_cache.get(key)
+        if results is None:
+            # Keyed like the result cache, so whichever representation each
+            # caller asked for, identical inputs share the solve
+            memo = _session_memo()
+
+            def solve():
+                results = admission.run(request.remote_addr, run_model, data, memo=memo)
+                if "error" not in results:
+                    result_cache.put(key, results)
+                if run_store is not None:
+                    run_store.record(data, results, data.get("engine") or config.ENGINE,
+                                     *metrics.request_timings())
+                return results
+
+            results, _ = in_flight.do(key, solve)
+        with phase("serialise"):
+            if "error" in results:
+                return jsonify(results)
+            media, coding, layout = representation
+            payload = responses.columnar(results) if layout == "columnar" else results
+            return responses.respond(payload, media, coding, tag, config.RESPONSE_COMPRESS_MIN_BYTES)
+    except Rejected as e:
+        return _rejected(e)
+    except BackendUnavailable as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def _batch_request(data):
+    # (rows or columns, engine) from a batch body: a list of input dicts,
+    # {"items": [...]} or {"columns": {field: [...]}}, with an optional "engine"
+    if isinstance(data, list):
+        return data, None
+    if not isinstance(data, dict):
+        raise TypeError("expected a list of inputs or an object with 'items' or 'columns'")
+    if "items" in data:
+        return data["items"], data.get("engine")
+    if "columns" in data:
+        return data["columns"], data.get("engine")
+    raise ValueError("expected 'items' or 'columns'")
+
+
+@app.route("/run-model/batch", methods=["POST"])
+def run_simulation_batch():
+    # Body: a list of input dicts, {"items": [...]} or {"columns": {field: [...]}},
+    # with an optional top-level "engine"; negotiated like /run-model
+    data = request.json
+    representation, error = _negotiate()
+    if error is not None:
+        return error
+    try:
+        tag = _results_tag(data, data.get("engine") if isinstance(data, dict) else None, representation)
+        if responses.not_modified(request, tag):
+            return responses.not_modified_response(tag)
+        data, engine = _batch_request(data)
+        results = admission.run(request.remote_addr, run_model_batch, data, engine=engine,
+                                max_items=config.BATCH_MAX_ITEMS)
+        if run_store is not None:
+            run_store.record_batch(data, results, engine or config.ENGINE)
+        media, coding, layout = representation
+        payload = {
+            "results": responses.columnar_batch(results) if layout == "columnar" else results,
+            "count": len(results),
+            "errors": sum(1 for r in results if "error" in r),
+        }
+        # Rows that failed would fail again, so the whole body can be tagged
+        return responses.respond(payload, media, coding, tag, config.RESPONSE_COMPRESS_MIN_BYTES)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid batch: {e}"}), 400
+    except Rejected as e:
+        return _rejected(e)
+    except BackendUnavailable as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/run-model/sweep", methods=["POST"])
+def run_parameter_sweep():
+    # Body: {"axes": {name: [values] | {"start", "stop", "num"}}, "base": {...},
+    #        "engine": optional, "stream": optional bool}
+    data = request.json
+    client = request.remote_addr
+    try:
+        admission.acquire(client)
+    except Rejected as e:
+        return _rejected(e)
+    streaming = False
+    try:
+        axes, base, engine = data["axes"], data.get("base", {}), data.get("engine")
+        if not data.get("stream"):
+            grid = run_sweep(axes, base, engine=engine)
+            return jsonify({k: to_jsonable(v) if hasattr(v, "dtype") else v for k, v in grid.items()})
+        blocks = iter_sweep(axes, base, engine=engine)
+        header = next(blocks)
+        streaming = True
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid sweep: {e}"}), 400
+    except BackendUnavailable as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if not streaming:
+            admission.release(client)
+
+    def stream():
+        # Newline-delimited JSON: grid header, one line per finished block, then done
+        yield json.dumps(dict(header, type="grid", outputs=list(SWEEP_OUTPUTS))) + "\n"
+        done = 0
+        try:
+            for idx, out in blocks:
+                done += len(idx)
+                line = {name: to_jsonable(out[name]) for name in SWEEP_OUTPUTS}
+                yield json.dumps(dict(line, type="cells", index=idx.tolist())) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+            return
+        yield json.dumps({"type": "done", "cells": done}) + "\n"
+
+    return _holding_slot(Response(stream(), mimetype="application/x-ndjson"), client)
+
+@app.route("/run-model/uncertainty", methods=["POST"])
+def run_uncertainty_analysis():
+    # Body: {"base": {...}, "distributions": {name: {"dist", ...}}, "draws": optional,
+    #        "seed": optional, "bins": optional, "stream": optional bool}
+    data = request.json
+    client = request.remote_addr
+    try:
+        admission.acquire(client)
+    except Rejected as e:
+        return _rejected(e)
+    streaming = False
+    try:
+        args = (data.get("base", {}), data["distributions"], data.get("draws", 100000),
+                data.get("seed"), data.get("bins", 50))
+        if not data.get("stream"):
+            return jsonify(run_uncertainty(*args))
+        items = iter_uncertainty(*args)
+        first = next(items)
+        streaming = True
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid uncertainty analysis: {e}"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if not streaming:
+            admission.release(client)
+
+    def stream():
+        # Newline-delimited JSON: one progress line per block of draws, then the result
+        yield json.dumps(first) + "\n"
+        try:
+            for item in items:
+                yield json.dumps(item) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+
+    return _holding_slot(Response(stream(), mimetype="application/x-ndjson"), client)
+
+@app.route("/run-model/stochastic", methods=["POST"])
+def run_stochastic_depth():
+    # Body: run-model inputs plus "scenarios" (a count to generate, or
+    # {"it_load": [[12 values], ...], "ambient_temp": [...], "probability": optional}),
+    # "reduce_to", "seed" and "spread" (all optional)
+    data = request.json
+    try:
+        return jsonify(admission.run(request.remote_addr, run_stochastic, data, data.get("scenarios"),
+                                     data.get("reduce_to"), data.get("seed"), data.get("spread")))
+    except Rejected as e:
+        return _rejected(e)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid stochastic model: {e}"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/portfolio", methods=["POST"])
+def run_portfolio():
+    # Body: {"sites": [run-model inputs + optional "site_id"], "water_cap": m³, "depth_budget": m}
     data = request.json
     try:
-        results = run_model(data)
-        return jsonify(results)
+        return jsonify(admission.run(request.remote_addr, optimise_portfolio, data["sites"],
+                                     water_cap=data.get("water_cap"), depth_budget=data.get("depth_budget")))
+    except Rejected as e:
+        return _rejected(e)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid portfolio: {e}"}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+
+def _sweep_job(data):
+    grid = run_sweep(data["axes"], data.get("base", {}), engine=data.get("engine"))
+    return {k: to_jsonable(v) if hasattr(v, "dtype") else v for k, v in grid.items()}
+
+
+def _batch_job(data):
+    rows, engine = _batch_request(data)
+    return run_model_batch(rows, engine=engine, max_items=config.BATCH_MAX_ITEMS)
+
+
+JOB_KINDS = {
+    "run-model": run_model,
+    "batch": _batch_job,
+    "sweep": _sweep_job,
+    "uncertainty": lambda data: run_uncertainty(data.get("base", {}), data["distributions"],
+                                                data.get("draws", 100000), data.get("seed"),
+                                                data.get("bins", 50)),
+    "stochastic": lambda data: run_stochastic(data, data.get("scenarios"), data.get("reduce_to"),
+                                              data.get("seed"), data.get("spread")),
+    "portfolio": lambda data: optimise_portfolio(data["sites"], water_cap=data.get("water_cap"),
+                                                 depth_budget=data.get("depth_budget")),
+}
+# Fields a job payload must hold, checked at submit so a bad job fails with
+# a 400 rather than after waiting in the queue
+JOB_FIELDS = {
+    "run-model": CLIENT_FIELDS,
+    "sweep": ("axes",),
+    "uncertainty": ("distributions",),
+    "stochastic": CLIENT_FIELDS,
+    "portfolio": ("sites",),
+}
+
+
+def _job_payload_error(kind, payload):
+    if kind == "batch":
+        try:
+            rows = batch_rows(_batch_request(payload)[0])
+        except (KeyError, TypeError, ValueError) as e:
+            return f"Invalid batch: {e}"
+        if len(rows) > config.BATCH_MAX_ITEMS:
+            return f"Batch of {len(rows)} items exceeds the limit of {config.BATCH_MAX_ITEMS}"
+        return None
+    if not isinstance(payload, dict):
+        return f"A '{kind}' job needs an object payload"
+    missing = [field for field in JOB_FIELDS[kind] if field not in payload]
+    if missing:
+        return f"Missing field(s) for a '{kind}' job: {', '.join(missing)}"
+    return None
+
+
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    # Body: {"kind": "run-model" | "batch" | "sweep" | "uncertainty" | "stochastic" | "portfolio", "payload": {...}}
+    data = request.json or {}
+    kind = data.get("kind", "run-model")
+    if kind not in JOB_KINDS:
+        return jsonify({"error": f"Unknown job kind '{kind}'"}), 400
+    error = _job_payload_error(kind, data.get("payload"))
+    if error is not None:
+        return jsonify({"error": error}), 400
+    try:
+        job = job_queue.submit(kind, JOB_KINDS[kind], data.get("payload"))
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 429, {"Retry-After": "1"}
+    return jsonify(job.describe()), 202, {"Location": f"/jobs/{job.id}"}
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return jsonify(job.describe())
+
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    if job.status == "done":
+        return jsonify(job.result)
+    if job.status in ("queued", "running"):
+        return jsonify(job.describe()), 202
+    return jsonify(job.describe()), 409 if job.status == "cancelled" else 500
+
+
+@app.route("/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    job = job_queue.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return jsonify(job.describe())
+
+
+@app.route("/telemetry", methods=["POST"])
+def ingest_telemetry():
+    # Body: [{"sensor", "kind", "value", "ts"?}, ...] or {"readings": [...]}
+    try:
+        readings = parse_readings(request.json, max_items=config.TELEMETRY_MAX_BATCH)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid telemetry: {e}"}), 400
+    series_store.append_many((sensor, ts, value) for sensor, kind, value, ts in readings)
+    return jsonify({"accepted": telemetry_hub.ingest(readings)}), 202
+
+
+@app.route("/telemetry", methods=["GET"])
+def telemetry_snapshot():
+    return jsonify(telemetry_hub.snapshot())
+
+
+@app.route("/telemetry/detectors", methods=["GET"])
+def telemetry_detectors():
+    # Full detector state (EWMA baseline, z-score, CUSUMs, mass balance) to explain alerts
+    return jsonify(telemetry_hub.detector_state())
+
+
+@app.route("/telemetry/stream")
+def telemetry_stream():
+    # One long-lived response per dashboard; all of them share each pushed event
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(telemetry_hub.stream(), mimetype="text/event-stream", headers=headers)
+
+
+@app.route("/control/step", methods=["POST"])
+def control_step():
+    # Body: {"it_load", "ambient_temp" (values or forecast lists), "flow"?,
+    #        "tank_level"?, "dc_temp"?, "evaporation_rate"?, "energy_cost"?,
+    #        "water_cost"?, "depth"?}; missing flow, tank level and
+    #        temperature are taken from the latest telemetry
+    data = dict(request.json or {})
+    summary = telemetry_hub.snapshot()["summary"]
+    for field, kind in (("flow", "flow"), ("tank_level", "tank_level"), ("dc_temp", "temperature")):
+        if data.get(field) is None and kind in summary:
+            group = summary[kind]
+            # Pumps add up; levels and temperatures are averaged
+            data[field] = group["value"] * group["sensors"] if kind == "flow" else group["value"]
+    try:
+        return jsonify(flow_controller.step(data))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid measurement: {e}"}), 400
+
+
+@app.route("/control", methods=["GET"])
+def control_state():
+    return jsonify(flow_controller.state())
+
+
+@app.route("/timeseries", methods=["GET"])
+def list_series():
+    return jsonify({"channels": series_store.channels()})
+
+
+@app.route("/timeseries/<path:channel>/monthly", methods=["GET"])
+def series_monthly(channel):
+    # Measured monthly totals, e.g. to feed pump energy or makeup water into /run-model
+    try:
+        year = int(request.args["year"])
+    except (KeyError, ValueError):
+        return jsonify({"error": "year must be given as an integer"}), 400
+    try:
+        months = series_store.monthly(channel, year)
+    except KeyError:
+        return jsonify({"error": f"Unknown channel '{channel}'"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"channel": channel, "months": months,
+                    "total": sum(m["sum"] for m in months)})
+
+
+@app.route("/timeseries/<path:channel>", methods=["GET"])
+def series_range(channel):
+    # Query: start, end (Unix seconds), optional step (s) and max_points
+    try:
+        start, end = float(request.args["start"]), float(request.args["end"])
+    except KeyError:
+        return jsonify({"error": "start and end (Unix seconds) are required"}), 400
+    except ValueError:
+        start = end = math.nan
+    if not (math.isfinite(start) and math.isfinite(end)):
+        return jsonify({"error": "start and end must be numbers (Unix seconds)"}), 400
+    try:
+        step = None if request.args.get("step") is None else int(request.args["step"])
+        max_points = int(request.args.get("max_points", 1000))
+    except ValueError:
+        return jsonify({"error": "step and max_points must be integers"}), 400
+    try:
+        result = series_store.query(channel, start, end, step=step, max_points=max_points)
+    except KeyError:
+        return jsonify({"error": f"Unknown channel '{channel}'"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({k: to_jsonable(v) if hasattr(v, "dtype") else v for k, v in result.items()})
+
+
+def _run_filters():
+    # Query-string filters for the run history (see history.MATCH_FILTERS/RANGE_FILTERS)
+    names = set(MATCH_FILTERS) | {f"{bound}_{name}" for name in RANGE_FILTERS for bound in ("min", "max")}
+    return {name: value for name, value in request.args.items() if name in names}
+
+
+@app.route("/runs", methods=["GET"])
+def list_runs():
+    # Query: filters, limit (default 100, at most 1000) and before (the
+    # previous page's "next") for older runs; newest first
+    if run_store is None:
+        return jsonify({"error": "Run history is turned off"}), 404
+    try:
+        limit = min(max(request.args.get("limit", 100, type=int), 1), 1000)
+        runs, cursor = run_store.query(_run_filters(), limit, request.args.get("before", type=int))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"runs": runs, "count": len(runs), "next": cursor})
+
+
+@app.route("/runs/<int:run_id>", methods=["GET"])
+def get_run(run_id):
+    run = run_store.get(run_id) if run_store is not None else None
+    if run is None:
+        return jsonify({"error": "Unknown run"}), 404
+    return jsonify(run)
+
+
+@app.route("/runs/export", methods=["GET"])
+def export_runs():
+    # Query: format (csv or parquet) plus the /runs filters; streamed in id order
+    if run_store is None:
+        return jsonify({"error": "Run history is turned off"}), 404
+    fmt = request.args.get("format", "csv")
+    if fmt == "csv":
+        chunks, mimetype = run_store.export_csv(_run_filters()), "text/csv"
+    elif fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return jsonify({"error": "Parquet export needs pyarrow"}), 400
+        chunks, mimetype = run_store.export_parquet(_run_filters()), "application/vnd.apache.parquet"
+    else:
+        return jsonify({"error": f"Unknown format '{fmt}' (expected csv or parquet)"}), 400
+    try:
+        first = next(chunks)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def stream():
+        yield first
+        yield from chunks
+
+    headers = {"Content-Disposition": f"attachment; filename=runs.{fmt}"}
+    return Response(stream(), mimetype=mimetype, headers=headers)
+
+
 if __name__ == "__main__":
-    app.run(debug=True)
+    app.run(debug=config.DEBUG)
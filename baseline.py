@@ -0,0 +1,143 @@
+import glob
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import config
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# Cumulative columns derived at load time: new column -> source column
+CUMULATIVE_COLUMNS = {
+    "conventional": {
+        "Cumulative_Energy": "Pump_Energy_kWh",
+        "Cumulative_Water_Usage": "Makeup_Water_Usage_m3",
+    },
+    "underground": {
+        "Cumulative_Energy": "Pump_Energy_kWh",
+        "Cumulative_Water_Usage": "Water_Usage_m3",
+    },
+}
+
+
+def _source_mtime(path):
+    # A columnar dataset is a directory of <column>.npy files
+    if os.path.isdir(path):
+        files = glob.glob(os.path.join(path, "*.npy"))
+        return max((os.path.getmtime(f) for f in files), default=os.path.getmtime(path))
+    return os.path.getmtime(path)
+
+
+def _read_columns(path):
+    """Load a dataset as a dict of 1-D numpy arrays.
+
+    CSV and Parquet files are parsed once; a directory of .npy files (one per
+    column) is memory-mapped, so multi-year or hourly meter exports load
+    without a parse step.
+    """
+    if os.path.isdir(path):
+        return {
+            os.path.splitext(os.path.basename(f))[0]: np.load(f, mmap_mode="r")
+            for f in sorted(glob.glob(os.path.join(path, "*.npy")))
+        }
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path)
+    elif path.endswith(".npz"):
+        with np.load(path) as npz:
+            return {name: npz[name] for name in npz.files}
+    else:
+        df = pd.read_csv(path)
+    return {name: df[name].to_numpy() for name in df.columns}
+
+
+class Dataset:
+    def __init__(self, name, path, columns, mtime):
+        self.name = name
+        self.path = path
+        self.columns = columns
+        self.mtime = mtime
+        self._lists = {}
+
+    def as_list(self, column):
+        # JSON-ready copy of a column, built once per load
+        if column not in self._lists:
+            self._lists[column] = np.asarray(self.columns[column]).tolist()
+        return self._lists[column]
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), ()))
+
+
+class DatasetStore:
+    """Baseline datasets loaded once and reloaded only when the file changes.
+
+    get() re-stats the source at most every check_interval seconds and
+    reloads it if its mtime moved; cumulative columns are precomputed on load.
+    """
+
+    def __init__(self, check_interval=1.0):
+        self.check_interval = check_interval
+        self._paths = {}
+        self._datasets = {}
+        self._checked = {}
+        self._missing = set()
+        self._lock = threading.Lock()
+
+    def register(self, name, path):
+        with self._lock:
+            self._paths[name] = path
+            self._datasets.pop(name, None)
+            self._checked.pop(name, None)
+
+    def load_all(self):
+        for name in list(self._paths):
+            self.get(name)
+
+    def get(self, name):
+        """Return the named Dataset, or None if its source cannot be read."""
+        now = time.monotonic()
+        dataset = self._datasets.get(name)
+        if dataset is not None and now - self._checked.get(name, 0.0) < self.check_interval:
+            return dataset
+
+        with self._lock:
+            path = self._paths[name]
+            self._checked[name] = now
+            try:
+                mtime = _source_mtime(path)
+            except OSError:
+                if name not in self._missing:
+                    logger.warning("Baseline dataset %r not found at %s", name, path)
+                    self._missing.add(name)
+                self._datasets.pop(name, None)
+                return None
+            self._missing.discard(name)
+            dataset = self._datasets.get(name)
+            if dataset is not None and dataset.mtime == mtime:
+                return dataset
+
+            try:
+                columns = _read_columns(path)
+            except Exception:
+                logger.exception("Failed to load baseline dataset %r from %s", name, path)
+                return self._datasets.get(name)
+            for new, source in CUMULATIVE_COLUMNS.get(name, {}).items():
+                if source in columns:
+                    columns[new] = np.cumsum(columns[source])
+            dataset = Dataset(name, path, columns, mtime)
+            self._datasets[name] = dataset
+            logger.info("Loaded baseline dataset %r (%d rows) from %s", name, len(dataset), path)
+            return dataset
+
+
+store = DatasetStore(check_interval=config.BASELINE_CHECK_INTERVAL)
+store.register("conventional", config.BASELINE_CONVENTIONAL
+               or os.path.join(DATA_DIR, "conventional_datacentre_year.csv"))
+store.register("underground", config.BASELINE_UNDERGROUND
+               or os.path.join(DATA_DIR, "underground_well_datacentre_year.csv"))
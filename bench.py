@@ -0,0 +1,250 @@
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+import model
+import solvers
+
+# =============================================================================
+# Benchmarks for run_model and /run-model
+# =============================================================================
+# The numpy engine is the default stand-in backend, so the suite runs on
+# machines without a Gurobi licence; --engine gurobi measures the real one.
+#
+#   python bench.py -o bench.json                     # record results
+#   python bench.py --baseline bench.json             # compare, exit 1 on regression
+#
+# Only the COMPARED metrics gate a comparison (tail latencies are too noisy
+# on shared CI machines); those ending in _per_s are better when higher.
+
+# Ranges around the dashboard form defaults (index.html)
+INPUT_RANGES = {
+    "client_annual_energy_conventional": (50000.0, 250000.0),
+    "client_annual_water_conventional": (200.0, 1500.0),
+    "client_avg_IT_load": (50.0, 2000.0),
+    "client_evaporation_rate": (0.01, 0.1),
+    "client_energy_cost": (0.05, 0.4),
+    "client_water_cost": (0.5, 5.0),
+    "client_ambient_temp": (5.0, 35.0),
+}
+
+
+COMPARED = ("mean_ms", "p50_ms", "requests_per_s", "peak_kib_p50")
+
+
+def make_inputs(n, engine, seed=0):
+    rng = random.Random(seed)
+    return [dict({field: rng.uniform(lo, hi) for field, (lo, hi) in INPUT_RANGES.items()}, engine=engine)
+            for _ in range(n)]
+
+
+def _latency_summary(seconds):
+    ms = np.asarray(seconds) * 1000.0
+    return {
+        "n": int(ms.size),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "min_ms": float(ms.min()),
+    }
+
+
+def _reset_solver_state():
+    # Drop the pooled Gurobi templates so the next solve rebuilds one
+    solvers.reset_templates()
+
+
+def bench_cold(engine, inputs):
+    times = []
+    for data in inputs:
+        _reset_solver_state()
+        started = time.perf_counter()
+        model.run_model(data)
+        times.append(time.perf_counter() - started)
+    return _latency_summary(times)
+
+
+def bench_warm(engine, inputs, warmup=5):
+    for data in inputs[:warmup]:
+        model.run_model(data)
+    times = []
+    for data in inputs:
+        started = time.perf_counter()
+        model.run_model(data)
+        times.append(time.perf_counter() - started)
+    return _latency_summary(times)
+
+
+def bench_http(inputs, concurrency, cached=False):
+    """Requests per second through the Flask test client with N client threads."""
+    import config
+
+    # Run history would add its writer thread (and a file) to the timings
+    config.RUN_STORE = None
+    import app
+
+    # Measure the solve path itself: admission limits would turn the higher
+    # concurrencies into fast 429/503 answers
+    app.admission.limit = app.admission.per_client = 0
+    app.result_cache.invalidate()
+    if cached:
+        app.app.test_client().post("/run-model", json=inputs[0])
+    per_thread = [inputs[i::concurrency] for i in range(concurrency)]
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def client(batch):
+        test_client = app.app.test_client()
+        local = []
+        for data in batch:
+            started = time.perf_counter()
+            response = test_client.post("/run-model", json=inputs[0] if cached else data)
+            # Failed requests count as errors, not towards latency or throughput
+            if response.status_code != 200:
+                errors.append(response.status_code)
+            else:
+                local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(batch,)) for batch in per_thread]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    result = _latency_summary(latencies) if latencies else {"n": 0}
+    result.update({"concurrency": concurrency, "requests_per_s": len(latencies) / elapsed,
+                   "errors": len(errors)})
+    return result
+
+
+def bench_memory(inputs):
+    """Peak Python heap growth per solve (native solver memory is not traced)."""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for data in inputs:
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            model.run_model(data)
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    finally:
+        tracemalloc.stop()
+    return {
+        "peak_kib_p50": statistics.median(peaks) / 1024.0,
+        "peak_kib_max": max(peaks) / 1024.0,
+        "process_maxrss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _best_of(repeat, fn, *args, **kwargs):
+    runs = [fn(*args, **kwargs) for _ in range(repeat)]
+    return max(runs, key=lambda r: r["requests_per_s"])
+
+
+def run_suite(engine="numpy", n=200, cold=None, concurrency=(1, 4, 16), seed=0, repeat=3):
+    inputs = make_inputs(n, engine, seed)
+    cold = cold if cold is not None else (5 if engine != "numpy" else 20)
+    results = {
+        "run_model.cold": bench_cold(engine, inputs[:cold]),
+        "run_model.warm": bench_warm(engine, inputs),
+        "run_model.memory": bench_memory(inputs[:20]),
+    }
+    for c in concurrency:
+        results[f"http.run_model.c{c}"] = _best_of(repeat, bench_http, inputs, c)
+    results["http.run_model.cached"] = _best_of(repeat, bench_http, inputs, concurrency[-1], cached=True)
+    return {
+        "meta": {
+            "engine": engine,
+            "inputs": n,
+            "seed": seed,
+            "repeat": repeat,
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "timestamp": time.time(),
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance=0.2):
+    """List metrics that got worse than the baseline by more than tolerance."""
+    regressions = []
+    for case, metrics in current["results"].items():
+        for name, value in metrics.items():
+            base = baseline.get("results", {}).get(case, {}).get(name)
+            if base in (None, 0) or name not in COMPARED:
+                continue
+            change = (value - base) / abs(base)
+            worse = -change if name.endswith("_per_s") else change
+            if worse > tolerance:
+                regressions.append({"metric": f"{case}.{name}", "baseline": base, "current": value,
+                                    "change": change})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark run_model and /run-model")
+    parser.add_argument("--engine", default="numpy", choices=model.ENGINE_NAMES,
+                        help="solver backend (numpy needs no licence)")
+    parser.add_argument("-n", "--inputs", type=int, default=200, help="inputs per latency case")
+    parser.add_argument("--cold", type=int, help="cold solves to time")
+    parser.add_argument("--concurrency", default="1,4,16", help="client threads for /run-model")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per HTTP case (best is kept)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="bench-results.json", help="where to write results")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed relative slowdown before a metric counts as a regression")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.engine, args.inputs, args.cold,
+                       tuple(int(c) for c in args.concurrency.split(",")), args.seed, args.repeat)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    for case, metrics in report["results"].items():
+        print(f"{case:28s} " + "  ".join(f"{k}={v:.4g}" for k, v in metrics.items()))
+    print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("engine") != args.engine:
+            print(f"Warning: baseline was recorded with engine {baseline.get('meta', {}).get('engine')}")
+        regressions = compare(report, baseline, args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['metric']}: {r['baseline']:.4g} -> {r['current']:.4g} ({r['change']:+.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+import threading
+import time
+from collections import OrderedDict
+
+from model import CLIENT_FIELDS
+
+
+def canonical_key(data):
+    # "25", 25 and "25.0" all normalise to the same float; -0.0 folds into 0.0
+    key = tuple(float(data[field]) + 0.0 for field in CLIENT_FIELDS)
+    profiles = tuple(
+        None if data.get(name) is None else tuple(float(v) + 0.0 for v in data[name])
+        for name in ("it_load", "ambient_temp")
+    )
+    return key + (data.get("engine"), data.get("horizon", "monthly")) + profiles
+
+
+class ResultCache:
+    """Bounded LRU cache of run_model results with an optional TTL (seconds)."""
+
+    def __init__(self, maxsize=256, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl or None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+            }
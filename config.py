@@ -0,0 +1,147 @@
+import os
+
+# Settings read from the environment at startup
+
+# Flask debug mode for `python app.py` (set to 0 outside development)
+DEBUG = os.environ.get("PIPELONG_DEBUG", "1") == "1"
+
+# Result cache for /run-model (TTL of 0 means entries never expire)
+CACHE_SIZE = int(os.environ.get("PIPELONG_CACHE_SIZE", "256"))
+CACHE_TTL = float(os.environ.get("PIPELONG_CACHE_TTL", "0"))
+
+# Solver engine for run_model (requests may override it): "gurobi", "highs"
+# (open-source LP via SciPy), "numpy" (closed form, no licence), "auto"
+# (first of those installed) or "crosscheck" (runs Gurobi and NumPy and
+# reports divergences)
+ENGINE = os.environ.get("PIPELONG_ENGINE", "gurobi")
+CROSSCHECK_RTOL = float(os.environ.get("PIPELONG_CROSSCHECK_RTOL", "1e-4"))
+
+# Gurobi backend: built models kept for reuse across requests and threads
+# (one per concurrent solve is enough; each is one horizon and constants)
+GUROBI_TEMPLATES = int(os.environ.get("PIPELONG_GUROBI_TEMPLATES", "4"))
+
+# HiGHS backend: depth grid points before refining, and the depth tolerance (m)
+HIGHS_DEPTH_GRID = int(os.environ.get("PIPELONG_HIGHS_DEPTH_GRID", "17"))
+HIGHS_DEPTH_TOL = float(os.environ.get("PIPELONG_HIGHS_DEPTH_TOL", "1e-4"))
+# ... and above how many distinct periods (an LP costs ~0.5 s at hourly size)
+# the grid shrinks to HIGHS_LONG_GRID points
+HIGHS_LONG_PERIODS = int(os.environ.get("PIPELONG_HIGHS_LONG_PERIODS", "1000"))
+HIGHS_LONG_GRID = int(os.environ.get("PIPELONG_HIGHS_LONG_GRID", "5"))
+
+# Per-session stage results for /run-model what-if edits: sessions kept and
+# idle seconds before one is dropped
+SESSION_MAX = int(os.environ.get("PIPELONG_SESSION_MAX", "1024"))
+SESSION_TTL = float(os.environ.get("PIPELONG_SESSION_TTL", "1800"))
+
+# Smallest /run-model response body (bytes) worth compressing
+RESPONSE_COMPRESS_MIN_BYTES = int(os.environ.get("PIPELONG_RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+
+# Largest number of sites accepted by /run-model/batch
+BATCH_MAX_ITEMS = int(os.environ.get("PIPELONG_BATCH_MAX_ITEMS", "10000"))
+
+# Synchronous /run-model and /run-model/batch solves: how many may run at
+# once (503 beyond it), how many for one client address (429 beyond it) and
+# how long a request waits for a free slot (seconds); 0 disables a limit
+SOLVE_CONCURRENCY = int(os.environ.get("PIPELONG_SOLVE_CONCURRENCY", str(os.cpu_count() or 1)))
+SOLVE_PER_CLIENT = int(os.environ.get("PIPELONG_SOLVE_PER_CLIENT", "2"))
+SOLVE_QUEUE_WAIT = float(os.environ.get("PIPELONG_SOLVE_QUEUE_WAIT", "0.1"))
+
+# Parameter sweeps: process-pool size, cells per work item and grid size limit
+SWEEP_WORKERS = int(os.environ.get("PIPELONG_SWEEP_WORKERS", str(max(1, (os.cpu_count() or 1) - 1))))
+SWEEP_CHUNK_NUMPY = int(os.environ.get("PIPELONG_SWEEP_CHUNK_NUMPY", "4096"))
+SWEEP_CHUNK_GUROBI = int(os.environ.get("PIPELONG_SWEEP_CHUNK_GUROBI", "16"))
+SWEEP_MAX_CELLS = int(os.environ.get("PIPELONG_SWEEP_MAX_CELLS", "250000"))
+
+# Batch CLI (optimise.py): solver processes and rows per chunk, part file
+# and checkpoint step
+OPTIMISE_WORKERS = int(os.environ.get("PIPELONG_OPTIMISE_WORKERS", str(max(1, (os.cpu_count() or 1) - 1))))
+OPTIMISE_CHUNK_ROWS = int(os.environ.get("PIPELONG_OPTIMISE_CHUNK_ROWS", "50000"))
+
+# Monte Carlo uncertainty analysis: largest number of draws and draws
+# evaluated per vectorised block (one progress update each)
+MC_MAX_DRAWS = int(os.environ.get("PIPELONG_MC_MAX_DRAWS", "1000000"))
+MC_CHUNK = int(os.environ.get("PIPELONG_MC_CHUNK", "16384"))
+
+# Stochastic depth optimisation: scenarios generated by default, largest
+# ensemble accepted, most scenarios a reduction may keep, scenarios per
+# parallel block and worker threads
+STOCH_SCENARIOS = int(os.environ.get("PIPELONG_STOCH_SCENARIOS", "500"))
+STOCH_MAX_SCENARIOS = int(os.environ.get("PIPELONG_STOCH_MAX_SCENARIOS", "5000"))
+STOCH_MAX_REDUCED = int(os.environ.get("PIPELONG_STOCH_MAX_REDUCED", "500"))
+STOCH_BLOCK = int(os.environ.get("PIPELONG_STOCH_BLOCK", "64"))
+STOCH_WORKERS = int(os.environ.get("PIPELONG_STOCH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Surrogate lookup table (a directory written by `python surrogate.py build`)
+# answering flat monthly /run-model queries without an explicit engine, and
+# the certified relative cost gap above which the solver is used instead
+SURROGATE_TABLE = os.environ.get("PIPELONG_SURROGATE_TABLE")
+SURROGATE_RTOL = float(os.environ.get("PIPELONG_SURROGATE_RTOL", "1e-3"))
+
+# Run history: SQLite file recording every /run-model and batch result
+# (default data/runs.sqlite3 beside this file; an empty value turns
+# recording off) and how many runs or batches may wait for the writer
+# before new ones are dropped
+RUN_STORE = os.environ.get("PIPELONG_RUN_STORE",
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "runs.sqlite3"))
+RUN_STORE_MAX_PENDING = int(os.environ.get("PIPELONG_RUN_STORE_MAX_PENDING", "100000"))
+
+# Background jobs: solver threads, queued+running limit (429 beyond it) and
+# how long finished results are kept (seconds)
+JOB_WORKERS = int(os.environ.get("PIPELONG_JOB_WORKERS", "2"))
+JOB_QUEUE_DEPTH = int(os.environ.get("PIPELONG_JOB_QUEUE_DEPTH", "32"))
+JOB_RESULT_TTL = float(os.environ.get("PIPELONG_JOB_RESULT_TTL", "600"))
+
+# Baseline datasets: CSV, Parquet, .npz or a directory of per-column .npy
+# files (memory-mapped). Unset paths use the CSVs in data/.
+BASELINE_CONVENTIONAL = os.environ.get("PIPELONG_BASELINE_CONVENTIONAL")
+BASELINE_UNDERGROUND = os.environ.get("PIPELONG_BASELINE_UNDERGROUND")
+BASELINE_CHECK_INTERVAL = float(os.environ.get("PIPELONG_BASELINE_CHECK_INTERVAL", "1.0"))
+
+# Live telemetry: how often connected dashboards receive a snapshot, the
+# SSE keep-alive period, when a silent sensor counts as stale (seconds) and
+# the largest ingest batch
+TELEMETRY_PUSH_INTERVAL = float(os.environ.get("PIPELONG_TELEMETRY_PUSH_INTERVAL", "1.0"))
+TELEMETRY_KEEPALIVE = float(os.environ.get("PIPELONG_TELEMETRY_KEEPALIVE", "15"))
+TELEMETRY_STALE_AFTER = float(os.environ.get("PIPELONG_TELEMETRY_STALE_AFTER", "30"))
+TELEMETRY_MAX_BATCH = int(os.environ.get("PIPELONG_TELEMETRY_MAX_BATCH", "5000"))
+
+# Sensor history: rollup levels as "step:buckets,..." (default 6 h of 1 s,
+# 7 days of 1 min, 2 years of 1 h) and an optional directory for segment
+# files so history survives a restart
+TIMESERIES_LEVELS = os.environ.get("PIPELONG_TIMESERIES_LEVELS", "1:21600,60:10080,3600:17568")
+TIMESERIES_DIR = os.environ.get("PIPELONG_TIMESERIES_DIR")
+
+# Streaming anomaly detection on flow and pressure: EWMA weight, CUSUM
+# slack and threshold (in standard deviations), spike threshold, readings
+# before a channel can alert and how long an alert is held (seconds)
+DETECT_ALPHA = float(os.environ.get("PIPELONG_DETECT_ALPHA", "0.05"))
+DETECT_CUSUM_K = float(os.environ.get("PIPELONG_DETECT_CUSUM_K", "0.5"))
+DETECT_CUSUM_H = float(os.environ.get("PIPELONG_DETECT_CUSUM_H", "8.0"))
+DETECT_Z_ALARM = float(os.environ.get("PIPELONG_DETECT_Z_ALARM", "6.0"))
+DETECT_WARMUP = int(os.environ.get("PIPELONG_DETECT_WARMUP", "30"))
+DETECT_HOLD = float(os.environ.get("PIPELONG_DETECT_HOLD", "60"))
+
+# Mass balance between pumped flow and tank level: tank volume at 100%
+# (m³, the model's V_initial), expected loss as a fraction of the pumped
+# volume, the unexplained loss (m³/h) treated as one unit of drift and the
+# window (seconds) over which loss is measured
+TANK_CAPACITY_M3 = float(os.environ.get("PIPELONG_TANK_CAPACITY_M3", "1000"))
+MASS_BALANCE_LOSS_FRACTION = float(os.environ.get("PIPELONG_MASS_BALANCE_LOSS_FRACTION", "0.0"))
+MASS_BALANCE_TOLERANCE = float(os.environ.get("PIPELONG_MASS_BALANCE_TOLERANCE", "0.01"))
+MASS_BALANCE_WINDOW = float(os.environ.get("PIPELONG_MASS_BALANCE_WINDOW", "300"))
+
+# Flow controller (/control/step): the built well depth (m), look-ahead
+# intervals, interval length (s), largest flow change per interval (m³/s),
+# tank level kept in reserve (%), latency budget (ms) before the previous
+# plan is reused, and the weight of each temperature measurement in the
+# model offset
+CONTROL_DEPTH = float(os.environ["PIPELONG_CONTROL_DEPTH"]) if os.environ.get("PIPELONG_CONTROL_DEPTH") else None
+CONTROL_HORIZON = int(os.environ.get("PIPELONG_CONTROL_HORIZON", "12"))
+CONTROL_INTERVAL = float(os.environ.get("PIPELONG_CONTROL_INTERVAL", "300"))
+CONTROL_MAX_STEP = float(os.environ.get("PIPELONG_CONTROL_MAX_STEP", "0.5"))
+CONTROL_RESERVE = float(os.environ.get("PIPELONG_CONTROL_RESERVE", "20"))
+CONTROL_BUDGET_MS = float(os.environ.get("PIPELONG_CONTROL_BUDGET_MS", "50"))
+CONTROL_BIAS_WEIGHT = float(os.environ.get("PIPELONG_CONTROL_BIAS_WEIGHT", "0.3"))
+
+# Add a Server-Timing header (per-phase milliseconds) to every response
+SERVER_TIMING = os.environ.get("PIPELONG_SERVER_TIMING", "0") == "1"
@@ -0,0 +1,4 @@
+import os
+
+# Importing app must not open the run history under data/
+os.environ.setdefault("PIPELONG_RUN_STORE", "")
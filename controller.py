@@ -0,0 +1,212 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import numpy as np
+
+from metrics import phase
+
+# =============================================================================
+# Rolling-horizon (model-predictive) pump flow control at a built depth
+# =============================================================================
+# Each control step takes the current measurements, forecasts the next
+# `horizon` intervals (the posted forecast, else the current values held
+# constant) and re-plans the flow for all of them; only the first setpoint is
+# applied and the rest of the plan is kept as the fallback for the next step.
+#
+# With the depth fixed, the cooling constraint of the well model becomes
+# linear in Q:  K_well * (T_target - T_surface + alpha*D) * Q_t >= IT_t, so
+# each interval has a minimum flow. Pumping costs energy and evaporates
+# water, so the cheapest plan is the smallest flow sequence that meets those
+# minima while moving at most max_step per interval from the current
+# setpoint:
+#
+#   ready_t = max over s >= t of (need_s - (s - t)*max_step)   ramp up in time
+#   Q_t     = max(ready_t, Q_{t-1} - max_step)                  ramp down slowly
+#
+# starting from the current flow, clipped to what can be reached from it
+# and to Q_max. The plan is exact, so a warm
+# start adds nothing; the previous plan is what the controller falls back on.
+# A measured data-centre temperature corrects the model through an
+# exponentially smoothed offset (offset-free MPC), and the tank level is
+# projected over the horizon against a reserve.
+
+
+def plan_flows(need, q_prev, max_step, q_max):
+    """Least flow sequence with Q_t >= need_t and |Q_t - Q_{t-1}| <= max_step.
+
+    q_prev is the flow now (None when unknown, which lifts the limit on the
+    first move).
+    """
+    need = np.minimum(np.asarray(need, dtype=float), q_max)
+    t = np.arange(len(need))
+    ready = np.maximum.accumulate((need - t * max_step)[::-1])[::-1] + t * max_step
+    plan = np.maximum.accumulate(ready + t * max_step) - t * max_step
+    if q_prev is not None:
+        plan = np.maximum(plan, q_prev - (t + 1) * max_step)
+        plan = np.minimum(plan, q_prev + (t + 1) * max_step)
+    return np.clip(plan, 0.0, q_max)
+
+
+def _horizon(value, horizon, name):
+    # A scalar is held over the horizon; a list is a forecast (padded with its last value)
+    values = np.atleast_1d(np.asarray(value, dtype=float))
+    if values.ndim != 1 or not len(values) or not np.all(np.isfinite(values)):
+        raise ValueError(f"'{name}' must be a finite number or a non-empty list of numbers")
+    if len(values) >= horizon:
+        return values[:horizon]
+    return np.concatenate([values, np.full(horizon - len(values), values[-1])])
+
+
+class FlowController:
+    """Flow setpoints for one well of fixed depth, re-planned every step.
+
+    constants is a MODEL_CONSTANTS-style mapping (read on every step, so
+    set_model_constants applies). A step that fails or misses the latency
+    budget (seconds) returns the previous plan advanced by one interval.
+    """
+
+    def __init__(self, depth, constants, horizon=12, interval=300.0, max_step=0.5,
+                 tank_capacity=1000.0, reserve=20.0, budget=0.05, bias_weight=0.3):
+        self.depth = depth
+        self.constants = constants
+        self.horizon = horizon
+        self.interval = interval
+        self.max_step = max_step
+        self.tank_capacity = tank_capacity
+        self.reserve = reserve
+        self.budget = budget
+        self.bias_weight = bias_weight
+        self.bias = 0.0
+        self.plan = None
+        self.last = None
+        self.steps = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipelong-control")
+        self._running = None
+
+    def step(self, measurement):
+        """Plan from measurement and return the next setpoint.
+
+        measurement has "it_load" (kW) and "ambient_temp" (°C), each a value
+        or a forecast list, and optionally "flow" (the measured flow, m³/s),
+        "tank_level" (%), "dc_temp" (the measured data-centre temperature,
+        °C), "evaporation_rate",
+        "energy_cost" and "water_cost"; "depth" overrides the built depth.
+        """
+        m = dict(measurement)
+        depth = m.get("depth", self.depth)
+        if depth is None:
+            raise ValueError("No well depth configured (set PIPELONG_CONTROL_DEPTH or post 'depth')")
+        m["depth"] = float(depth)
+        m["it_load"] = _horizon(m["it_load"], self.horizon, "it_load")
+        m["ambient_temp"] = _horizon(m["ambient_temp"], self.horizon, "ambient_temp")
+
+        with self._lock:
+            started = time.perf_counter()
+            if self._running is not None and not self._running.done():
+                # The previous solve is still running past its budget
+                return self._fallback(started, "previous solve still running")
+            self._running = self._executor.submit(self._solve, m, self.plan)
+            try:
+                result = self._running.result(timeout=self.budget)
+            except TimeoutError:
+                return self._fallback(started, f"solve exceeded the {self.budget * 1000:.0f} ms budget")
+            except Exception as e:
+                return self._fallback(started, f"solve failed: {e}")
+            self.plan = result["plan"]
+            self.bias = result["bias"]
+            self.steps += 1
+            result["solve_ms"] = (time.perf_counter() - started) * 1000.0
+            self.last = result
+            return result
+
+    def _fallback(self, started, reason):
+        # Caller holds the lock. Advance the last plan; with none, pump at Q_max
+        self.steps += 1
+        self.fallbacks += 1
+        if self.plan is not None:
+            self.plan = self.plan[1:] + self.plan[-1:]
+        else:
+            self.plan = [float(self.constants["Q_max"])] * self.horizon
+        self.last = {
+            "setpoint": self.plan[0],
+            "plan": self.plan,
+            "status": "fallback",
+            "warnings": [reason],
+            "bias": self.bias,
+            "solve_ms": (time.perf_counter() - started) * 1000.0,
+        }
+        return self.last
+
+    def _solve(self, m, previous):
+        # Runs on the control thread; state is only updated by step()
+        with phase("control"):
+            c = self.constants
+            depth, it_load, ambient = m["depth"], m["it_load"], m["ambient_temp"]
+            # The measured flow anchors the ramp, else the last setpoint
+            if m.get("flow") is not None:
+                q_prev = float(m["flow"])
+            else:
+                q_prev = previous[0] if previous is not None else None
+            bias = self.bias
+            warnings = []
+
+            # Offset between measured and modelled data-centre temperature
+            if m.get("dc_temp") is not None and q_prev is not None and q_prev > 1e-6:
+                predicted = ambient[0] - c["alpha"] * depth + it_load[0] / (c["K_well"] * q_prev)
+                bias += self.bias_weight * (float(m["dc_temp"]) - predicted - bias)
+
+            headroom = c["T_dc_target"] - bias - ambient + c["alpha"] * depth
+            with np.errstate(divide="ignore"):
+                need = np.where(headroom > 0, it_load / (c["K_well"] * headroom), np.inf)
+            if np.any(need > c["Q_max"]):
+                warnings.append(f"cooling short in {int(np.sum(need > c['Q_max']))} of "
+                                f"{self.horizon} intervals even at Q_max")
+            plan = plan_flows(need, q_prev, self.max_step, c["Q_max"])
+            if np.any(plan < np.minimum(need, c["Q_max"]) - 1e-9):
+                warnings.append(f"ramp limit of {self.max_step:g} m³/s per interval delays cooling")
+
+            result = {
+                "setpoint": float(plan[0]),
+                "plan": plan.tolist(),
+                "status": "degraded" if warnings else "optimal",
+                "depth": depth,
+                "bias": bias,
+            }
+
+            # Evaporation and pump energy per interval as the well model
+            # charges them per period, with Delta_t in hours
+            hours = self.interval / 3600.0
+            evaporation = float(m.get("evaporation_rate", 0.0))
+            loss = evaporation * plan * hours
+            if m.get("tank_level") is not None:
+                volume = float(m["tank_level"]) / 100.0 * self.tank_capacity - np.cumsum(loss)
+                level = volume / self.tank_capacity * 100.0
+                result["tank_level"] = level.tolist()
+                if level.min() < self.reserve:
+                    warnings.append(f"tank falls below the {self.reserve:g}% reserve "
+                                    f"within {int(np.argmax(level < self.reserve)) + 1} intervals")
+                    result["status"] = "degraded"
+
+            energy = c["g"] * c["rho"] / (1000 * c["eta"]) * depth * plan * hours
+            result["energy_kwh"] = float(energy.sum())
+            result["water_m3"] = float(loss.sum())
+            if m.get("energy_cost") is not None and m.get("water_cost") is not None:
+                result["cost"] = (float(m["energy_cost"]) * result["energy_kwh"]
+                                  + float(m["water_cost"]) * result["water_m3"])
+            result["warnings"] = warnings
+            return result
+
+    def state(self):
+        with self._lock:
+            return {
+                "depth": self.depth,
+                "horizon": self.horizon,
+                "interval": self.interval,
+                "steps": self.steps,
+                "fallbacks": self.fallbacks,
+                "bias": self.bias,
+                "last": self.last,
+            }
@@ -0,0 +1,202 @@
+import math
+
+# =============================================================================
+# Streaming anomaly and leak detection over telemetry readings
+# =============================================================================
+# Flow and pressure channels each keep an exponentially weighted mean and
+# variance. Every reading is scored against them (z-score) before they are
+# updated, and the score (capped at z_alarm) feeds a two-sided CUSUM:
+#
+#   S+ = max(0, S+ + z - k)      S- = max(0, S- - z - k)
+#
+# A single |z| beyond z_alarm is a spike (alarm); S+ or S- beyond h is a
+# sustained shift (warning). The mass balance closes the loop between pumps
+# and tank: in a closed loop the tank should only lose the expected fraction
+# of the pumped volume, so unexplained loss per hour is tracked with a
+# one-sided CUSUM and raised as a leak. All updates are O(1) per reading.
+
+_SEVERITY = {"ok": 0, "warn": 1, "alarm": 2}
+DETECTED_KINDS = ("flow", "pressure")
+
+
+class ChannelDetector:
+    """EWMA z-score and CUSUM detector for one sensor channel."""
+
+    def __init__(self, alpha=0.05, k=0.5, h=8.0, z_alarm=6.0, warmup=30, hold=60.0):
+        self.alpha = alpha
+        self.k = k
+        self.h = h
+        self.z_alarm = z_alarm
+        self.warmup = warmup
+        self.hold = hold
+        self.n = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.z = 0.0
+        self.cusum_pos = 0.0
+        self.cusum_neg = 0.0
+        self.last_value = None
+        self.status = "ok"
+        self.reason = None
+        self.held_until = 0.0
+
+    def std(self):
+        # Floor keeps perfectly steady channels from producing infinite scores
+        return max(math.sqrt(self.var), 1e-6 * abs(self.mean), 1e-12)
+
+    def update(self, value, ts):
+        self.n += 1
+        self.last_value = value
+        if self.n == 1:
+            self.mean = value
+            return self.status
+        residual = value - self.mean
+        self.z = z = residual / self.std()
+
+        status, reason = "ok", None
+        if self.n > self.warmup:
+            # A spike counts at most z_alarm, so one bad reading is an alarm
+            # but not also a sustained shift once the alarm clears
+            capped = max(-self.z_alarm, min(self.z_alarm, z))
+            self.cusum_pos = max(0.0, self.cusum_pos + capped - self.k)
+            self.cusum_neg = max(0.0, self.cusum_neg - capped - self.k)
+            if abs(z) > self.z_alarm:
+                status = "alarm"
+                reason = (f"spike {value:.4g} is {z:+.1f} sd from "
+                          f"{self.mean:.4g} ± {self.std():.2g}")
+            elif max(self.cusum_pos, self.cusum_neg) > self.h:
+                direction = "up" if self.cusum_pos > self.cusum_neg else "down"
+                status = "warn"
+                reason = (f"sustained shift {direction} (CUSUM "
+                          f"{max(self.cusum_pos, self.cusum_neg):.1f} > {self.h:g}) "
+                          f"around {self.mean:.4g}")
+        # A raised status is held for hold seconds so dashboards see it
+        if _SEVERITY[status] >= _SEVERITY[self.status] or ts >= self.held_until:
+            if status != "ok":
+                self.held_until = ts + self.hold
+            self.status, self.reason = status, reason
+
+        # Spikes are clipped so one bad reading does not drag the baseline;
+        # early on the weight 1/n gives the plain running mean and variance
+        clipped = residual
+        if self.n > self.warmup:
+            clipped = max(-self.z_alarm, min(self.z_alarm, z)) * self.std()
+        alpha = max(self.alpha, 1.0 / self.n)
+        self.mean += alpha * clipped
+        self.var = (1.0 - alpha) * (self.var + alpha * clipped * clipped)
+        return self.status
+
+    def state(self):
+        return {
+            "n": self.n,
+            "value": self.last_value,
+            "mean": self.mean,
+            "std": self.std(),
+            "z": self.z,
+            "cusum_pos": self.cusum_pos,
+            "cusum_neg": self.cusum_neg,
+            "status": self.status,
+            "reason": self.reason,
+        }
+
+
+class MassBalance:
+    """Unexplained tank loss against pumped volume (one-sided CUSUM).
+
+    The pumped volume is integrated from the latest flow readings, and over
+    each window (seconds) of tank_level readings the tank is expected to
+    lose loss_fraction of it. Loss beyond that, in m³/h over tolerance
+    (m³/h), feeds the CUSUM, which is capped at 2h so it can recover.
+    """
+
+    def __init__(self, tank_capacity, loss_fraction=0.0, tolerance=0.01, k=0.5, h=8.0,
+                 hold=60.0, window=300.0):
+        self.tank_capacity = tank_capacity
+        self.window = window
+        self.loss_fraction = loss_fraction
+        self.tolerance = tolerance
+        self.k = k
+        self.h = h
+        self.hold = hold
+        self.flows = {}
+        self.flow_ts = None
+        self.pumped = 0.0
+        self.level = None
+        self.level_ts = None
+        self.volume = None
+        self.drift = 0.0
+        self.cusum = 0.0
+        self.status = "ok"
+        self.reason = None
+        self.held_until = 0.0
+
+    def _integrate(self, ts):
+        if self.flow_ts is not None and ts > self.flow_ts:
+            self.pumped += sum(self.flows.values()) * (ts - self.flow_ts)
+        self.flow_ts = ts if self.flow_ts is None else max(self.flow_ts, ts)
+
+    def update_flow(self, sensor, value, ts):
+        self._integrate(ts)
+        self.flows[sensor] = value
+
+    def update_level(self, percent, ts):
+        self._integrate(ts)
+        volume = percent / 100.0 * self.tank_capacity
+        if self.level is None:
+            self.level, self.level_ts, self.pumped = volume, ts, 0.0
+        if ts - self.level_ts >= self.window:
+            hours = (ts - self.level_ts) / 3600.0
+            unexplained = (self.level - volume) - self.loss_fraction * self.pumped
+            self.drift = unexplained / hours
+            self.cusum = min(2.0 * self.h, max(0.0, self.cusum + self.drift / self.tolerance - self.k))
+            if self.cusum > self.h:
+                self.status = "alarm"
+                self.reason = (f"tank losing {self.drift:.3g} m³/h more than expected "
+                               f"(CUSUM {self.cusum:.1f} > {self.h:g})")
+                self.held_until = ts + self.hold
+            elif ts >= self.held_until:
+                self.status, self.reason = "ok", None
+            self.level, self.level_ts, self.pumped = volume, ts, 0.0
+        self.volume = volume
+        return self.status
+
+    def state(self):
+        return {
+            "tank_volume": self.volume,
+            "pumping": sum(self.flows.values()),
+            "drift": self.drift,
+            "cusum": self.cusum,
+            "status": self.status,
+            "reason": self.reason,
+        }
+
+
+class Detectors:
+    """Per-sensor detectors for flow and pressure plus the mass balance."""
+
+    def __init__(self, mass_balance=None, **channel_options):
+        self.channel_options = channel_options
+        self.channels = {}
+        self.mass_balance = mass_balance
+
+    def update(self, sensor, kind, value, ts):
+        if kind in DETECTED_KINDS:
+            detector = self.channels.get(sensor)
+            if detector is None:
+                detector = self.channels[sensor] = ChannelDetector(**self.channel_options)
+            detector.update(value, ts)
+        if self.mass_balance is not None:
+            if kind == "flow":
+                self.mass_balance.update_flow(sensor, value, ts)
+            elif kind == "tank_level":
+                self.mass_balance.update_level(value, ts)
+
+    def status(self, sensor):
+        detector = self.channels.get(sensor)
+        return (detector.status, detector.reason) if detector else ("ok", None)
+
+    def state(self):
+        return {
+            "channels": {sensor: d.state() for sensor, d in sorted(self.channels.items())},
+            "mass_balance": self.mass_balance.state() if self.mass_balance else None,
+        }
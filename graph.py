@@ -0,0 +1,91 @@
+import threading
+
+import numpy as np
+
+from metrics import phase
+
+# =============================================================================
+# Memoised dependency graph of derived quantities
+# =============================================================================
+# A stage is a function of some named inputs and of the results of earlier
+# stages. Evaluating the graph against a Memo (one per session) recomputes a
+# stage only when one of its inputs changed since that memo last saw it, or
+# when a stage it depends on was recomputed; everything else is reused.
+# Recomputed stages are timed as metrics phases under their own names.
+
+
+def _freeze(value):
+    # Comparable form of an input; arrays compare by dtype, shape and bytes
+    if isinstance(value, np.ndarray):
+        return (value.dtype.str, value.shape, value.tobytes())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+class Stage:
+    def __init__(self, name, fn, inputs=(), after=()):
+        self.name = name
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.after = tuple(after)
+
+
+class Memo:
+    """Per-session stage results: name -> (input key, version, value)."""
+
+    def __init__(self):
+        self.stages = {}
+        self.lock = threading.Lock()
+        self.version = 0
+
+
+class Graph:
+    """Stages in dependency order; fn(inputs, results) -> value.
+
+    inputs holds the stage's named inputs and results the values of the
+    stages listed in after.
+    """
+
+    def __init__(self, stages):
+        self.stages = {}
+        for stage in stages:
+            missing = [name for name in stage.after if name not in self.stages]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on undefined stages: {', '.join(missing)}")
+            self.stages[stage.name] = stage
+
+    def _needed(self, targets):
+        needed = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in needed:
+                needed.add(name)
+                pending.extend(self.stages[name].after)
+        return [name for name in self.stages if name in needed]
+
+    def evaluate(self, values, memo=None, targets=None):
+        """Return ({stage: value}, [recomputed stage names]) for targets (default all)."""
+        memo = memo if memo is not None else Memo()
+        results = {}
+        recomputed = []
+        with memo.lock:
+            for name in self._needed(targets or self.stages):
+                stage = self.stages[name]
+                key = (tuple(_freeze(values[k]) for k in stage.inputs),
+                       tuple(memo.stages[d][1] for d in stage.after))
+                cached = memo.stages.get(name)
+                if cached is not None and cached[0] == key:
+                    results[name] = cached[2]
+                    continue
+                with phase(name):
+                    value = stage.fn({k: values[k] for k in stage.inputs},
+                                     {d: results[d] for d in stage.after})
+                memo.version += 1
+                memo.stages[name] = (key, memo.version, value)
+                results[name] = value
+                recomputed.append(name)
+        return results, recomputed
@@ -0,0 +1,368 @@
+import csv
+import functools
+import io
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from importlib import metadata
+
+import solvers
+from model import batch_rows
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# Append-only store of past run_model results
+# =============================================================================
+# Each solved /run-model request is recorded in SQLite with its inputs, its
+# headline outputs, the engine and engine version that produced it and the
+# request's phase timings. Requests only queue their inputs and results; one
+# writer thread builds the rows and inserts them in batches, so neither row
+# building nor a slow disk delays a response. Queries
+# page by run id (newest first) over indexed columns, and exports stream
+# rows from a cursor in batches, so a million runs never sit in memory.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    site TEXT,
+    engine TEXT,
+    engine_version TEXT,
+    status TEXT NOT NULL,
+    horizon TEXT,
+    client_annual_energy_conventional REAL,
+    client_annual_water_conventional REAL,
+    client_avg_IT_load REAL,
+    client_evaporation_rate REAL,
+    client_energy_cost REAL,
+    client_water_cost REAL,
+    client_ambient_temp REAL,
+    total_cost REAL,
+    conventional_cost REAL,
+    savings REAL,
+    energy REAL,
+    net_water REAL,
+    solve_seconds REAL,
+    total_seconds REAL,
+    timings TEXT,
+    flow_rates TEXT,
+    inputs TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_created_at ON runs (created_at);
+CREATE INDEX IF NOT EXISTS runs_site ON runs (site, id);
+CREATE INDEX IF NOT EXISTS runs_engine ON runs (engine, id);
+CREATE INDEX IF NOT EXISTS runs_it_load ON runs (client_avg_IT_load);
+CREATE INDEX IF NOT EXISTS runs_ambient_temp ON runs (client_ambient_temp);
+CREATE INDEX IF NOT EXISTS runs_energy_cost ON runs (client_energy_cost);
+CREATE INDEX IF NOT EXISTS runs_water_cost ON runs (client_water_cost);
+"""
+
+COLUMNS = (
+    "id", "created_at", "site", "engine", "engine_version", "status", "horizon",
+    "client_annual_energy_conventional", "client_annual_water_conventional", "client_avg_IT_load",
+    "client_evaporation_rate", "client_energy_cost", "client_water_cost", "client_ambient_temp",
+    "total_cost", "conventional_cost", "savings", "energy", "net_water",
+    "solve_seconds", "total_seconds", "timings", "flow_rates", "inputs",
+)
+# Result fields copied into their own columns
+OUTPUT_COLUMNS = {
+    "total_cost": "total_cost_new",
+    "conventional_cost": "conventional_cost",
+    "savings": "savings",
+    "energy": "optimal_energy_new",
+    "net_water": "optimal_net_water_new",
+}
+# Query filters: exact matches, and min_/max_ bounds on the indexed inputs and time
+MATCH_FILTERS = ("site", "engine", "status", "horizon")
+RANGE_FILTERS = {
+    "time": "created_at",
+    "it_load": "client_avg_IT_load",
+    "ambient_temp": "client_ambient_temp",
+    "energy_cost": "client_energy_cost",
+    "water_cost": "client_water_cost",
+}
+# Package whose version identifies each engine
+ENGINE_PACKAGES = {"gurobi": "gurobipy", "highs": "scipy", "numpy": "numpy", "crosscheck": "gurobipy"}
+
+
+@functools.lru_cache(maxsize=None)
+def engine_version(engine):
+    package = ENGINE_PACKAGES.get(engine)
+    if package is None:
+        return None
+    try:
+        return f"{package} {metadata.version(package)}"
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def run_record(inputs, results, engine, timings=None, seconds=None, created_at=None):
+    """Row values for one run_model call; engine is the one requested."""
+    if "surrogate" in results:
+        engine, version = "surrogate", results["surrogate"]["table"]
+    else:
+        try:
+            engine = solvers.resolve(engine)
+        except (ValueError, solvers.BackendUnavailable):
+            pass
+        version = engine_version(engine)
+    failed = "error" in results
+    flow = None if failed else [row["flow_rate"] for row in results["flow_data"]]
+    timings = timings or {}
+    row = {
+        "created_at": time.time() if created_at is None else created_at,
+        "site": None if inputs.get("site") is None else str(inputs["site"]),
+        "engine": engine,
+        "engine_version": version,
+        "status": results.get("status", "error") if failed else "optimal",
+        "horizon": inputs.get("horizon", "monthly"),
+        "solve_seconds": timings.get("solve"),
+        "total_seconds": seconds,
+        "timings": json.dumps(timings),
+        "flow_rates": None if flow is None else json.dumps(flow),
+        "inputs": json.dumps(inputs, sort_keys=True, default=str),
+    }
+    for column in COLUMNS[7:14]:
+        row[column] = _float(inputs.get(column))
+    for column, field in OUTPUT_COLUMNS.items():
+        row[column] = None if failed else results[field]
+    return row
+
+
+def _where(filters):
+    # SQL condition and parameters for query filters; unknown names raise ValueError
+    clauses, params = [], []
+    for name, value in filters.items():
+        if value is None:
+            continue
+        if name in MATCH_FILTERS:
+            clauses.append(f"{name} = ?")
+            params.append(value)
+        elif name[:4] in ("min_", "max_") and name[4:] in RANGE_FILTERS:
+            clauses.append(f"{RANGE_FILTERS[name[4:]]} {'>=' if name[:4] == 'min_' else '<='} ?")
+            params.append(float(value))
+        else:
+            raise ValueError(f"Unknown filter '{name}'")
+    return " AND ".join(clauses) or "1", params
+
+
+class RunStore:
+    """SQLite run history at path; record() queues, a writer thread inserts.
+
+    Requests queue the raw inputs and results and the writer thread turns
+    them into rows. At most max_pending runs or batches wait for the writer;
+    beyond that new ones are dropped (and counted) rather than slowing
+    requests down, as are runs in a write that fails.
+    """
+
+    def __init__(self, path, max_pending=100000, batch=500, interval=0.5):
+        self.path = path
+        self.batch = batch
+        self.interval = interval
+        self.dropped = 0
+        self.written = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._writer = threading.Thread(target=self._write_loop, name="pipelong-history", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += self._runs(item)
+
+    @staticmethod
+    def _runs(item):
+        # Runs an item stands for: one, or one per batch result
+        if item is None:
+            return 0
+        return 1 if item[0] == "run" else len(item[3])
+
+    def record(self, inputs, results, engine, timings=None, seconds=None):
+        """Queue one run_model call (see run_record)."""
+        self._put(("run", time.time(), inputs, results, engine, timings, seconds))
+
+    def record_batch(self, payload, results, engine):
+        """Queue a whole run_model_batch call; rows are split out on the writer thread."""
+        self._put(("batch", time.time(), payload, results, engine))
+
+    @staticmethod
+    def _rows(item):
+        kind, created_at = item[:2]
+        if kind == "run":
+            inputs, results, engine, timings, seconds = item[2:]
+            return [run_record(inputs, results, engine, timings, seconds, created_at)]
+        payload, results, engine = item[2:]
+        return [run_record(inputs, result, engine, created_at=created_at)
+                for inputs, result in zip(batch_rows(payload), results) if isinstance(inputs, dict)]
+
+    def _write_loop(self):
+        conn = self._connect()
+        # WAL stays consistent without a sync per commit; a crash may lose the last few runs
+        conn.execute("PRAGMA synchronous=NORMAL")
+        names = COLUMNS[1:]
+        sql = f"INSERT INTO runs ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+        while True:
+            # Gather for up to interval seconds so a steady trickle of runs
+            # costs one transaction per interval rather than one per run
+            items = [self._queue.get()]
+            deadline = time.monotonic() + self.interval
+            while len(items) < self.batch and items[-1] is not None:
+                try:
+                    items.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            try:
+                rows = []
+                for item in items:
+                    if item is not None:
+                        rows.extend(self._rows(item))
+                if rows:
+                    with conn:
+                        conn.executemany(sql, [tuple(row[name] for name in names) for row in rows])
+                    self.written += len(rows)
+            except Exception:
+                # A locked or full database, or a bad record, loses this batch
+                # but must not stop the writer (flush() would then never return)
+                lost = sum(self._runs(item) for item in items)
+                self.dropped += lost
+                logger.exception("Run history: dropped %d runs that could not be written", lost)
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+            if None in items:
+                conn.close()
+                return
+
+    def flush(self):
+        """Wait until every queued record is written."""
+        self._queue.join()
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+
+    def query(self, filters=None, limit=100, before=None):
+        """Newest runs first: (rows, next cursor); pass the cursor as before for the next page."""
+        where, params = _where(filters or {})
+        if before is not None:
+            where += " AND id < ?"
+            params.append(int(before))
+        columns = ", ".join(name for name in COLUMNS if name != "inputs")
+        with closing(self._connect()) as conn:
+            rows = conn.execute(f"SELECT {columns} FROM runs WHERE {where} ORDER BY id DESC LIMIT ?",
+                                params + [int(limit)]).fetchall()
+        runs = [self._decode(dict(row)) for row in rows]
+        return runs, (runs[-1]["id"] if len(runs) == limit else None)
+
+    def get(self, run_id):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM runs WHERE id = ?", (int(run_id),)).fetchone()
+        return None if row is None else self._decode(dict(row))
+
+    @staticmethod
+    def _decode(run):
+        for name in ("timings", "flow_rates", "inputs"):
+            if run.get(name) is not None:
+                run[name] = json.loads(run[name])
+        return run
+
+    def _batches(self, filters, batch):
+        # Matching rows in id order, batch rows at a time, from a private connection
+        where, params = _where(filters or {})
+        conn = self._connect()
+        conn.row_factory = None
+        try:
+            cursor = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM runs WHERE {where} ORDER BY id", params)
+            while True:
+                rows = cursor.fetchmany(batch)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            conn.close()
+
+    def export_csv(self, filters=None, batch=5000):
+        """Yield CSV text (header first) a batch of rows at a time."""
+        _where(filters or {})  # bad filters raise before the header is yielded
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(COLUMNS)
+        yield buffer.getvalue()
+        for rows in self._batches(filters, batch):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(rows)
+            yield buffer.getvalue()
+
+    def export_parquet(self, filters=None, batch=20000):
+        """Yield a Parquet file's bytes, one row group per batch of rows."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        _where(filters or {})  # bad filters raise on the first next()
+        types = {name: pa.float64() for name in COLUMNS}
+        types.update({name: pa.string() for name in ("site", "engine", "engine_version", "status", "horizon",
+                                                     "timings", "flow_rates", "inputs")})
+        types["id"] = pa.int64()
+        schema = pa.schema([(name, types[name]) for name in COLUMNS])
+        sink = _Chunks()
+        writer = pq.ParquetWriter(sink, schema)
+        for rows in self._batches(filters, batch):
+            columns = list(zip(*rows))
+            writer.write_table(pa.table([pa.array(c, type=types[n]) for n, c in zip(COLUMNS, columns)],
+                                        schema=schema))
+            yield sink.take()
+        writer.close()
+        yield sink.take()
+
+    def stats(self):
+        return {"pending": self._queue.qsize(), "written": self.written, "dropped": self.dropped}
+
+
+class _Chunks(io.RawIOBase):
+    # Write-only file that hands back what was written since the last take()
+
+    def __init__(self):
+        self._parts = []
+        self._size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._size += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._size
+
+    def take(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
@@ -0,0 +1,123 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind, fn, args):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.fn = fn
+        self.args = args
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self.cancel_requested = False
+
+    def describe(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """Bounded pool of solver threads with back-pressure and result retention.
+
+    At most workers jobs run at once and at most max_pending jobs may be
+    queued or running; submit() raises QueueFull beyond that. Finished jobs
+    are kept for retention seconds so their results can be polled.
+    """
+
+    def __init__(self, workers=2, max_pending=32, retention=600.0):
+        self.max_pending = max_pending
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipelong-job")
+        self._jobs = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args):
+        job = Job(kind, fn, args)
+        with self._lock:
+            self._purge()
+            if self._pending >= self.max_pending:
+                raise QueueFull(f"Job queue is full ({self.max_pending} pending)")
+            self._pending += 1
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            self._purge()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        # Queued jobs never start; a running solve cannot be interrupted, so
+        # its result is discarded when it finishes
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in ("done", "failed", "cancelled"):
+                return job
+            job.cancel_requested = True
+            if job.future.cancel():
+                self._finish(job, "cancelled")
+        return job
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {"pending": self._pending, "max_pending": self.max_pending, "jobs": counts}
+
+    def _run(self, job):
+        with self._lock:
+            if job.cancel_requested:
+                self._finish(job, "cancelled")
+                return
+            job.status = "running"
+            job.started_at = time.time()
+        try:
+            result = job.fn(*job.args)
+        except Exception as e:
+            with self._lock:
+                job.error = str(e)
+                self._finish(job, "cancelled" if job.cancel_requested else "failed")
+            return
+        with self._lock:
+            if job.cancel_requested:
+                self._finish(job, "cancelled")
+            else:
+                job.result = result
+                self._finish(job, "done")
+
+    def _finish(self, job, status):
+        # Caller holds the lock
+        job.status = status
+        job.finished_at = time.time()
+        job.fn = job.args = None
+        self._pending -= 1
+
+    def _purge(self):
+        # Caller holds the lock
+        cutoff = time.time() - self.retention
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
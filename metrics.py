@@ -0,0 +1,193 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# =============================================================================
+# Minimal Prometheus-style metrics (text exposition format 0.0.4)
+# =============================================================================
+# Counters and histograms keyed by label values, plus gauges read from a
+# callback at scrape time. phase() times a block into the phase histogram
+# and, while a request is being timed, into that request's Server-Timing
+# entries.
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _format_labels(self.labels, key), value)
+                    for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += n
+                    le = (("le", _format_value(float(bound))),)
+                    out.append((self.name + "_bucket", _format_labels(self.labels, key, le), cumulative))
+                out.append((self.name + "_sum", _format_labels(self.labels, key), total))
+                out.append((self.name + "_count", _format_labels(self.labels, key), count))
+        return out
+
+
+class Gauge:
+    # Value read from fn at scrape time; kind="counter" for running totals
+    # kept elsewhere (e.g. cache hits)
+
+    def __init__(self, name, help, fn, kind="gauge"):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.kind = kind
+
+    def samples(self):
+        return [(self.name, "", self.fn())]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name, help, fn, kind="gauge"):
+        return self.register(Gauge(name, help, fn, kind))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+PHASE_SECONDS = registry.histogram(
+    "pipelong_phase_seconds", "Time spent in each phase of request handling", ("phase",))
+HTTP_SECONDS = registry.histogram(
+    "pipelong_http_request_seconds", "HTTP request latency", ("endpoint", "method", "status"))
+SOLVES = registry.counter(
+    "pipelong_solver_solves_total", "Solver calls by engine and final status", ("engine", "status"))
+SOLVER_SECONDS = registry.histogram(
+    "pipelong_solver_runtime_seconds", "Solver runtime as reported by the engine", ("engine",))
+SOLVER_ITERATIONS = registry.histogram(
+    "pipelong_solver_iterations", "Simplex plus barrier iterations per solve", ("engine",),
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000, 20000))
+SOLVER_NODES = registry.histogram(
+    "pipelong_solver_nodes", "Branch-and-bound nodes explored per solve", ("engine",),
+    buckets=(0, 1, 2, 5, 10, 50, 100, 1000, 10000))
+SURROGATE_LOOKUPS = registry.counter(
+    "pipelong_surrogate_lookups_total", "Surrogate table lookups by outcome (hit, outside, bound, constants)",
+    ("outcome",))
+
+_request = threading.local()
+
+
+def start_request():
+    _request.timings = {}
+    _request.started = time.perf_counter()
+
+
+def request_timings():
+    """({phase: seconds} so far, elapsed seconds) for the current request."""
+    timings = getattr(_request, "timings", None)
+    if timings is None:
+        return {}, None
+    return dict(timings), time.perf_counter() - _request.started
+
+
+def finish_request():
+    """Return (elapsed seconds, {phase: seconds}) for the current request."""
+    timings = getattr(_request, "timings", None)
+    if timings is None:
+        return None, {}
+    elapsed = time.perf_counter() - _request.started
+    _request.timings = None
+    return elapsed, timings
+
+
+@contextmanager
+def phase(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        PHASE_SECONDS.observe(elapsed, phase=name)
+        timings = getattr(_request, "timings", None)
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def server_timing(timings, total=None):
+    # Server-Timing header value; durations are in milliseconds
+    entries = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in timings.items()]
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(entries)
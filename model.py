@@ -1,137 +1,451 @@
-import pandas as pd
-import gurobipy as gp
-from gurobipy import GRB
+import numpy as np
 
-def run_model(data):
+import analytic
+import baseline
+import config
+import graph
+import solvers
+from metrics import phase
+
+# The seven site inputs posted by the dashboard form
+CLIENT_FIELDS = (
+    "client_annual_energy_conventional",
+    "client_annual_water_conventional",
+    "client_avg_IT_load",
+    "client_evaporation_rate",
+    "client_energy_cost",
+    "client_water_cost",
+    "client_ambient_temp",
+)
+
+# =============================================================================
+# Model constants shared by every request
+# =============================================================================
+MODEL_CONSTANTS = {
+    "alpha": 0.07,          # Temperature drop per meter (°C/m)
+    "T_dc_target": 27.0,    # Target data centre temperature (°C)
+    "K_well": 2000.0,       # Cooling coefficient (kW/(m³/s·°C))
+    "g": 9.81,              # gravitational acceleration (m/s²)
+    "rho": 1000.0,          # water density (kg/m³)
+    "Delta_t": 720.0,       # hours per month (~30 days)
+    "eta": 0.7,             # pump efficiency
+    "Q_max": 6.0,           # Maximum pump flow rate (m³/s)
+    "D_min": 15.0,          # Minimum well depth (m)
+    "D_max": 80.0,          # Maximum well depth (m)
+    "V_initial": 1000.0,    # Initial water fill (m³)
+}
+
+# Callbacks run after the constants change (e.g. to drop cached results)
+_constants_listeners = []
+
+
+def on_constants_changed(callback):
+    _constants_listeners.append(callback)
+    return callback
+
+
+def set_model_constants(**updates):
+    unknown = set(updates) - set(MODEL_CONSTANTS)
+    if unknown:
+        raise KeyError(f"Unknown model constants: {', '.join(sorted(unknown))}")
+    MODEL_CONSTANTS.update({name: float(value) for name, value in updates.items()})
+    for callback in _constants_listeners:
+        callback()
+
+
+# Horizon name -> (number of periods, hours per period); None keeps Delta_t
+HORIZONS = {
+    "monthly": (12, None),
+    "daily": (365, 24.0),
+    "hourly": (8760, 1.0),
+}
+ENGINE_NAMES = solvers.backend_names() + ("crosscheck",)
+
+
+def _crosscheck(reference, candidate, rtol=None):
+    # Compare the Gurobi and NumPy solutions field by field
+    rtol = config.CROSSCHECK_RTOL if rtol is None else rtol
+    report = {"engines": ["gurobi", "numpy"], "rtol": rtol, "divergences": []}
+    if reference["ok"] != candidate["ok"]:
+        report["divergences"].append({
+            "field": "status", "gurobi": reference["status"], "numpy": candidate["status"]})
+    elif reference["ok"]:
+        pairs = [("objective", reference["objective"], candidate["objective"]),
+                 ("depth", reference["depth"], candidate["depth"])]
+        pairs += [(f"flow_rate[{t}]", q_ref, q_new) for t, (q_ref, q_new)
+                  in enumerate(zip(reference["flow_rates"], candidate["flow_rates"]))]
+        for field, ref, new in pairs:
+            if abs(ref - new) > rtol * max(1.0, abs(ref)):
+                report["divergences"].append({"field": field, "gurobi": ref, "numpy": new})
+    # Depth and flow rates may legitimately differ when the optimum is not
+    # unique (e.g. zero energy cost); only status/objective mismatches count.
+    fields = {d["field"] for d in report["divergences"]}
+    report["ok"] = not fields & {"status", "objective"}
+    report["alternative_optimum"] = report["ok"] and bool(fields)
+    return report
+
+
+def _parse_site(data):
     # =============================================================================
     # PART 1: Client-Provided Data from Flask JSON
     # =============================================================================
-    client_annual_energy_conventional = float(data["client_annual_energy_conventional"])
-    client_annual_water_conventional = float(data["client_annual_water_conventional"])
-    client_avg_IT_load = float(data["client_avg_IT_load"])
-    client_evaporation_rate = float(data["client_evaporation_rate"])
-    client_energy_cost = float(data["client_energy_cost"])
-    client_water_cost = float(data["client_water_cost"])
-    client_ambient_temp = float(data["client_ambient_temp"])
-
-    # Baseline
-    conventional_cost = client_annual_energy_conventional * client_energy_cost + client_annual_water_conventional * client_water_cost
-    conventional_energy_joules = client_annual_energy_conventional * 3.6e6
-
-    T_list = list(range(12))
-    IT_Load = {t: client_avg_IT_load for t in T_list}
-
-    # Model parameters
-    T_surface = client_ambient_temp
-    alpha = 0.07
-    T_dc_target = 27.0
-    K_well = 2000.0
-    g = 9.81
-    rho = 1000.0
-    Delta_t = 720.0
-    eta = 0.7
-    Q_max = 6.0
-    D_min = 15.0
-    D_max = 80.0
-    V_initial = 1000.0
-    leakage_rate = client_evaporation_rate
-    cost_energy = client_energy_cost
-    cost_water = client_water_cost
-    B = T_dc_target - T_surface
-
-    # Optimization model
-    model = gp.Model("Optimal_Underground_Well_Yearly")
-    model.Params.LogToConsole = 0  # Silence output
-
-    Q = {}
-    z = {}
-    for t in T_list:
-        Q[t] = model.addVar(lb=0.0, ub=Q_max, name=f"Q_{t}")
-        z[t] = model.addVar(lb=0.0, ub=Q_max * D_max, name=f"z_{t}")
-
-    D = model.addVar(lb=D_min, ub=D_max, name="Depth")
-    model.update()
-
-    for t in T_list:
-        model.addConstr(K_well * (B * Q[t] + alpha * z[t]) >= IT_Load[t])
-
-    for t in T_list:
-        model.addConstr(z[t] >= D_min * Q[t])
-        model.addConstr(z[t] >= Q_max * D + Q[t] * D_max - Q_max * D_max)
-        model.addConstr(z[t] <= Q_max * D + Q[t] * D_min - Q_max * D_min)
-        model.addConstr(z[t] <= D_max * Q[t])
-    model.update()
-
-    # Objective
-    energy_expr = gp.quicksum((Q[t] * D * g * rho * Delta_t) / (1000 * eta) for t in T_list)
-    water_pumped_expr = gp.quicksum(Q[t] * Delta_t for t in T_list)
-    net_water_expr = V_initial + leakage_rate * water_pumped_expr
-    energy_cost = energy_expr * cost_energy
-    water_cost = net_water_expr * cost_water
-    total_cost = energy_cost + water_cost
-    model.setObjective(total_cost, GRB.MINIMIZE)
-    model.optimize()
-
-    if model.status != GRB.OPTIMAL:
-        return {"error": "Optimisation failed", "status": model.status}
-
-    # Final values
-    optimal_D = D.X
-    optimal_energy_new = energy_expr.getValue()
-    optimal_net_water_new = net_water_expr.getValue()
-    total_cost_new = model.ObjVal
-    savings = conventional_cost - total_cost_new
-
-    # Monthly values
-    T_well_opt = T_surface - alpha * optimal_D
-    flow_data = []
-    cum_energy = 0.0
-    cum_water = 0.0
-    energy_arr = []
-    water_arr = []
-
-    for t in T_list:
-        q = Q[t].X
-        energy_t = (q * optimal_D * g * rho * Delta_t) / (1000 * eta)
-        cum_energy += energy_t
-        pumped = q * Delta_t
-        cum_water += leakage_rate * pumped
-        energy_arr.append(cum_energy)
-        water_arr.append(V_initial + cum_water)
-
-        T_dc_est = T_well_opt + IT_Load[t] / (K_well * q) if q > 1e-6 else None
-        flow_data.append({
-            "month": t,
-            "flow_rate": q,
-            "energy": energy_t,
-            "estimated_T_dc": T_dc_est
-        })
-
-    # For plotting
-    try:
-        df_conv = pd.read_csv("conventional_datacentre_year.csv")
-        df_conv['Cumulative_Water_Usage'] = df_conv['Makeup_Water_Usage_m3'].cumsum()
-        df_conv['Cumulative_Energy'] = df_conv['Pump_Energy_kWh'].cumsum()
-        time = df_conv['Time'].tolist()
-        conv_energy = df_conv['Cumulative_Energy'].tolist()
-        conv_water = df_conv['Cumulative_Water_Usage'].tolist()
-    except:
-        time, conv_energy, conv_water = [], [], []
+    site = {field: float(data[field]) for field in CLIENT_FIELDS}
+
+    # Optional horizon with per-period IT-load and ambient-temperature profiles;
+    # without them every period uses the client's averages
+    horizon = data.get("horizon", "monthly")
+    if horizon not in HORIZONS:
+        raise ValueError(f"Unknown horizon '{horizon}' (expected one of: {', '.join(HORIZONS)})")
+    n_periods = HORIZONS[horizon][0]
+    site["horizon"] = horizon
+    site["it_load"] = _profile(data.get("it_load"), site["client_avg_IT_load"], n_periods, "it_load")
+    site["ambient_temp"] = _profile(data.get("ambient_temp"), site["client_ambient_temp"], n_periods, "ambient_temp")
+    return site
+
+
+def _profile(values, default, n_periods, name):
+    if values is None:
+        return np.full(n_periods, default)
+    values = np.asarray(values, dtype=float)
+    if values.shape != (n_periods,):
+        raise ValueError(f"'{name}' must have {n_periods} values for this horizon, got {values.size}")
+    return values
+
+
+def _horizon_constants(site, constants=None):
+    # Period length in hours comes from the horizon (monthly keeps Delta_t)
+    constants = constants or MODEL_CONSTANTS
+    hours = HORIZONS[site["horizon"]][1]
+    if hours is None:
+        return constants
+    return dict(constants, Delta_t=hours)
+
+
+def _engine_args(site, constants=None):
+    T_surface = site["ambient_temp"]
+    B = (constants or MODEL_CONSTANTS)["T_dc_target"] - T_surface
+    return (B, T_surface, site["it_load"].tolist(), site["client_energy_cost"],
+            site["client_water_cost"], site["client_evaporation_rate"])
 
+
+def _baseline_series():
+    # For plotting: the conventional baseline, preloaded by the dataset store
+    df_conv = baseline.store.get("conventional")
+    if df_conv is None:
+        return [], [], []
+    time = df_conv.as_list('Time')
+    conv_energy = df_conv.as_list('Cumulative_Energy')
+    conv_water = df_conv.as_list('Cumulative_Water_Usage')
+    return time, conv_energy, conv_water
+
+
+def _period_series(sites, depth, flow, horizon="monthly", constants=None):
+    """Per-period energy, cumulative energy and water, and estimated T_dc.
+
+    sites maps "client_evaporation_rate" to a (rows,) array and "it_load"
+    and "ambient_temp" to (rows, periods) profiles; depth is (rows,) and
+    flow is (rows, periods). constants defaults to MODEL_CONSTANTS.
+    Returns (rows, periods) arrays.
+    """
+    constants = _horizon_constants({"horizon": horizon}, constants)
+    alpha = constants["alpha"]
+    K_well = constants["K_well"]
+    Delta_t = constants["Delta_t"]
+    k_energy = constants["g"] * constants["rho"] * Delta_t / (1000 * constants["eta"])
+    leakage_rate = sites["client_evaporation_rate"][:, None]
+
+    energy = flow * depth[:, None] * k_energy
+    cum_energy = np.cumsum(energy, axis=1)
+    cum_water = constants["V_initial"] + np.cumsum(leakage_rate * flow * Delta_t, axis=1)
+    T_well_opt = sites["ambient_temp"] - alpha * depth[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        T_dc_est = T_well_opt + sites["it_load"] / (K_well * flow)
+    T_dc_est = np.where(flow > 1e-6, T_dc_est, np.nan)
+    return energy, cum_energy, cum_water, T_dc_est
+
+
+def _period_fields(i, flow, energy, cum_energy, cum_water, T_dc_est, horizon="monthly"):
+    # Result fields of row i that come from the per-period series
+    period_key = "month" if horizon == "monthly" else "period"
+    T_dc_row = [None if np.isnan(v) else v for v in T_dc_est[i].tolist()]
     return {
-        "optimal_energy_new": optimal_energy_new,
-        "optimal_energy_joules": optimal_energy_new * 3.6e6,
-        "optimal_net_water_new": optimal_net_water_new,
-        "total_cost_new": total_cost_new,
-        "client_annual_energy_conventional": client_annual_energy_conventional,
-        "conventional_energy_joules": conventional_energy_joules,
-        "client_annual_water_conventional": client_annual_water_conventional,
-        "conventional_cost": conventional_cost,
-        "savings": savings,
-        "flow_data": flow_data,
-        "cumulative_energy": energy_arr,
-        "cumulative_water": water_arr,
-        "conventional_energy": conv_energy,
-        "conventional_water": conv_water,
-        "months": time
+        "optimal_energy_new": float(cum_energy[i, -1]),
+        "optimal_energy_joules": float(cum_energy[i, -1]) * 3.6e6,
+        "optimal_net_water_new": float(cum_water[i, -1]),
+        "flow_data": [
+            {period_key: t, "flow_rate": q, "energy": e, "estimated_T_dc": T_dc}
+            for t, q, e, T_dc in zip(range(flow.shape[1]), flow[i].tolist(), energy[i].tolist(), T_dc_row)
+        ],
+        "cumulative_energy": cum_energy[i].tolist(),
+        "cumulative_water": cum_water[i].tolist(),
     }
+
+
+def _comparison_fields(sites, objective):
+    # Per-row fields comparing the conventional plant with the optimised cost
+    energy_conv = sites["client_annual_energy_conventional"]
+    water_conv = sites["client_annual_water_conventional"]
+    conventional_cost = energy_conv * sites["client_energy_cost"] + water_conv * sites["client_water_cost"]
+    conventional_energy_joules = energy_conv * 3.6e6
+    return [
+        {
+            "total_cost_new": float(objective[i]),
+            "client_annual_energy_conventional": float(energy_conv[i]),
+            "conventional_energy_joules": float(conventional_energy_joules[i]),
+            "client_annual_water_conventional": float(water_conv[i]),
+            "conventional_cost": float(conventional_cost[i]),
+            "savings": float(conventional_cost[i] - objective[i]),
+        }
+        for i in range(len(objective))
+    ]
+
+
+def _baseline_fields(baseline):
+    time, conv_energy, conv_water = baseline
+    return {"conventional_energy": conv_energy, "conventional_water": conv_water, "months": time}
+
+
+# Field order of a run_model result
+RESULT_FIELDS = (
+    "optimal_energy_new", "optimal_energy_joules", "optimal_net_water_new", "total_cost_new",
+    "client_annual_energy_conventional", "conventional_energy_joules",
+    "client_annual_water_conventional", "conventional_cost", "savings", "flow_data",
+    "cumulative_energy", "cumulative_water", "conventional_energy", "conventional_water", "months",
+)
+
+
+def _assemble(periods, comparison, baseline, horizon="monthly"):
+    parts = {**periods, **comparison, **baseline}
+    result = {field: parts[field] for field in RESULT_FIELDS}
+    if horizon != "monthly":
+        result["horizon"] = horizon
+    return result
+
+
+def _build_results(sites, depth, flow, objective, baseline, horizon="monthly"):
+    """Turn solved rows into run_model result dicts.
+
+    sites maps each client field to a (rows,) array and "it_load" and
+    "ambient_temp" to (rows, periods) profiles; depth and objective are
+    (rows,) and flow is (rows, periods). All per-period post-processing is
+    done on whole arrays before the per-row dicts are assembled.
+    """
+    series = _period_series(sites, depth, flow, horizon)
+    comparison = _comparison_fields(sites, objective)
+    baseline = _baseline_fields(baseline)
+    return [_assemble(_period_fields(i, flow, *series, horizon), comparison[i], baseline, horizon)
+            for i in range(len(depth))]
+
+
+def _stack_sites(sites):
+    # List of parsed sites (same horizon) -> dict of (rows,) / (rows, periods) arrays
+    stacked = {field: np.array([site[field] for site in sites]) for field in CLIENT_FIELDS}
+    stacked["it_load"] = np.stack([site["it_load"] for site in sites])
+    stacked["ambient_temp"] = np.stack([site["ambient_temp"] for site in sites])
+    return stacked
+
+
+def _solve(engine, site, constants=None):
+    constants = _horizon_constants(site, constants)
+    args = _engine_args(site, constants)
+    if engine not in ENGINE_NAMES:
+        raise ValueError(f"Unknown engine '{engine}' (expected one of: {', '.join(ENGINE_NAMES)})")
+    if engine == "crosscheck":
+        solution = solvers.get_backend("gurobi")(*args, constants=constants)
+        solution["crosscheck"] = _crosscheck(solution, solvers.solve_numpy(*args, constants=constants))
+        return solution
+    return solvers.get_backend(engine)(*args, constants=constants)
+
+
+# =============================================================================
+# run_model as a graph of stages
+# =============================================================================
+# Each stage names the inputs it reads, so with a per-session graph.Memo a
+# what-if edit only recomputes what depends on the edited fields: changing
+# the conventional energy or water, for example, reuses the solve and the
+# per-period series and only redoes the cost comparison.
+
+def _stage_solve(v, r):
+    # "solve" spans the engine's own build/optimize/extract phases
+    if v["surrogate"] is not None:
+        solution = v["surrogate"].solve(v, v["constants"])
+        if solution is not None:
+            return solution
+    return _solve(v["engine"], v, v["constants"])
+
+
+def _stage_periods(v, r):
+    solution = r["solve"]
+    flow = np.array([solution["flow_rates"]])
+    sites = {"client_evaporation_rate": np.array([v["client_evaporation_rate"]]),
+             "it_load": v["it_load"][None], "ambient_temp": v["ambient_temp"][None]}
+    series = _period_series(sites, np.array([solution["depth"]]), flow, v["horizon"], v["constants"])
+    return _period_fields(0, flow, *series, v["horizon"])
+
+
+# Client fields the cost comparison reads
+_COMPARISON_INPUTS = ("client_annual_energy_conventional", "client_annual_water_conventional",
+                      "client_energy_cost", "client_water_cost")
+
+
+def _stage_comparison(v, r):
+    sites = {field: np.array([v[field]]) for field in _COMPARISON_INPUTS}
+    return _comparison_fields(sites, np.array([r["solve"]["objective"]]))[0]
+
+
+def _stage_baseline(v, r):
+    return _baseline_fields(_baseline_series())
+
+
+_GRAPH = graph.Graph([
+    graph.Stage("solve", _stage_solve,
+                inputs=("engine", "surrogate", "constants", "horizon", "it_load", "ambient_temp",
+                        "client_evaporation_rate", "client_energy_cost", "client_water_cost")),
+    graph.Stage("periods", _stage_periods, after=("solve",),
+                inputs=("constants", "horizon", "it_load", "ambient_temp", "client_evaporation_rate")),
+    graph.Stage("comparison", _stage_comparison, after=("solve",), inputs=_COMPARISON_INPUTS),
+    graph.Stage("baseline", _stage_baseline, inputs=("baseline_version",)),
+])
+
+
+def _baseline_version():
+    dataset = baseline.store.get("conventional")
+    return dataset.mtime if dataset is not None else None
+
+
+# Surrogate table (surrogate.Table) answering flat monthly queries, if loaded
+_surrogate = None
+
+
+def set_surrogate(table):
+    global _surrogate
+    _surrogate = table
+
+
+def _flat_monthly(site):
+    return (site["horizon"] == "monthly"
+            and np.all(site["it_load"] == site["client_avg_IT_load"])
+            and np.all(site["ambient_temp"] == site["client_ambient_temp"]))
+
+
+def run_model(data, engine=None, memo=None):
+    """Solve one site; memo (a graph.Memo) reuses stages from earlier calls.
+
+    Without an explicit engine, flat monthly sites are first looked up in the
+    surrogate table, if one is loaded; the engine solves what it declines.
+    """
+    with phase("parse"):
+        values = _parse_site(data)
+    explicit = engine or data.get("engine")
+    values["engine"] = explicit or config.ENGINE
+    values["surrogate"] = (_surrogate if _surrogate is not None and not explicit
+                           and values["engine"] != "crosscheck" and _flat_monthly(values) else None)
+    values["constants"] = dict(MODEL_CONSTANTS)
+    values["baseline_version"] = _baseline_version()
+
+    memo = memo if memo is not None else graph.Memo()
+    stages, _ = _GRAPH.evaluate(values, memo, ["solve"])
+    solution = stages["solve"]
+    if not solution["ok"]:
+        return {"error": "Optimisation failed", "status": solution["status"], "engine": solution["engine"]}
+    stages, _ = _GRAPH.evaluate(values, memo)
+
+    with phase("results"):
+        results = _assemble(stages["periods"], stages["comparison"], stages["baseline"], values["horizon"])
+    for extra in ("crosscheck", "surrogate"):
+        if extra in solution:
+            results[extra] = solution[extra]
+    return results
+
+
+def batch_rows(payload):
+    # A batch is a list of input dicts or a dict of equal-length columns
+    if isinstance(payload, list):
+        return payload
+    columns = {field: list(values) for field, values in payload.items()}
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError("All columns in a columnar batch must have the same length")
+    n_rows = lengths.pop() if lengths else 0
+    return [{field: values[i] for field, values in columns.items()} for i in range(n_rows)]
+
+
+def _solve_group(engine, sites):
+    # Solve parsed sites sharing one horizon; returns arrays plus per-row solutions
+    n_rows, n_periods = len(sites), len(sites[0]["it_load"])
+    if engine == "numpy":
+        stacked = _stack_sites(sites)
+        depth, flow, objective, feasible = analytic.solve_well(
+            stacked["it_load"], stacked["ambient_temp"], stacked["client_energy_cost"],
+            stacked["client_water_cost"], stacked["client_evaporation_rate"],
+            _horizon_constants(sites[0]))
+        solutions = [
+            {"ok": True, "status": "optimal", "engine": "numpy"} if ok
+            else {"ok": False, "status": "infeasible", "engine": "numpy"}
+            for ok in feasible
+        ]
+        return depth, flow, objective, solutions
+
+    depth = np.zeros(n_rows)
+    flow = np.zeros((n_rows, n_periods))
+    objective = np.zeros(n_rows)
+    solutions = []
+    for j, site in enumerate(sites):
+        try:
+            solution = _solve(engine, site)
+        except Exception as e:
+            solution = {"ok": False, "error": str(e)}
+        if solution["ok"]:
+            depth[j], flow[j], objective[j] = solution["depth"], solution["flow_rates"], solution["objective"]
+        solutions.append(solution)
+    return depth, flow, objective, solutions
+
+
+def run_model_batch(payload, engine=None, max_items=None):
+    """Solve many sites in one call.
+
+    Returns one entry per input row, in input order; rows that cannot be
+    parsed or solved get an {"error": ...} entry instead of failing the batch.
+    The numpy engine solves all rows of a horizon in one vectorised call; the
+    other engines solve row by row on a pooled model template (see solvers).
+    """
+    rows = batch_rows(payload)
+    if max_items is not None and len(rows) > max_items:
+        raise ValueError(f"Batch of {len(rows)} items exceeds the limit of {max_items}")
+    engine = engine or config.ENGINE
+    if engine not in ENGINE_NAMES:
+        raise ValueError(f"Unknown engine '{engine}' (expected one of: {', '.join(ENGINE_NAMES)})")
+    # An engine missing on this box fails the whole batch up front
+    solvers.get_backend("gurobi" if engine == "crosscheck" else engine)
+
+    results = [None] * len(rows)
+    groups = {}
+    for i, row in enumerate(rows):
+        try:
+            site = _parse_site(row)
+        except KeyError as e:
+            results[i] = {"error": f"Missing field: {e}"}
+            continue
+        except (TypeError, ValueError) as e:
+            results[i] = {"error": f"Invalid input: {e}"}
+            continue
+        groups.setdefault(site["horizon"], []).append((i, site))
+
+    baseline_series = _baseline_series()
+    for horizon, members in groups.items():
+        index = [i for i, _ in members]
+        sites = [site for _, site in members]
+        depth, flow, objective, solutions = _solve_group(engine, sites)
+        built = _build_results(_stack_sites(sites), depth, flow, objective, baseline_series, horizon)
+        for j, i in enumerate(index):
+            solution = solutions[j]
+            if "error" in solution:
+                results[i] = {"error": solution["error"]}
+            elif not solution["ok"]:
+                results[i] = {"error": "Optimisation failed", "status": solution["status"],
+                              "engine": solution["engine"]}
+            else:
+                results[i] = built[j]
+                if "crosscheck" in solution:
+                    results[i]["crosscheck"] = solution["crosscheck"]
+    return results
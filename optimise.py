@@ -0,0 +1,296 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+import config
+import solvers
+from model import CLIENT_FIELDS, ENGINE_NAMES, MODEL_CONSTANTS
+from sweep import _solve_cells
+
+# =============================================================================
+# Headless batch optimisation of a scenarios file
+# =============================================================================
+# Every row of a CSV or Parquet file holding the seven client_* columns is
+# solved with the monthly well model, on the same engines as run_model:
+#
+#   python optimise.py sites.csv -o results/                 # solve every row
+#   python optimise.py sites.csv -o results/                 # rerun: resumes
+#   python optimise.py sites.csv -o results/ --restart       # discard, start over
+#   python optimise.py sites.csv -o results/ --plot plots/   # plus PNG charts
+#
+# Rows are read in chunks and spread over a process pool; each finished
+# chunk is written as its own columnar part (Parquet when pyarrow is
+# installed, else .npz) and recorded in checkpoint.json, so an interrupted
+# run picks up at the first unfinished chunk. Part files with no checkpoint
+# beside them are left alone unless --restart is given.
+
+CHECKPOINT = "checkpoint.json"
+OUTPUT_FIELDS = ("ok", "depth", "total_cost", "savings", "energy", "net_water")
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _input_chunks(path, chunk_rows, columns):
+    # (chunk number, first row, DataFrame) in file order; Parquet batches may
+    # be shorter than chunk_rows at row-group boundaries
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns)
+        chunks = (batch.to_pandas() for batch in batches)
+    else:
+        chunks = pd.read_csv(path, chunksize=chunk_rows, usecols=columns)
+    start = 0
+    for chunk, frame in enumerate(chunks):
+        yield chunk, start, frame
+        start += len(frame)
+
+
+def _solve_chunk(engine, start, frame, id_column=None):
+    """Solve one chunk of rows; returns its output columns."""
+    columns = {field: frame[field].to_numpy(dtype=float) for field in CLIENT_FIELDS}
+    valid = np.all([np.isfinite(v) for v in columns.values()], axis=0)
+    out = _solve_cells(engine, {k: np.where(valid, v, 1.0) for k, v in columns.items()},
+                       dict(MODEL_CONSTANTS), flows=True)
+
+    result = {"row": np.arange(start, start + len(frame))}
+    if id_column is not None:
+        ids = frame[id_column].to_numpy()
+        # Text ids as a fixed-width string array (.npz will not load objects)
+        result[id_column] = ids.astype(str) if ids.dtype == object else ids
+    result.update(columns)
+    feasible = out["feasible"] & valid
+    result["ok"] = feasible
+    result["status"] = np.where(valid, np.where(feasible, "optimal", "infeasible"), "invalid")
+    for name in OUTPUT_FIELDS[1:]:
+        result[name] = np.where(feasible, out[name], np.nan)
+    flow = np.where(feasible[:, None], out["flow"], np.nan)
+    result.update({f"flow_{t:02d}": flow[:, t] for t in range(flow.shape[1])})
+    return result
+
+
+def _write_part(directory, chunk, columns, fmt):
+    # Written beside its final name and renamed, so a part is whole or absent
+    path = os.path.join(directory, f"part-{chunk:06d}.{fmt}")
+    tmp = path + ".tmp"
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        pq.write_table(pa.table(columns), tmp)
+    else:
+        with open(tmp, "wb") as f:
+            np.savez(f, **columns)
+    os.replace(tmp, path)
+    return path
+
+
+def _save_checkpoint(directory, state):
+    path = os.path.join(directory, CHECKPOINT)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def _load_checkpoint(directory, settings, restart):
+    """Finished chunk numbers from an earlier run with the same settings."""
+    path = os.path.join(directory, CHECKPOINT)
+    ours = sorted(name for name in os.listdir(directory) if name.startswith("part-") or name == CHECKPOINT)
+    if not restart and ours and not os.path.exists(path):
+        # Part files without a checkpoint are not from a run we can resume
+        # (or the wrong directory was given): never delete them unasked
+        shown = ", ".join(ours[:10]) + (f" and {len(ours) - 10} more" if len(ours) > 10 else "")
+        raise ValueError(f"{directory} holds part files but no {CHECKPOINT}; "
+                         f"--restart would remove {shown}")
+    if restart or not os.path.exists(path):
+        for name in ours:
+            os.remove(os.path.join(directory, name))
+        return set()
+    with open(path) as f:
+        state = json.load(f)
+    changed = [k for k, v in settings.items() if state.get("settings", {}).get(k) != v]
+    if changed:
+        raise ValueError(f"{directory} holds a run with different {', '.join(changed)}; "
+                         "use another output directory or --restart")
+    return set(state["done"])
+
+
+def _read_parts(directory, columns):
+    # The named columns of every part, concatenated in row order
+    parts = sorted(name for name in os.listdir(directory)
+                   if name.startswith("part-") and not name.endswith(".tmp"))
+    loaded = []
+    for name in parts:
+        path = os.path.join(directory, name)
+        if name.endswith(".parquet"):
+            frame = pd.read_parquet(path, columns=list(columns))
+            loaded.append({c: frame[c].to_numpy() for c in columns})
+        else:
+            with np.load(path) as npz:
+                loaded.append({c: npz[c] for c in columns})
+    return {c: np.concatenate([part[c] for part in loaded]) if loaded else np.empty(0) for c in columns}
+
+
+def summarise(directory):
+    columns = _read_parts(directory, ("ok", "savings", "depth"))
+    ok = columns["ok"].astype(bool)
+    savings = columns["savings"][ok]
+    return {
+        "rows": int(ok.size),
+        "feasible": int(ok.sum()),
+        "mean_savings": float(savings.mean()) if savings.size else None,
+        "p50_savings": float(np.median(savings)) if savings.size else None,
+        "mean_depth": float(columns["depth"][ok].mean()) if savings.size else None,
+    }
+
+
+def plot(directory, plot_dir, max_points=20000):
+    """Savings and depth histograms and savings against ambient temperature, as PNGs."""
+    try:
+        import matplotlib
+    except ImportError:
+        raise ValueError("--plot needs matplotlib")
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    os.makedirs(plot_dir, exist_ok=True)
+    columns = _read_parts(directory, ("ok", "savings", "depth", "client_ambient_temp"))
+    ok = columns["ok"].astype(bool)
+    written = []
+    for name, label in (("savings", "Annual cost savings ($)"), ("depth", "Optimal well depth (m)")):
+        fig, ax = plt.subplots(figsize=(10, 6))
+        ax.hist(columns[name][ok], bins=50)
+        ax.set_xlabel(label)
+        ax.set_ylabel("Sites")
+        ax.grid(True)
+        written.append(os.path.join(plot_dir, f"{name}.png"))
+        fig.savefig(written[-1])
+        plt.close(fig)
+
+    idx = np.flatnonzero(ok)
+    if idx.size > max_points:
+        idx = np.random.default_rng(0).choice(idx, max_points, replace=False)
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.scatter(columns["client_ambient_temp"][idx], columns["savings"][idx], s=4, alpha=0.5)
+    ax.set_xlabel("Ambient temperature (°C)")
+    ax.set_ylabel("Annual cost savings ($)")
+    ax.grid(True)
+    written.append(os.path.join(plot_dir, "savings_vs_ambient.png"))
+    fig.savefig(written[-1])
+    plt.close(fig)
+    return written
+
+
+def run(path, output, engine=None, workers=None, chunk_rows=None, fmt="auto", id_column=None,
+        restart=False, progress=None):
+    """Solve every row of path into output/, resuming from its checkpoint."""
+    engine = engine or config.ENGINE
+    if engine == "crosscheck":
+        engine = "gurobi"
+    solvers.get_backend(engine)
+    workers = config.OPTIMISE_WORKERS if workers is None else workers
+    chunk_rows = chunk_rows or config.OPTIMISE_CHUNK_ROWS
+    if fmt == "auto":
+        fmt = "parquet" if _has_pyarrow() else "npz"
+
+    os.makedirs(output, exist_ok=True)
+    stat = os.stat(path)
+    settings = {"input": os.path.abspath(path), "input_size": stat.st_size, "input_mtime": stat.st_mtime,
+                "engine": engine, "chunk_rows": chunk_rows, "format": fmt, "id_column": id_column,
+                "constants": dict(MODEL_CONSTANTS)}
+    done = _load_checkpoint(output, settings, restart)
+    state = {"settings": settings, "done": sorted(done), "complete": False}
+    columns = list(CLIENT_FIELDS) + ([id_column] if id_column else [])
+
+    started = time.perf_counter()
+    solved = 0
+
+    def finished(chunk, result):
+        nonlocal solved
+        _write_part(output, chunk, result, fmt)
+        done.add(chunk)
+        solved += len(result["row"])
+        state["done"] = sorted(done)
+        _save_checkpoint(output, state)
+        if progress is not None:
+            progress(len(done), solved, time.perf_counter() - started)
+
+    pending = (item for item in _input_chunks(path, chunk_rows, columns) if item[0] not in done)
+    if workers <= 1:
+        for chunk, start, frame in pending:
+            finished(chunk, _solve_chunk(engine, start, frame, id_column))
+    else:
+        # At most two chunks per worker in flight, so memory stays flat on huge files
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            running = {}
+            for chunk, start, frame in pending:
+                if len(running) >= 2 * workers:
+                    ready, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in ready:
+                        finished(running.pop(future), future.result())
+                running[pool.submit(_solve_chunk, engine, start, frame, id_column)] = chunk
+            for future in wait(running).done:
+                finished(running[future], future.result())
+        finally:
+            # Unfinished chunks are simply solved again on the next run
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    state["complete"] = True
+    state["summary"] = summarise(output)
+    _save_checkpoint(output, state)
+    return dict(state["summary"], solved=solved, elapsed=time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve every row of a scenarios file (CSV or Parquet)")
+    parser.add_argument("input", help="file with one site per row and the client_* columns")
+    parser.add_argument("-o", "--output", required=True, help="directory for result parts and the checkpoint")
+    parser.add_argument("--engine", choices=ENGINE_NAMES, help=f"solver backend (default {config.ENGINE})")
+    parser.add_argument("--workers", type=int, help="solver processes (1 solves in this process)")
+    parser.add_argument("--chunk-rows", type=int, help="rows per chunk, part file and checkpoint step")
+    parser.add_argument("--format", default="auto", choices=("auto", "parquet", "npz"),
+                        help="part format (auto: Parquet when pyarrow is installed)")
+    parser.add_argument("--id-column", help="input column copied to the output to identify rows")
+    parser.add_argument("--restart", action="store_true", help="discard an earlier run in the output directory")
+    parser.add_argument("--plot", metavar="DIR", help="also write PNG charts of the results to DIR")
+    parser.add_argument("-q", "--quiet", action="store_true")
+    args = parser.parse_args(argv)
+
+    def progress(chunks, rows, elapsed):
+        print(f"\r{chunks} chunks, {rows} rows solved ({rows / max(elapsed, 1e-9):.0f} rows/s)",
+              end="", file=sys.stderr, flush=True)
+
+    try:
+        report = run(args.input, args.output, args.engine, args.workers, args.chunk_rows, args.format,
+                     args.id_column, args.restart, None if args.quiet else progress)
+        if not args.quiet:
+            print(file=sys.stderr)
+        print(json.dumps(report, indent=2))
+        if args.plot:
+            for path in plot(args.output, args.plot):
+                print(f"Wrote {path}")
+    except (OSError, ValueError, solvers.BackendUnavailable) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        print(f"\nInterrupted; run the same command again to resume from {args.output}", file=sys.stderr)
+        return 130
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
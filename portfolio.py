@@ -0,0 +1,283 @@
+import time
+
+import numpy as np
+
+import analytic
+from model import _horizon_constants, _parse_site, _stack_sites
+
+# =============================================================================
+# Multi-site portfolio optimisation by price (Lagrangian) decomposition
+# =============================================================================
+# Sites are coupled only through shared budgets:
+#
+#   sum_i net_water_i <= water_cap        (price lam, $ per m³)
+#   sum_i D_i         <= depth_budget     (price mu,  $ per m)
+#
+# Pricing the budgets into each site's objective makes the sites independent:
+# a water price simply raises the site's water cost and a depth price adds a
+# linear term in D, both of which the closed-form engine handles directly.
+# Every pricing round is therefore one vectorised solve over all sites, and
+# total work grows linearly with the number of sites. Prices are found by
+# bisection on each budget (resource use never increases with its price).
+
+_PRICE_RTOL = 1e-3
+_PRICE_CAP = 1e12
+_FILL_ROUNDS = 8
+
+
+class BudgetUnmet(ValueError):
+    pass
+
+
+class _Sites:
+    def __init__(self, sites):
+        self.sites = sites
+        self.groups = {}
+        for i, site in enumerate(sites):
+            self.groups.setdefault(site["horizon"], []).append(i)
+        self.groups = {h: np.asarray(idx) for h, idx in self.groups.items()}
+        self.stacked = {h: _stack_sites([sites[i] for i in idx]) for h, idx in self.groups.items()}
+        self.constants = {h: _horizon_constants({"horizon": h}) for h in self.groups}
+
+    def respond(self, lam, mu, depth_cap=None):
+        """Each site's optimal plan at water price lam and depth price mu.
+
+        depth_cap optionally limits each site's depth (an array over all sites).
+        """
+        n = len(self.sites)
+        out = {"depth": np.zeros(n), "net_water": np.zeros(n), "cost": np.zeros(n),
+               "energy": np.zeros(n), "feasible": np.zeros(n, dtype=bool), "flow": [None] * n}
+        for horizon, idx in self.groups.items():
+            s = self.stacked[horizon]
+            c = self.constants[horizon]
+            depth, flow, total, feasible = analytic.solve_well(
+                s["it_load"], s["ambient_temp"], s["client_energy_cost"],
+                s["client_water_cost"] + lam, s["client_evaporation_rate"], c, depth_cost=mu,
+                depth_cap=None if depth_cap is None else depth_cap[idx])
+            pumped = flow.sum(axis=1) * c["Delta_t"]
+            net_water = c["V_initial"] + s["client_evaporation_rate"] * pumped
+            energy = flow.sum(axis=1) * depth * c["g"] * c["rho"] * c["Delta_t"] / (1000 * c["eta"])
+            out["depth"][idx] = depth
+            out["net_water"][idx] = net_water
+            out["cost"][idx] = total - lam * net_water - mu * depth
+            out["energy"][idx] = energy
+            out["feasible"][idx] = feasible
+            for j, i in enumerate(idx):
+                out["flow"][i] = flow[j]
+        return out
+
+
+def _merge(plan, other, take):
+    # Plan with the sites in mask take replaced by those of other
+    merged = {k: np.where(take, other[k], plan[k]) for k in plan if k != "flow"}
+    merged["flow"] = [o if t else p for p, o, t in zip(plan["flow"], other["flow"], take)]
+    return merged
+
+
+def _price(respond, usage, limit, name, start=None):
+    """Smallest price (to _PRICE_RTOL) at which usage fits the limit.
+
+    respond(price) returns a plan, or None if no plan exists at that price
+    (treated as the price being too high). Usage never increases with the
+    price, so the price is found by bracketing and bisection; start is a
+    previous price to bracket around. Returns the price, a plan that fits
+    the limit and the last plan seen that overused it (None if the limit
+    does not bind).
+    """
+    if limit is None or start is None:
+        plan = respond(0.0)
+        if plan is None:
+            raise BudgetUnmet(f"No feasible plan for the {name}")
+        if limit is None or usage(plan) <= limit:
+            return 0.0, plan, None
+        lo, over, hi, grow = 0.0, plan, 1.0, 4.0
+    else:
+        lo, over, hi, grow = None, None, start, 1.02
+
+    # Bracket: lo overuses the limit; hi either fits or is too high. A warm
+    # bracket starts narrow and widens geometrically.
+    plan_hi = respond(hi)
+    while plan_hi is not None and usage(plan_hi) > limit:
+        lo, over = hi, plan_hi
+        hi, grow = hi * grow, min(grow * grow, 4.0)
+        if hi > _PRICE_CAP:
+            raise BudgetUnmet(f"The {name} cannot be met")
+        plan_hi = respond(hi)
+    while lo is None:
+        mid, grow = hi / grow, min(grow * grow, 4.0)
+        if mid < _PRICE_RTOL:
+            mid = 0.0
+        plan_mid = respond(mid)
+        if plan_mid is not None and usage(plan_mid) > limit:
+            lo, over = mid, plan_mid
+        elif mid == 0.0:
+            if plan_mid is None:
+                raise BudgetUnmet(f"No feasible plan for the {name}")
+            return 0.0, plan_mid, None
+        else:
+            hi, plan_hi = mid, plan_mid
+
+    best = (hi, plan_hi) if plan_hi is not None else None
+    while hi - lo > _PRICE_RTOL * max(1.0, hi):
+        mid = 0.5 * (lo + hi)
+        plan_mid = respond(mid)
+        if plan_mid is not None and usage(plan_mid) > limit:
+            lo, over = mid, plan_mid
+        else:
+            hi = mid
+            if plan_mid is not None:
+                best = (mid, plan_mid)
+    if best is None:
+        raise BudgetUnmet(f"The {name} cannot be met together with the other budget")
+    return best[0], best[1], over
+
+
+def _repair(plan, candidates, limits):
+    """Greedily move sites to a cheaper candidate plan while budgets hold.
+
+    Near the dual prices sites switch between plans discontinuously (the
+    site problems are nonconvex), so the priced plan usually leaves slack;
+    limits maps a plan key ("net_water", "depth") to its budget.
+    """
+    for other in candidates:
+        if other is None:
+            continue
+        gain = plan["cost"] - other["cost"]
+        extra = {key: other[key] - plan[key] for key in limits}
+        scale = sum(np.maximum(extra[key], 0.0) / max(abs(limit), 1e-12)
+                    for key, limit in limits.items())
+        order = np.argsort(-gain / np.maximum(scale, 1e-300))
+        used = {key: plan[key].sum() for key in limits}
+        take = np.zeros(len(gain), dtype=bool)
+        for i in order:
+            if gain[i] <= 0.0 or not other["feasible"][i]:
+                continue
+            if all(used[key] + extra[key][i] <= limit for key, limit in limits.items()):
+                take[i] = True
+                for key in limits:
+                    used[key] += extra[key][i]
+        plan = _merge(plan, other, take)
+    return plan
+
+
+def _fill_depth(sites, plan, lam, depth_budget, limits):
+    # Spend leftover depth on the sites that gain most per metre, re-solving
+    # each with its depth capped at its current depth plus the slack
+    for _ in range(_FILL_ROUNDS):
+        slack = depth_budget - plan["depth"].sum()
+        if slack <= _PRICE_RTOL * max(1.0, abs(depth_budget)):
+            break
+        deeper = sites.respond(lam, 0.0, plan["depth"] + slack)
+        repaired = _repair(plan, [deeper], limits)
+        if repaired["cost"].sum() >= plan["cost"].sum():
+            break
+        plan = repaired
+    return plan
+
+
+def optimise_portfolio(site_inputs, water_cap=None, depth_budget=None):
+    """Choose depth and flow plans for N sites under shared budgets.
+
+    site_inputs are /run-model style dicts (optionally with a "site_id").
+    Returns per-site results and, for each coupling budget, its limit, use
+    and dual price; "gap" bounds how far the plan may be from the optimum.
+    """
+    started = time.perf_counter()
+    if not site_inputs:
+        raise ValueError("A portfolio needs at least one site")
+    sites = _Sites([_parse_site(data) for data in site_inputs])
+
+    def water_used(plan):
+        return plan["net_water"].sum()
+
+    def depth_used(plan):
+        return plan["depth"].sum()
+
+    # Nested bisection on the two prices: for each depth price the water
+    # price is the smallest one that meets the water cap; the depth price is
+    # then the smallest one whose (water-priced) plans meet the depth budget.
+    # A depth price at which the water cap cannot be met counts as too high.
+    # Each inner search starts from the previous water price.
+    water_prices = {}
+    water_errors = {}
+    last_lam = [None]
+
+    def water_priced(mu):
+        try:
+            lam, plan, over = _price(lambda p: sites.respond(p, mu), water_used, water_cap,
+                                     "water cap", start=last_lam[0])
+        except BudgetUnmet as e:
+            water_errors[mu] = e
+            return None
+        if lam > 0.0:
+            last_lam[0] = lam
+        water_prices[id(plan)] = (lam, over)
+        return plan
+
+    if depth_budget is None:
+        # Only the water cap couples the sites; its own error says what failed
+        lam, priced, water_over = _price(lambda p: sites.respond(p, 0.0), water_used, water_cap, "water cap")
+        mu, depth_over = 0.0, None
+    else:
+        try:
+            mu, priced, depth_over = _price(water_priced, depth_used, depth_budget, "depth budget")
+        except BudgetUnmet as e:
+            if 0.0 in water_errors:
+                # The water cap fails even with depth free
+                raise water_errors[0.0] from None
+            if water_errors:
+                # Depth prices high enough for the budget left the water cap unmet
+                raise BudgetUnmet("The depth budget and water cap cannot both be met") from None
+            raise
+        lam, water_over = water_prices[id(priced)]
+
+    if not priced["feasible"].all():
+        bad = [str(site_inputs[i].get("site_id", i)) for i in np.flatnonzero(~priced["feasible"])]
+        raise ValueError(f"No feasible plan for sites: {', '.join(bad)}")
+
+    # Lagrangian dual bound at the final prices (the priced plans are exact
+    # optima of the site subproblems, so this is a valid lower bound)
+    dual_bound = priced["cost"].sum()
+    if water_cap is not None:
+        dual_bound += lam * (water_used(priced) - water_cap)
+    if depth_budget is not None:
+        dual_bound += mu * (depth_used(priced) - depth_budget)
+
+    limits = {}
+    if water_cap is not None:
+        limits["net_water"] = water_cap
+    if depth_budget is not None:
+        limits["depth"] = depth_budget
+    plan = _repair(priced, [water_over, depth_over], limits)
+    if depth_budget is not None and mu > 0.0:
+        plan = _fill_depth(sites, plan, lam, depth_budget, limits)
+    total_cost = float(plan["cost"].sum())
+
+    results = []
+    for i, data in enumerate(site_inputs):
+        site = sites.sites[i]
+        conventional_cost = (site["client_annual_energy_conventional"] * site["client_energy_cost"]
+                             + site["client_annual_water_conventional"] * site["client_water_cost"])
+        results.append({
+            "site_id": data.get("site_id", i),
+            "optimal_depth": float(plan["depth"][i]),
+            "total_cost_new": float(plan["cost"][i]),
+            "optimal_energy_new": float(plan["energy"][i]),
+            "optimal_net_water_new": float(plan["net_water"][i]),
+            "savings": float(conventional_cost - plan["cost"][i]),
+            "flow_rates": plan["flow"][i].tolist(),
+        })
+
+    coupling = {}
+    if water_cap is not None:
+        coupling["water_cap"] = {"limit": water_cap, "used": float(water_used(plan)), "dual": lam}
+    if depth_budget is not None:
+        coupling["depth_budget"] = {"limit": depth_budget, "used": float(depth_used(plan)), "dual": mu}
+    return {
+        "sites": results,
+        "coupling": coupling,
+        "total_cost": total_cost,
+        "dual_bound": float(dual_bound),
+        "gap": max(0.0, total_cost - dual_bound),
+        "elapsed": time.perf_counter() - started,
+    }
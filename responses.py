@@ -0,0 +1,165 @@
+import functools
+import gzip
+import hashlib
+import json
+
+from flask import Response
+
+# =============================================================================
+# Response encoding for run_model results
+# =============================================================================
+# Layouts: "records" is the original shape (flow_data as one dict per
+# period); "columnar" turns flow_data into one array per field and, for
+# batches, the list of results into one array per field.
+#
+# Media types are negotiated from the Accept header: JSON always, MessagePack
+# when msgpack is installed and Arrow IPC (a stream of one record batch of
+# the per-period columns, other fields as JSON in the schema metadata) when
+# pyarrow is. Bodies above a size threshold are compressed with brotli (when
+# installed) or gzip, as the client's Accept-Encoding allows.
+#
+# ETags are strong and derived from the inputs and everything else the body
+# depends on, so a matching If-None-Match is answered with 304 before the
+# model is solved.
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+LAYOUTS = ("records", "columnar")
+
+# Columns of each result that hold one value per period
+PERIOD_SERIES = ("cumulative_energy", "cumulative_water")
+
+
+@functools.lru_cache(maxsize=None)
+def _optional(module):
+    try:
+        return __import__(module)
+    except ImportError:
+        return None
+
+
+def media_types():
+    """Media types this process can produce, preferred first."""
+    types = [JSON]
+    if _optional("msgpack") is not None:
+        types += [MSGPACK, "application/x-msgpack"]
+    if _optional("pyarrow") is not None:
+        types.append(ARROW)
+    return types
+
+
+def encodings():
+    return (["br"] if _optional("brotli") is not None else []) + ["gzip"]
+
+
+def negotiate(request):
+    """(media type, content coding or None) for a Flask request; None type means 406."""
+    accept = request.accept_mimetypes
+    media = accept.best_match(media_types()) if accept else JSON
+    coding = None
+    for candidate in encodings():
+        if request.accept_encodings[candidate]:
+            coding = candidate
+            break
+    return media, coding
+
+
+def columnar(result):
+    """One result dict with flow_data as {field: [one value per period]}."""
+    if "flow_data" not in result:
+        return result
+    rows = result["flow_data"]
+    fields = list(rows[0]) if rows else []
+    out = dict(result)
+    out["flow_data"] = {field: [row[field] for row in rows] for field in fields}
+    return out
+
+
+def columnar_batch(results):
+    """A list of results as {field: [one value per result]} (errors as None)."""
+    results = [columnar(r) for r in results]
+    fields = []
+    for r in results:
+        fields += [f for f in r if f not in fields]
+    return {field: [r.get(field) for r in results] for field in fields}
+
+
+def etag(*parts):
+    # Strong validator over a canonical JSON form of everything the body depends on
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def not_modified(request, tag):
+    return tag in request.if_none_match
+
+
+def _period_columns(result):
+    # flow_data columns plus the cumulative series: one value per period each
+    columns = dict(result.get("flow_data") or {})
+    columns.update({name: result[name] for name in PERIOD_SERIES if result.get(name) is not None})
+    return columns
+
+
+def _arrow(payload):
+    import pyarrow as pa
+
+    # One table of period columns (with a row index for batches); the other
+    # fields ride along as JSON in the schema metadata
+    rest = dict(payload)
+    results = rest.pop("results", None)
+    if results is None:
+        columns = _period_columns(rest)
+    else:
+        columns = {"row": []}
+        for i, flow in enumerate(results.get("flow_data", [])):
+            series = {name: results[name][i] for name in PERIOD_SERIES if name in results}
+            period = _period_columns(dict(series, flow_data=flow))
+            columns["row"] += [i] * len(next(iter(period.values()), []))
+            for name, values in period.items():
+                columns.setdefault(name, []).extend(values)
+        rest["results"] = {k: v for k, v in results.items() if k != "flow_data" and k not in PERIOD_SERIES}
+    for name in ("flow_data",) + PERIOD_SERIES:
+        rest.pop(name, None)
+    table = pa.table(columns, metadata={"pipelong": json.dumps(rest)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def encode(payload, media):
+    if media in (MSGPACK, "application/x-msgpack"):
+        import msgpack
+
+        return msgpack.packb(payload, use_bin_type=True)
+    if media == ARROW:
+        return _arrow(payload)
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def compress(body, coding):
+    if coding == "br":
+        import brotli
+
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def respond(payload, media=JSON, coding=None, tag=None, min_compress=1024, status=200):
+    """Build the Flask response: encode, compress above min_compress bytes, tag."""
+    body = encode(payload, media)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if coding is not None and len(body) >= min_compress:
+        body = compress(body, coding)
+        headers["Content-Encoding"] = coding
+    if tag is not None:
+        headers["ETag"] = f'"{tag}"'
+        headers["Cache-Control"] = "no-cache"
+    return Response(body, status=status, mimetype=media, headers=headers)
+
+
+def not_modified_response(tag):
+    return Response(status=304, headers={"ETag": f'"{tag}"', "Vary": "Accept, Accept-Encoding",
+                                         "Cache-Control": "no-cache"})
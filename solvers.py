@@ -0,0 +1,438 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+import analytic
+import config
+import metrics
+from metrics import phase
+
+# =============================================================================
+# Solver backends for the well model
+# =============================================================================
+# Every backend is a function
+#
+#   solve(B, T_surface, it_load, cost_energy, cost_water, leakage_rate, constants)
+#
+# returning the same normalised solution dict: ok, status (one of STATUSES),
+# solver_status (the backend's own code), engine, and when ok also depth,
+# flow_rates and objective. Backends register with a probe that imports
+# their solver package, so gurobipy or SciPy are only loaded once a backend
+# is selected, and a box without them can still serve the others.
+#
+#   gurobi  the full model in Gurobi (needs gurobipy and a licence)
+#   highs   an LP per candidate depth in HiGHS via SciPy, searched over D
+#   numpy   the exact closed form in analytic.py
+#   auto    the first of AUTO_ORDER that is available on this box
+
+STATUSES = ("optimal", "infeasible", "unbounded", "infeasible_or_unbounded", "iteration_limit",
+            "node_limit", "time_limit", "interrupted", "numeric", "suboptimal", "error")
+AUTO_ORDER = ("gurobi", "highs", "numpy")
+
+
+class BackendUnavailable(RuntimeError):
+    pass
+
+
+# name -> (solve function, probe); probe() raises when the backend cannot run
+_BACKENDS = {}
+_available = {}
+_available_lock = threading.Lock()
+
+
+def backend(name, probe=None):
+    def register(solve):
+        _BACKENDS[name] = (solve, probe)
+        return solve
+    return register
+
+
+def backend_names():
+    return tuple(_BACKENDS) + ("auto",)
+
+
+def _check(name):
+    # Probe once per process; returns None or the reason it is unavailable
+    with _available_lock:
+        if name not in _available:
+            probe = _BACKENDS[name][1]
+            try:
+                if probe is not None:
+                    probe()
+                _available[name] = None
+            except Exception as e:
+                _available[name] = f"{type(e).__name__}: {e}"
+        return _available[name]
+
+
+def available_backends():
+    return [name for name in _BACKENDS if _check(name) is None]
+
+
+def resolve(name):
+    """Backend name that get_backend(name) solves with ("auto" picks the first available)."""
+    if name != "auto":
+        return name
+    for candidate in AUTO_ORDER:
+        if _check(candidate) is None:
+            return candidate
+    raise BackendUnavailable(f"None of the backends {', '.join(AUTO_ORDER)} is available")
+
+
+def get_backend(name):
+    """Solve function for a backend name (or "auto"), probing it on first use."""
+    name = resolve(name)
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown engine '{name}' (expected one of: {', '.join(backend_names())})")
+    reason = _check(name)
+    if reason is not None:
+        raise BackendUnavailable(f"Engine '{name}' is not available here ({reason})")
+    return _BACKENDS[name][0]
+
+
+def _solved(engine, solver_status, depth, flow_rates, objective):
+    return {"ok": True, "status": "optimal", "solver_status": solver_status, "engine": engine,
+            "depth": depth, "flow_rates": flow_rates, "objective": objective}
+
+
+def _failed(engine, status, solver_status):
+    return {"ok": False, "status": status, "solver_status": solver_status, "engine": engine}
+
+
+def _record_stats(engine, status, seconds, iterations=None, nodes=None):
+    metrics.SOLVES.inc(engine=engine, status=status)
+    metrics.SOLVER_SECONDS.observe(seconds, engine=engine)
+    if iterations is not None:
+        metrics.SOLVER_ITERATIONS.observe(iterations, engine=engine)
+    if nodes is not None:
+        metrics.SOLVER_NODES.observe(nodes, engine=engine)
+
+
+# ---- Gurobi -----------------------------------------------------------------
+
+def _probe_gurobi():
+    # Starting an empty environment checks the licence without building a model
+    import gurobipy as gp
+
+    env = gp.Env(empty=True)
+    env.setParam("OutputFlag", 0)
+    env.start()
+    env.dispose()
+
+
+class _ModelTemplate:
+    """Gurobi model whose structure is built once and re-parameterised per solve.
+
+    Variables and constraints are created as MVar/MConstr blocks, so building
+    an hourly (8760-period) horizon costs a handful of matrix calls rather than
+    one Python call per period. Between requests only the cooling block (B
+    coefficients and IT-load right-hand sides) and the objective change.
+    """
+
+    def __init__(self, n_periods, constants):
+        import gurobipy as gp
+
+        self.constants = dict(constants)
+        alpha = self.constants["alpha"]
+        g = self.constants["g"]
+        rho = self.constants["rho"]
+        Delta_t = self.constants["Delta_t"]
+        eta = self.constants["eta"]
+        Q_max = self.constants["Q_max"]
+        D_min = self.constants["D_min"]
+        D_max = self.constants["D_max"]
+        self.n_periods = n_periods
+
+        self.model = gp.Model("Optimal_Underground_Well_Yearly")
+        self.model.Params.LogToConsole = 0  # Silence output
+
+        Q = self.Q = self.model.addMVar(n_periods, lb=0.0, ub=Q_max, name="Q")
+        z = self.z = self.model.addMVar(n_periods, lb=0.0, ub=Q_max * D_max, name="z")
+        D = self.D = self.model.addMVar(1, lb=D_min, ub=D_max, name="Depth")
+
+        # McCormick envelope for z[t] = Q[t]*D, one block per inequality
+        self.model.addConstr(z >= D_min * Q, name="McCormick1")
+        self.model.addConstr(z >= Q_max * D + D_max * Q - Q_max * D_max, name="McCormick2")
+        self.model.addConstr(z <= Q_max * D + D_min * Q - Q_max * D_min, name="McCormick3")
+        self.model.addConstr(z <= D_max * Q, name="McCormick4")
+
+        # Cooling rows are added by update() once B is known
+        self.alpha = alpha
+        self.cooling = None
+        self.B = None
+
+        # Objective building blocks that do not depend on the request
+        self.energy_expr = (g * rho * Delta_t / (1000 * eta)) * (D @ np.ones((1, n_periods)) @ Q)
+        self.water_pumped_expr = Delta_t * Q.sum()
+        self.start = None
+
+    def update(self, B, it_load, cost_energy, cost_water, leakage_rate):
+        from gurobipy import GRB
+
+        K_well = self.constants["K_well"]
+        V_initial = self.constants["V_initial"]
+        B = np.broadcast_to(np.asarray(B, dtype=float), (self.n_periods,))
+        it_load = np.asarray(it_load, dtype=float)
+        if self.B is not None and np.array_equal(B, self.B):
+            self.cooling.RHS = it_load
+        else:
+            # New B coefficients: swap the whole cooling block in one call
+            if self.cooling is not None:
+                self.model.remove(self.cooling)
+            self.cooling = self.model.addConstr(
+                K_well * (B * self.Q + self.alpha * self.z) >= it_load, name="Cooling")
+            self.B = B.copy()
+
+        net_water_expr = V_initial + leakage_rate * self.water_pumped_expr
+        self.model.setObjective(self.energy_expr * cost_energy + net_water_expr * cost_water, GRB.MINIMIZE)
+
+        # Warm start from the previous request's solution
+        if self.start is not None:
+            self.Q.Start, self.z.Start, self.D.Start = self.start
+
+    def solve(self):
+        self.model.optimize()
+        if self.model.SolCount > 0:
+            self.start = (self.Q.X, self.z.X, self.D.X)
+        return self.model.status
+
+    def depth(self):
+        return float(self.D.X[0])
+
+    def flow_rates(self):
+        return self.Q.X.tolist()
+
+
+# Idle templates by (periods, constants). Gurobi models are not thread-safe,
+# so a solve checks a template out and returns it afterwards; threads come
+# and go (the Flask dev server starts one per request) but the models stay.
+_idle_templates = {}
+_idle_order = []
+_templates_lock = threading.Lock()
+
+
+def _template_key(n_periods, constants):
+    return n_periods, tuple(sorted(constants.items()))
+
+
+@contextmanager
+def _checked_out_template(n_periods, constants):
+    key = _template_key(n_periods, constants)
+    with _templates_lock:
+        idle = _idle_templates.get(key)
+        template = idle.pop() if idle else None
+        if template is not None:
+            _idle_order.remove(template)
+    if template is None:
+        template = _ModelTemplate(n_periods, constants)
+    try:
+        yield template
+    finally:
+        with _templates_lock:
+            _idle_templates.setdefault(key, []).append(template)
+            _idle_order.append(template)
+            # Beyond the pool size the least recently used model is freed
+            while len(_idle_order) > config.GUROBI_TEMPLATES:
+                oldest = _idle_order.pop(0)
+                _idle_templates[_template_key(oldest.n_periods, oldest.constants)].remove(oldest)
+                oldest.model.dispose()
+
+
+def reset_templates():
+    """Free every idle Gurobi template, so the next solves rebuild them."""
+    with _templates_lock:
+        for template in _idle_order:
+            template.model.dispose()
+        _idle_templates.clear()
+        _idle_order.clear()
+
+
+# Gurobi status codes -> normalised status
+_GUROBI_STATUS = {2: "optimal", 3: "infeasible", 4: "infeasible_or_unbounded", 5: "unbounded",
+                  7: "iteration_limit", 8: "node_limit", 9: "time_limit", 11: "interrupted",
+                  12: "numeric", 13: "suboptimal"}
+
+
+@backend("gurobi", probe=_probe_gurobi)
+def solve_gurobi(B, T_surface, it_load, cost_energy, cost_water, leakage_rate, constants):
+    # Optimization model (built once per horizon and constants, then re-parameterised)
+    with _checked_out_template(len(it_load), constants) as template:
+        with phase("build"):
+            template.update(B, it_load, cost_energy, cost_water, leakage_rate)
+        with phase("optimize"):
+            code = template.solve()
+        model = template.model
+        status = _GUROBI_STATUS.get(code, "error")
+        _record_stats("gurobi", status, model.Runtime, model.IterCount + model.BarIterCount, model.NodeCount)
+        if status != "optimal":
+            return _failed("gurobi", status, code)
+        with phase("extract"):
+            return _solved("gurobi", code, template.depth(), template.flow_rates(), model.ObjVal)
+
+
+# ---- NumPy closed form ------------------------------------------------------
+
+@backend("numpy")
+def solve_numpy(B, T_surface, it_load, cost_energy, cost_water, leakage_rate, constants):
+    T_surface = np.broadcast_to(np.asarray(T_surface, dtype=float), (len(it_load),))
+    started = time.perf_counter()
+    with phase("optimize"):
+        depth, flow, total, feasible = analytic.solve_well(
+            [it_load], [T_surface], cost_energy, cost_water, leakage_rate, constants)
+    status = "optimal" if feasible[0] else "infeasible"
+    _record_stats("numpy", status, time.perf_counter() - started)
+    if not feasible[0]:
+        return _failed("numpy", status, status)
+    return _solved("numpy", status, float(depth[0]), flow[0].tolist(), float(total[0]))
+
+
+# ---- HiGHS (SciPy) ----------------------------------------------------------
+# At a fixed depth D the bilinear terms Q_t*D become linear and the McCormick
+# rows only move their right-hand sides, so the model is an LP in (Q, z) with
+# one constraint matrix for every D. The depth is searched on a grid over
+# the feasible depths, then refined around the best grid point with a
+# bounded scalar search, unless the optimum sits at the shallowest feasible
+# depth. That depth is read off the LP's own rows (for each period, the
+# least D at which some Q meets the cooling row), since feasibility only
+# improves with depth.
+#
+# Every LP is the size of the horizon, so the work grows with it: a monthly
+# or daily solve takes well under a second, but an hourly profile with
+# thousands of distinct periods costs about half a second per LP. Above
+# HIGHS_LONG_PERIODS distinct periods the grid shrinks to HIGHS_LONG_GRID
+# points, which keeps an hourly solve to a few seconds; the numpy engine
+# is the one to use for interactive hourly runs.
+
+def _probe_highs():
+    from scipy.optimize import linprog
+
+    linprog([1.0], bounds=[(0.0, 1.0)], method="highs")
+
+
+# scipy.optimize.linprog status -> normalised status
+_HIGHS_STATUS = {0: "optimal", 1: "iteration_limit", 2: "infeasible", 3: "unbounded", 4: "numeric"}
+
+
+class _DepthLP:
+    """The well model at a fixed depth, solved with HiGHS and memoised per depth."""
+
+    def __init__(self, B, it_load, cost_energy, cost_water, leakage_rate, constants):
+        from scipy import sparse
+
+        # Periods with the same cooling inputs have the same optimal flow, so
+        # each distinct period is solved once and weighted by its count
+        B = np.broadcast_to(np.asarray(B, dtype=float), (len(it_load),))
+        periods = np.stack([B, np.asarray(it_load, dtype=float)], axis=1)
+        unique, self.inverse, counts = np.unique(periods, axis=0, return_inverse=True, return_counts=True)
+        self.inverse = self.inverse.reshape(-1)
+        self.counts = counts.astype(float)
+        B, it_load = unique[:, 0], unique[:, 1]
+        n = self.n = len(it_load)
+        alpha, K_well = constants["alpha"], constants["K_well"]
+        self.Q_max, self.D_min, self.D_max = constants["Q_max"], constants["D_min"], constants["D_max"]
+        k_energy = constants["g"] * constants["rho"] * constants["Delta_t"] / (1000 * constants["eta"])
+        self.w0 = cost_water * leakage_rate * constants["Delta_t"]
+        self.w1 = cost_energy * k_energy
+        self.const = cost_water * constants["V_initial"]
+
+        # Rows: the four McCormick inequalities for z = Q*D, then cooling
+        eye = sparse.identity(n, format="csr")
+        self.A = sparse.vstack([
+            sparse.hstack([self.D_min * eye, -eye]),
+            sparse.hstack([self.D_max * eye, -eye]),
+            sparse.hstack([-self.D_min * eye, eye]),
+            sparse.hstack([-self.D_max * eye, eye]),
+            sparse.hstack([sparse.diags(-K_well * B), -K_well * alpha * eye]),
+        ], format="csc")
+        self.b = np.concatenate([np.zeros(4 * n), -it_load])
+        self.bounds = np.array([(0.0, self.Q_max)] * n + [(0.0, self.Q_max * self.D_max)] * n)
+        self.r, self.B, self.alpha = it_load / K_well, B, alpha
+        self.solved = {}
+        self.iterations = 0
+        self.failure = None
+
+    def shallowest(self):
+        """Least depth at which every period's cooling row can be met (inf if none)."""
+        # The least D for a period is linear in Q on the McCormick rows
+        # z <= D_max*Q and z <= Q_max*D + D_min*Q - Q_max*D_min, so it is
+        # reached at Q = Q_max or where z <= D_max*Q starts to bind
+        a = self.B + self.alpha * self.D_max
+        candidates = [np.full(self.n, self.Q_max)]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            candidates.append(np.where(a > 0, self.r / a, np.nan))
+        best = np.full(self.n, np.inf)
+        for Q in candidates:
+            ok = (Q >= 0) & (Q <= self.Q_max * (1 + 1e-12))
+            need = (self.r - self.B * Q) / self.alpha  # z the cooling row needs
+            ok &= need <= self.D_max * Q + 1e-12 * (1 + np.abs(need))
+            depth = (need - self.D_min * Q) / self.Q_max + self.D_min
+            best = np.fmin(best, np.where(ok, depth, np.inf))
+        return float(np.clip(best.max(), self.D_min, np.inf))
+
+    def value(self, depth):
+        depth = float(depth)
+        if depth not in self.solved:
+            from scipy.optimize import linprog
+
+            n = self.n
+            self.b[n:2 * n] = self.Q_max * (self.D_max - depth)
+            self.b[2 * n:3 * n] = self.Q_max * (depth - self.D_min)
+            c = np.concatenate([(self.w0 + self.w1 * depth) * self.counts, np.zeros(n)])
+            res = linprog(c, A_ub=self.A, b_ub=self.b, bounds=self.bounds, method="highs")
+            self.iterations += res.nit
+            if res.status == 0:
+                self.solved[depth] = (res.fun + self.const, res.x[:n][self.inverse])
+            else:
+                if res.status != 2:
+                    self.failure = _HIGHS_STATUS.get(res.status, "error")
+                self.solved[depth] = (np.inf, None)
+        return self.solved[depth][0]
+
+    def best(self):
+        depth = min(self.solved, key=lambda d: self.solved[d][0])
+        return depth, self.solved[depth]
+
+
+@backend("highs", probe=_probe_highs)
+def solve_highs(B, T_surface, it_load, cost_energy, cost_water, leakage_rate, constants):
+    started = time.perf_counter()
+    with phase("build"):
+        lp = _DepthLP(B, it_load, cost_energy, cost_water, leakage_rate, constants)
+    with phase("optimize"):
+        feasible = np.isfinite(lp.value(lp.D_max))
+        if feasible:
+            _search_depth(lp, config.HIGHS_DEPTH_GRID, config.HIGHS_DEPTH_TOL)
+    status = "optimal" if feasible else lp.failure or "infeasible"
+    _record_stats("highs", status, time.perf_counter() - started, lp.iterations)
+    if not feasible:
+        return _failed("highs", status, status)
+    with phase("extract"):
+        depth, (objective, flow) = lp.best()
+        return _solved("highs", "optimal", depth, flow.tolist(), float(objective))
+
+
+def _search_depth(lp, points, tol):
+    from scipy.optimize import minimize_scalar
+
+    if lp.n > config.HIGHS_LONG_PERIODS:
+        points = min(points, config.HIGHS_LONG_GRID)
+    lo = min(lp.shallowest(), lp.D_max)
+    if not np.isfinite(lp.value(lo)):
+        # Rounding put the bound just short; bisect up to a feasible depth
+        a, b = lo, lp.D_max
+        while b - a > tol:
+            mid = 0.5 * (a + b)
+            a, b = (a, mid) if np.isfinite(lp.value(mid)) else (mid, b)
+        lo = b
+        lp.value(lo)
+    grid = np.linspace(lo, lp.D_max, max(points, 2))
+    values = np.array([lp.value(d) for d in grid])
+    i = int(np.argmin(values))
+    if i == 0 and lp.value(min(lo + tol, lp.D_max)) >= values[0]:
+        # The cost rises from the shallowest feasible depth: that is the optimum
+        return
+    lo, hi = grid[max(i - 1, 0)], grid[min(i + 1, len(grid) - 1)]
+    if hi > lo:
+        minimize_scalar(lp.value, bounds=(lo, hi), method="bounded", options={"xatol": tol})
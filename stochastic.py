@@ -0,0 +1,283 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import analytic
+import baseline
+import config
+from metrics import phase
+from model import MODEL_CONSTANTS, _horizon_constants, _parse_site
+
+# =============================================================================
+# Two-stage stochastic optimisation of the well depth over a weather ensemble
+# =============================================================================
+# The depth D is built once (first stage); the monthly flow rates Q[s, t]
+# adapt to each scenario s of IT load and ambient temperature (second stage):
+#
+#   min  sum_s p_s * sum_t (w0 + w1*D) * Q[s, t] + const
+#   s.t. the well model for every (s, t), with D shared by all scenarios
+#
+# With D fixed each (s, t) cell is independent, so the expected cost is a
+# sum of per-cell piecewise quadratics in D (analytic._pieces) weighted by
+# p_s. Scenarios are split into blocks whose pieces are built in parallel
+# and merged in one breakpoint sweep, which gives the exact extensive-form
+# optimum without building one large LP. Scenario reduction (fast forward
+# selection) optionally keeps a representative subset with redistributed
+# probabilities first.
+
+# Spread of a generated ensemble around the site's monthly profile: sd of the
+# year's temperature level (°C) and of the monthly AR(1) noise on it, and the
+# same for IT load as a log-scale factor
+SPREAD_DEFAULTS = {"temp_sd": 1.5, "temp_noise": 0.75, "load_sd": 0.05, "load_noise": 0.03}
+_AR = 0.6
+QUANTILES = (0.05, 0.5, 0.95)
+
+
+def _monthly(values):
+    # A dataset column averaged into 12 months (None when there is no usable column)
+    if values is None:
+        return None
+    values = np.asarray(values, dtype=float)
+    if len(values) < 12 or not np.all(np.isfinite(values)):
+        return None
+    return np.array([chunk.mean() for chunk in np.array_split(values, 12)])
+
+
+def data_shapes():
+    """Monthly IT-load factors and temperature anomalies (°C) from the baseline datasets.
+
+    IT load follows the well dataset's load relative to its mean; ambient
+    temperature follows the conventional cooling-tower temperature around
+    its mean. Missing datasets give flat profiles.
+    """
+    well = baseline.store.get("underground")
+    conventional = baseline.store.get("conventional")
+    load = _monthly(well.columns.get("IT_Load_kW") if well is not None else None)
+    temp = _monthly(conventional.columns.get("Cooling_Tower_Water_Temp_C") if conventional is not None else None)
+    load = load / load.mean() if load is not None and load.mean() > 0 else np.ones(12)
+    temp = temp - temp.mean() if temp is not None else np.zeros(12)
+    return load, temp
+
+
+def _ar_noise(rng, n, sd):
+    # Stationary AR(1) noise over 12 months for n scenarios
+    noise = np.empty((n, 12))
+    noise[:, 0] = rng.normal(0.0, sd, n)
+    innovation = sd * np.sqrt(1.0 - _AR ** 2)
+    for t in range(1, 12):
+        noise[:, t] = _AR * noise[:, t - 1] + rng.normal(0.0, innovation, n)
+    return noise
+
+
+def generate_scenarios(it_load, ambient_temp, n, seed=None, spread=None):
+    """n equally likely (it_load, ambient_temp) traces of shape (n, 12) around the given profiles."""
+    spread = dict(SPREAD_DEFAULTS, **(spread or {}))
+    unknown = set(spread) - set(SPREAD_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown spread settings: {', '.join(sorted(unknown))}")
+    rng = np.random.default_rng(seed)
+    temp = (np.asarray(ambient_temp, dtype=float)[None]
+            + rng.normal(0.0, spread["temp_sd"], (n, 1)) + _ar_noise(rng, n, spread["temp_noise"]))
+    scale = rng.normal(0.0, spread["load_sd"], (n, 1)) + _ar_noise(rng, n, spread["load_noise"])
+    load = np.asarray(it_load, dtype=float)[None] * np.exp(scale)
+    return load, temp
+
+
+def reduce_scenarios(it_load, ambient_temp, probability, k, chunk=512):
+    """Keep k representative scenarios by fast forward selection.
+
+    Distances are Euclidean over the traces, each variable scaled by its
+    spread. Every dropped scenario's probability moves to its nearest kept
+    one. Returns (kept indices, their probabilities, the probability-weighted
+    distance from each scenario to its representative).
+    """
+    n = len(probability)
+    if k >= n:
+        return np.arange(n), probability, 0.0
+    traces = np.hstack([it_load / max(it_load.std(), 1e-12), ambient_temp / max(ambient_temp.std(), 1e-12)])
+    sq = np.sum(traces ** 2, axis=1)
+
+    def distances(rows, cols=slice(None)):
+        d = sq[rows, None] + sq[None, cols] - 2.0 * traces[rows] @ traces[cols].T
+        return np.sqrt(np.maximum(d, 0.0))
+
+    # cost[u] is the weighted distance to the nearest kept scenario if u were
+    # kept too. Choosing u only moves the scenarios now nearer to u than to
+    # any earlier choice, so only their rows of distances are recomputed, a
+    # chunk at a time, and the n x n matrix is never held.
+    nearest = np.full(n, np.inf)
+    cost = np.zeros(n)
+    for lo in range(0, n, chunk):
+        cost += probability[lo:lo + chunk] @ distances(np.arange(lo, min(lo + chunk, n)))
+    chosen = np.zeros(n, dtype=bool)
+    for _ in range(k):
+        u = int(np.argmin(np.where(chosen, np.inf, cost)))
+        chosen[u] = True
+        to_u = distances(np.array([u]))[0]
+        moved = np.flatnonzero(to_u < nearest)
+        for lo in range(0, len(moved), chunk):
+            rows = moved[lo:lo + chunk]
+            d = distances(rows)
+            cost -= probability[rows] @ (np.minimum(nearest[rows, None], d) - np.minimum(to_u[rows, None], d))
+        nearest[moved] = to_u[moved]
+    kept = np.flatnonzero(chosen)
+    owner = kept[np.argmin(distances(np.arange(n), kept), axis=1)]
+    weights = np.bincount(owner, weights=probability, minlength=n)[kept]
+    return kept, weights, float(probability @ nearest)
+
+
+def _block_pieces(cells, rows, weight):
+    # Pieces of one block of scenarios as a single row of (scenario, month) cells
+    r, a, s, w0, w1 = (x.reshape(1, -1) for x in cells)
+    w = np.repeat(weight, cells[0].shape[1])[None]
+    alpha_qmax, q_max, d_min, d_max, _ = (x[:1] for x in rows)
+    return analytic._pieces(r, a, s, w0 * w, w1 * w, alpha_qmax[:, None], q_max[:, None], d_min, d_max)
+
+
+def solve_two_stage(cells, rows, probability, block=None, workers=None):
+    """Depth minimising the expected cost over all scenarios (rows of cells), or None if none serves them all."""
+    block = block or config.STOCH_BLOCK
+    workers = workers or config.STOCH_WORKERS
+    n = len(probability)
+    spans = [slice(lo, lo + block) for lo in range(0, n, block)]
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(spans)))) as pool:
+        parts = list(pool.map(lambda sl: _block_pieces([x[sl] for x in cells], rows, probability[sl]), spans))
+    pos = np.concatenate([p for p, _ in parts], axis=1)
+    delta = np.concatenate([d for _, d in parts], axis=1)
+    alpha_qmax, q_max, d_min, d_max, _ = (x[:1] for x in rows)
+    depth, feasible = analytic._sweep(pos, delta, d_min, d_max, np.zeros(1))
+    return float(depth[0]) if feasible[0] else None, len(spans)
+
+
+def _recourse(cells, rows, depth):
+    # Each scenario's flows, cost and feasibility at a fixed depth
+    r, a, s, w0, w1 = cells
+    alpha_qmax, q_max, d_min, _, const = rows
+    depths = np.full(len(r), depth)
+    flow, ok = analytic.flows_at(r, a, s, w0, w1, alpha_qmax[:, None], q_max[:, None], d_min, depths)
+    cost = np.sum((w0 + w1 * depth) * flow, axis=1) + const
+    return flow, cost, ok.all(axis=1)
+
+
+def _quantiles(values, probability):
+    # Probability-weighted quantiles of values (scenarios,) or (scenarios, months)
+    columns = values.reshape(len(values), -1)
+    order = np.argsort(columns, axis=0)
+    ordered = np.take_along_axis(columns, order, axis=0)
+    cum = np.cumsum(probability[order], axis=0)
+    out = {}
+    for q in QUANTILES:
+        picked = np.take_along_axis(ordered, np.argmax(cum >= q - 1e-12, axis=0)[None], axis=0)[0]
+        out[f"p{round(q * 100)}"] = picked.tolist() if values.ndim > 1 else float(picked[0])
+    return out
+
+
+def run_stochastic(data, scenarios=None, reduce_to=None, seed=None, spread=None, block=None, workers=None):
+    """Choose one well depth for an ensemble of monthly IT-load/temperature traces.
+
+    data holds the run-model inputs (optional monthly "it_load" and
+    "ambient_temp" profiles replace the dataset-shaped defaults). scenarios
+    is a count to generate around those profiles or {"it_load": [[12]...],
+    "ambient_temp": [[12]...], "probability": optional}. reduce_to keeps that
+    many representative scenarios.
+    """
+    started = time.perf_counter()
+    with phase("parse"):
+        site = _parse_site(dict(data, horizon="monthly"))
+        if isinstance(scenarios, dict):
+            it_load = np.asarray(scenarios["it_load"], dtype=float)
+            ambient = np.asarray(scenarios["ambient_temp"], dtype=float)
+            if it_load.ndim != 2 or it_load.shape[1] != 12 or ambient.shape != it_load.shape:
+                raise ValueError("scenario 'it_load' and 'ambient_temp' must both be lists of 12-month traces")
+            probability = np.asarray(scenarios.get("probability", np.ones(len(it_load))), dtype=float)
+            if probability.shape != (len(it_load),) or np.any(probability < 0) or probability.sum() <= 0:
+                raise ValueError("'probability' must hold one non-negative weight per scenario")
+            probability = probability / probability.sum()
+        else:
+            count = int(scenarios or config.STOCH_SCENARIOS)
+            if not 0 < count <= config.STOCH_MAX_SCENARIOS:
+                raise ValueError(f"scenarios must number between 1 and {config.STOCH_MAX_SCENARIOS}")
+            load_shape, temp_anomaly = data_shapes()
+            centre_load = site["it_load"] if data.get("it_load") is not None else site["client_avg_IT_load"] * load_shape
+            centre_temp = (site["ambient_temp"] if data.get("ambient_temp") is not None
+                           else site["client_ambient_temp"] + temp_anomaly)
+            it_load, ambient = generate_scenarios(centre_load, centre_temp, count, seed, spread)
+            probability = np.full(count, 1.0 / count)
+        if not 0 < len(it_load) <= config.STOCH_MAX_SCENARIOS:
+            raise ValueError(f"scenarios must number between 1 and {config.STOCH_MAX_SCENARIOS}")
+        if not np.all(np.isfinite(it_load)) or not np.all(np.isfinite(ambient)):
+            raise ValueError("scenario traces must be finite")
+        if reduce_to and not 0 < int(reduce_to) <= config.STOCH_MAX_REDUCED:
+            raise ValueError(f"reduce_to must be between 1 and {config.STOCH_MAX_REDUCED}")
+
+    constants = _horizon_constants(site, dict(MODEL_CONSTANTS))
+    full = analytic.well_terms(it_load, ambient, site["client_energy_cost"], site["client_water_cost"],
+                               site["client_evaporation_rate"], constants)
+    full_probability = probability
+    cells, rows = full
+    distance = 0.0
+    if reduce_to:
+        with phase("reduce"):
+            kept, probability, distance = reduce_scenarios(it_load, ambient, probability, int(reduce_to))
+            it_load, ambient = it_load[kept], ambient[kept]
+            cells, rows = (tuple(x[kept] for x in part) for part in full)
+    with phase("solve"):
+        depth, blocks = solve_two_stage(cells, rows, probability, block, workers)
+    if depth is None:
+        return {"error": "No well depth cools every scenario", "status": "infeasible",
+                "scenarios": len(full_probability), "reduced_to": len(probability)}
+
+    with phase("results"):
+        flow, cost, _ = _recourse(cells, rows, depth)
+        expected = float(probability @ cost)
+        conventional = (site["client_annual_energy_conventional"] * site["client_energy_cost"]
+                        + site["client_annual_water_conventional"] * site["client_water_cost"])
+
+        # Wait-and-see: each scenario with its own best depth (perfect foresight)
+        _, _, ws_cost, ws_ok = analytic.solve_depth(*cells, *rows)
+        wait_and_see = float(probability @ ws_cost) if ws_ok.all() else None
+
+        # Expected-value solution: the depth for the mean trace, tried on every scenario
+        mean_cells, mean_rows = analytic.well_terms(
+            (probability @ it_load)[None], (probability @ ambient)[None], site["client_energy_cost"],
+            site["client_water_cost"], site["client_evaporation_rate"], constants)
+        ev_depth, _, _, ev_ok = analytic.solve_depth(*mean_cells, *mean_rows)
+        ev_cost = ev_infeasible = None
+        if ev_ok[0]:
+            _, costs, ok = _recourse(cells, rows, float(ev_depth[0]))
+            ev_infeasible = int((~ok).sum())
+            ev_cost = float(probability @ costs) if ok.all() else None
+
+        # A depth chosen on a reduced ensemble, tried on every original scenario
+        full_cost = full_infeasible = None
+        if len(probability) < len(full_probability):
+            _, costs, ok = _recourse(*full, depth)
+            full_infeasible = int((~ok).sum())
+            full_cost = float(full_probability @ costs) if ok.all() else None
+
+        energy = (flow.sum(axis=1) * depth * constants["g"] * constants["rho"] * constants["Delta_t"]
+                  / (1000 * constants["eta"]))
+        return {
+            "depth": depth,
+            "expected_cost": expected,
+            "conventional_cost": conventional,
+            "expected_savings": conventional - expected,
+            "cost": _quantiles(cost, probability),
+            "savings": _quantiles(conventional - cost, probability),
+            "energy": _quantiles(energy, probability),
+            "flow": _quantiles(flow, probability),
+            "scenarios": len(full_probability),
+            "reduced_to": len(probability),
+            "reduction_distance": distance,
+            "unreduced_expected_cost": full_cost,
+            "unreduced_infeasible_scenarios": full_infeasible,
+            "blocks": blocks,
+            "wait_and_see_cost": wait_and_see,
+            "evpi": expected - wait_and_see if wait_and_see is not None else None,
+            "expected_value_depth": float(ev_depth[0]) if ev_ok[0] else None,
+            "expected_value_cost": ev_cost,
+            "expected_value_infeasible_scenarios": ev_infeasible,
+            "vss": ev_cost - expected if ev_cost is not None else None,
+            "elapsed": time.perf_counter() - started,
+        }
@@ -0,0 +1,359 @@
+import argparse
+import bisect
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import analytic
+import metrics
+
+# =============================================================================
+# Precomputed surrogate table for single-site monthly queries
+# =============================================================================
+# With a flat monthly profile every month has the same optimal flow, and the
+# cost per month divided by the energy price term w1 depends on three inputs
+# only: the IT load r, the ambient temperature T and the price ratio
+# phi = w0 / w1 (water-plus-evaporation against pumping energy):
+#
+#   F(r, T, phi) = min over D, Q of (D + phi) * Q   (one month, well model)
+#
+# The table holds the optimal depth and F on an adaptively refined grid over
+# those three axes. A query interpolates the depth, takes the cheapest
+# feasible flow at that depth (an upper bound on the cost) and certifies it
+# against a lower bound from the grid node below the query, using three
+# monotonicity properties of the model:
+#
+#   F / r              does not decrease with r     (scale Q down by the load ratio)
+#   F * (B + a*D_max)  does not decrease with T     (B = T_dc_target - T)
+#   F / (D + phi)      does not decrease with phi   at the optimal depth D
+#
+# For the last, the optimal depth never decreases with phi (water made
+# dearer relative to energy only ever pays for a deeper well), so the depth
+# stored at the next node up in phi bounds it. Queries outside the grid, or
+# whose certified relative gap exceeds the tolerance, go to the solver.
+
+AXES = ("it_load", "ambient_temp", "price_ratio")
+# Default grid envelope: IT load (kW), ambient temperature (°C) and price ratio
+ENVELOPE = {"it_load": (50.0, 2000.0), "ambient_temp": (10.0, 35.0), "price_ratio": (0.0, 1.0)}
+# Constants a table is built for; queries under other values fall back
+TABLE_CONSTANTS = ("alpha", "T_dc_target", "K_well", "g", "rho", "Delta_t", "eta", "Q_max",
+                   "D_min", "D_max", "V_initial")
+PERIODS = 12
+
+
+def _energy_coefficient(c):
+    return c["g"] * c["rho"] * c["Delta_t"] / (1000 * c["eta"])
+
+
+def _cheapest_flow(r, a, s, depth, c):
+    # Least Q meeting the linearised cooling constraints at this depth (see
+    # analytic._lines), or None when none does
+    if a <= 0.0:
+        return None
+    x = r - c["alpha"] * c["Q_max"] * (depth - c["D_min"])
+    lo, hi = max(0.0, r / a), c["Q_max"]
+    if s > 0.0:
+        lo = max(lo, x / s)
+    elif s < 0.0:
+        hi = min(hi, x / s)
+    elif x > 0.0:
+        return None
+    return lo if lo <= hi + 1e-9 * (1.0 + abs(hi)) else None
+
+
+def _solve_nodes(axes, c):
+    # Optimal depth and F at every grid node (NaN where infeasible)
+    it, temp, phi = np.meshgrid(*axes, indexing="ij")
+    r = (it / c["K_well"]).reshape(-1, 1)
+    B = (c["T_dc_target"] - temp).reshape(-1, 1)
+    depth, _, cost, feasible = analytic.solve_depth(
+        r, B + c["alpha"] * c["D_max"], B + c["alpha"] * c["D_min"], phi.reshape(-1, 1), 1.0,
+        c["alpha"] * c["Q_max"], c["Q_max"], c["D_min"], c["D_max"])
+    shape = it.shape
+    return (np.where(feasible, depth, np.nan).reshape(shape),
+            np.where(feasible, cost, np.nan).reshape(shape))
+
+
+def _cell_gaps(axes, depth, cost, c):
+    # Relative certified gap of F at every cell centre, and the monotone
+    # normalised cost N whose spread along each axis drives refinement
+    it, temp, phi = (np.asarray(a) for a in axes)
+    mid = [0.5 * (a[1:] + a[:-1]) for a in (it, temp, phi)]
+    mid[0] = np.sqrt(it[1:] * it[:-1])
+    mi, mt, mp = np.meshgrid(*mid, indexing="ij")
+
+    corners = np.stack([depth[i:depth.shape[0] - 1 + i, j:depth.shape[1] - 1 + j, k:depth.shape[2] - 1 + k]
+                        for i in (0, 1) for j in (0, 1) for k in (0, 1)])
+    d = corners.mean(axis=0)
+    r = mi / c["K_well"]
+    B = c["T_dc_target"] - mt
+    a = B + c["alpha"] * c["D_max"]
+    s = B + c["alpha"] * c["D_min"]
+    x = r - c["alpha"] * c["Q_max"] * (d - c["D_min"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lo = np.maximum(0.0, np.where(a > 0, r / a, np.inf))
+        lo = np.where(s > 0, np.maximum(lo, x / s), lo)
+        hi = np.where(s < 0, np.minimum(c["Q_max"], x / s), c["Q_max"])
+        hi = np.where((s == 0) & (x > 0), -np.inf, hi)
+        upper = np.where(lo <= hi + 1e-9 * (1 + np.abs(hi)), (d + mp) * lo, np.nan)
+        d_up = depth[:-1, :-1, 1:]
+        lower = (cost[:-1, :-1, :-1] * (mi / it[:-1, None, None])
+                 * ((c["T_dc_target"] - temp[:-1] + c["alpha"] * c["D_max"])[None, :, None] / a)
+                 * ((d_up + mp) / (d_up + phi[None, None, :-1])))
+        gap = (upper - lower) / lower
+        a_nodes = c["T_dc_target"] - temp + c["alpha"] * c["D_max"]
+        norm = cost / it[:, None, None] * a_nodes[None, :, None] / (depth + phi[None, None, :])
+    return gap, norm
+
+
+def build(envelope=None, rtol=1e-3, constants=None, initial=(9, 11, 5), max_nodes=4_000_000,
+          max_rounds=40, progress=None):
+    """Refine the grid until every cell centre is certified within rtol or max_nodes is reached.
+
+    Returns (axes, depth, cost, report). Each round splits, along one axis,
+    the intervals of the cells that fail: the axis over which the normalised
+    cost N changes most across the cell, or, when the bound is already tight
+    there, the axis over which the interpolated depth changes most.
+    """
+    c = {name: float(constants[name]) for name in TABLE_CONSTANTS}
+    if c["D_min"] < 1.0:
+        raise ValueError("the price-ratio bound needs D_min >= 1 m")
+    envelope = dict(ENVELOPE, **(envelope or {}))
+    (it_lo, it_hi), (t_lo, t_hi), (p_lo, p_hi) = (envelope[name] for name in AXES)
+    if not (0 < it_lo < it_hi and t_lo < t_hi and 0 <= p_lo < p_hi):
+        raise ValueError("each envelope axis needs lo < hi (and a positive IT load, non-negative price ratio)")
+    axes = [np.geomspace(it_lo, it_hi, initial[0]), np.linspace(t_lo, t_hi, initial[1]),
+            np.linspace(p_lo, p_hi, initial[2])]
+
+    started = time.perf_counter()
+    for round_ in range(max_rounds):
+        depth, cost = _solve_nodes(axes, c)
+        gap, norm = _cell_gaps(axes, depth, cost, c)
+        bad = gap > rtol
+        if progress is not None:
+            progress(round_, [len(a) for a in axes], float(np.mean(gap <= rtol)))
+        if not bad.any():
+            break
+
+        # Spread of N and of the depth across each cell, per axis
+        with np.errstate(invalid="ignore", divide="ignore"):
+            spread = [np.abs(np.diff(np.log(norm), axis=k)) for k in range(3)]
+        depth_spread = [np.abs(np.diff(depth, axis=k)) for k in range(3)]
+        scores = np.stack([_cell_max(spread[k], k) for k in range(3)])
+        tight = np.nan_to_num(scores, nan=np.inf).max(axis=0) <= rtol / 3
+        depth_scores = np.stack([_cell_max(depth_spread[k], k) for k in range(3)])
+        choice = np.where(tight, np.nanargmax(np.nan_to_num(depth_scores, nan=-1.0), axis=0),
+                          np.argmax(np.nan_to_num(scores, nan=-1.0), axis=0))
+        # Cells with an infeasible corner cannot be certified; leave them
+        bad &= np.isfinite(gap)
+        splits = [np.unique(np.nonzero(bad & (choice == k))[k]) for k in range(3)]
+        grown = [len(a) + len(s) for a, s in zip(axes, splits)]
+        if not any(len(s) for s in splits) or np.prod(grown) > max_nodes:
+            break
+        for k, intervals in enumerate(splits):
+            a = axes[k]
+            mids = np.sqrt(a[intervals] * a[intervals + 1]) if k == 0 else 0.5 * (a[intervals] + a[intervals + 1])
+            axes[k] = np.sort(np.concatenate([a, mids]))
+
+    certified = gap <= rtol
+    report = {
+        "nodes": int(depth.size),
+        "shape": list(depth.shape),
+        "rounds": round_ + 1,
+        "rtol": rtol,
+        "certified_cells": float(np.mean(certified)),
+        "feasible_nodes": float(np.mean(np.isfinite(cost))),
+        "seconds": time.perf_counter() - started,
+    }
+    return axes, depth, cost, report
+
+
+def _cell_max(edges, axis):
+    # Max over the four edges of each cell parallel to axis; edges has that axis shortened by one
+    out = edges
+    for k in range(3):
+        if k != axis:
+            sl_a = [slice(None)] * 3
+            sl_b = [slice(None)] * 3
+            sl_a[k] = slice(None, -1)
+            sl_b[k] = slice(1, None)
+            out = np.fmax(out[tuple(sl_a)], out[tuple(sl_b)])
+    return out
+
+
+def save(path, axes, depth, cost, constants, report):
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "depth.npy"), depth)
+    np.save(os.path.join(path, "cost.npy"), cost)
+    meta = {
+        "axes": {name: a.tolist() for name, a in zip(AXES, axes)},
+        "constants": {name: float(constants[name]) for name in TABLE_CONSTANTS},
+        "report": report,
+        "built_at": time.time(),
+    }
+    with open(os.path.join(path, "meta.json.tmp"), "w") as f:
+        json.dump(meta, f)
+    os.replace(os.path.join(path, "meta.json.tmp"), os.path.join(path, "meta.json"))
+
+
+class Table:
+    """A built table, memory-mapped; lookup() answers or declines in microseconds."""
+
+    def __init__(self, path, rtol=1e-3):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.path = path
+        self.rtol = rtol
+        self.axes = [meta["axes"][name] for name in AXES]
+        self.constants = meta["constants"]
+        self.report = meta["report"]
+        self.version = f"{meta['built_at']:.6f}"
+        self.depth = np.load(os.path.join(path, "depth.npy"), mmap_mode="r")
+        self.cost = np.load(os.path.join(path, "cost.npy"), mmap_mode="r")
+        if self.depth.shape != tuple(len(a) for a in self.axes) or self.cost.shape != self.depth.shape:
+            raise ValueError(f"Surrogate table at {path} does not match its axes")
+
+    def _cell(self, k, x):
+        # Lower node index and fraction of x along axis k, or None outside
+        axis = self.axes[k]
+        i = bisect.bisect_right(axis, x) - 1
+        if i == len(axis) - 1 and x == axis[-1]:
+            i -= 1
+        if i < 0 or i >= len(axis) - 1:
+            return None
+        return i, (x - axis[i]) / (axis[i + 1] - axis[i])
+
+    def lookup(self, it_load, ambient_temp, cost_energy, cost_water, evaporation_rate, constants):
+        """(solution, None) when certified within rtol, else (None, reason)."""
+        c = self.constants
+        for name in TABLE_CONSTANTS:
+            if constants[name] != c[name]:
+                return None, "constants"
+        w1 = cost_energy * _energy_coefficient(c)
+        w0 = cost_water * evaporation_rate * c["Delta_t"]
+        if not w1 > 0.0 or w0 < 0.0:
+            return None, "outside"
+        phi = w0 / w1
+        cells = (self._cell(0, it_load), self._cell(1, ambient_temp), self._cell(2, phi))
+        if None in cells:
+            return None, "outside"
+        (i, fi), (j, fj), (k, fk) = cells
+
+        # Trilinear depth over the cell's eight nodes
+        d = self.depth
+        d00 = d.item(i, j, k) * (1 - fk) + d.item(i, j, k + 1) * fk
+        d01 = d.item(i, j + 1, k) * (1 - fk) + d.item(i, j + 1, k + 1) * fk
+        d10 = d.item(i + 1, j, k) * (1 - fk) + d.item(i + 1, j, k + 1) * fk
+        d11 = d.item(i + 1, j + 1, k) * (1 - fk) + d.item(i + 1, j + 1, k + 1) * fk
+        depth = (d00 * (1 - fj) + d01 * fj) * (1 - fi) + (d10 * (1 - fj) + d11 * fj) * fi
+        if depth != depth:
+            return None, "outside"
+
+        r = it_load / c["K_well"]
+        B = c["T_dc_target"] - ambient_temp
+        a = B + c["alpha"] * c["D_max"]
+        flow = _cheapest_flow(r, a, B + c["alpha"] * c["D_min"], depth, c)
+        if flow is None:
+            return None, "bound"
+        upper = (depth + phi) * flow
+
+        axes = self.axes
+        d_up = d.item(i, j, k + 1)
+        lower = (self.cost.item(i, j, k) * (it_load / axes[0][i])
+                 * ((c["T_dc_target"] - axes[1][j] + c["alpha"] * c["D_max"]) / a)
+                 * ((d_up + phi) / (d_up + axes[2][k])))
+        fixed = cost_water * c["V_initial"]
+        objective = PERIODS * w1 * upper + fixed
+        gap = PERIODS * w1 * (upper - lower)
+        bound = gap / (PERIODS * w1 * lower + fixed)
+        if not bound <= self.rtol:
+            return None, "bound"
+        return {"ok": True, "status": "optimal", "solver_status": "certified", "engine": "surrogate",
+                "depth": depth, "flow_rates": [flow] * PERIODS, "objective": objective,
+                "surrogate": {"gap": gap, "bound": bound, "table": self.version}}, None
+
+    def solve(self, site, constants):
+        """Certified solution for a parsed flat monthly site, or None to use the solver."""
+        started = time.perf_counter()
+        solution, reason = self.lookup(site["it_load"].item(0), site["ambient_temp"].item(0),
+                                       site["client_energy_cost"], site["client_water_cost"],
+                                       site["client_evaporation_rate"], constants)
+        metrics.SURROGATE_LOOKUPS.inc(outcome=reason or "hit")
+        if solution is not None:
+            metrics.SOLVER_SECONDS.observe(time.perf_counter() - started, engine="surrogate")
+        return solution
+
+
+def _check(table, constants, n, seed):
+    # Lookup latency and certified-versus-true gaps on random envelope queries
+    rng = np.random.default_rng(seed)
+    (it_lo, it_hi), (t_lo, t_hi) = (table.axes[0][0], table.axes[0][-1]), (table.axes[1][0], table.axes[1][-1])
+    queries = np.column_stack([np.exp(rng.uniform(np.log(it_lo), np.log(it_hi), n)), rng.uniform(t_lo, t_hi, n),
+                               rng.uniform(0.05, 0.4, n), rng.uniform(0.5, 5.0, n), rng.uniform(0.01, 0.1, n)])
+    times, outcomes, found = [], {}, []
+    for row in queries.tolist():
+        started = time.perf_counter()
+        solution, reason = table.lookup(*row, constants)
+        times.append(time.perf_counter() - started)
+        outcomes[reason or "hit"] = outcomes.get(reason or "hit", 0) + 1
+        if solution is not None:
+            found.append((row, solution))
+    report = {"queries": n, "outcomes": outcomes}
+    us = np.asarray(times) * 1e6
+    report.update({"lookup_p50_us": float(np.percentile(us, 50)), "lookup_p99_us": float(np.percentile(us, 99))})
+    if found:
+        rows = np.array([row for row, _ in found])
+        _, _, exact, ok = analytic.solve_well(
+            np.repeat(rows[:, :1], PERIODS, axis=1), rows[:, 1], rows[:, 2], rows[:, 3], rows[:, 4], constants)
+        served = np.array([s["objective"] for _, s in found])
+        claimed = np.array([s["surrogate"]["gap"] for _, s in found])
+        error = served - exact
+        report.update({
+            "max_rel_error": float(np.max(error / exact)),
+            "max_claimed_bound": float(max(s["surrogate"]["bound"] for _, s in found)),
+            "bound_violations": int(np.sum(error > claimed * (1 + 1e-9) + 1e-9)),
+            "solver_infeasible": int(np.sum(~ok)),
+        })
+    return report
+
+
+def main(argv=None):
+    from model import MODEL_CONSTANTS
+
+    parser = argparse.ArgumentParser(description="Build or check the surrogate lookup table")
+    sub = parser.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("build", help="precompute a table over the query envelope")
+    b.add_argument("-o", "--output", required=True, help="table directory")
+    b.add_argument("--rtol", type=float, default=1e-3, help="certified relative cost gap to refine to")
+    b.add_argument("--max-nodes", type=int, default=4_000_000)
+    for name in AXES:
+        lo, hi = ENVELOPE[name]
+        b.add_argument(f"--{name.replace('_', '-')}", default=f"{lo:g}:{hi:g}", help=f"lo:hi (default {lo:g}:{hi:g})")
+    k = sub.add_parser("check", help="time lookups and compare them with the closed-form solver")
+    k.add_argument("table")
+    k.add_argument("-n", type=int, default=20000)
+    k.add_argument("--rtol", type=float, default=1e-3)
+    k.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        envelope = {name: tuple(float(v) for v in getattr(args, name).split(":")) for name in AXES}
+
+        def progress(round_, shape, certified):
+            print(f"round {round_}: grid {'x'.join(map(str, shape))}, {certified:.1%} of cells certified",
+                  file=sys.stderr)
+
+        axes, depth, cost, report = build(envelope, args.rtol, MODEL_CONSTANTS, max_nodes=args.max_nodes,
+                                          progress=progress)
+        save(args.output, axes, depth, cost, MODEL_CONSTANTS, report)
+        print(json.dumps(report, indent=2))
+    else:
+        print(json.dumps(_check(Table(args.table, args.rtol), dict(MODEL_CONSTANTS), args.n, args.seed), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
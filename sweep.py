@@ -0,0 +1,168 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import analytic
+import config
+import solvers
+from model import CLIENT_FIELDS, MODEL_CONSTANTS
+
+# Internal constants that may be swept alongside the client inputs
+SWEEP_CONSTANTS = ("alpha", "K_well", "D_max", "Q_max")
+SWEEP_OUTPUTS = ("savings", "depth", "total_cost", "energy", "net_water", "feasible")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _axis_values(spec):
+    # An axis is an explicit list of values or {"start", "stop", "num"}
+    if isinstance(spec, dict):
+        return np.linspace(float(spec["start"]), float(spec["stop"]), int(spec["num"]))
+    return np.asarray([float(v) for v in spec])
+
+
+def _grid(axes, base):
+    unknown = set(axes) - set(CLIENT_FIELDS) - set(SWEEP_CONSTANTS)
+    if unknown:
+        raise ValueError(f"Cannot sweep over: {', '.join(sorted(unknown))}")
+    missing = [f for f in CLIENT_FIELDS if f not in axes and f not in base]
+    if missing:
+        raise ValueError(f"Missing base values for: {', '.join(missing)}")
+    values = {name: _axis_values(spec) for name, spec in axes.items()}
+    shape = tuple(len(v) for v in values.values())
+    return values, shape
+
+
+def _solve_cells(engine, columns, constants, flows=False):
+    """Solve a block of grid cells; columns maps each input name to a (cells,) array.
+
+    With flows, the output also holds the (cells, 12) monthly flow rates.
+    """
+    constants = dict(constants)
+    constants.update({name: columns[name] for name in SWEEP_CONSTANTS if name in columns})
+    n = len(columns["client_ambient_temp"])
+    it_load = np.repeat(columns["client_avg_IT_load"][:, None], 12, axis=1)
+
+    if engine == "numpy":
+        depth, flow, total, feasible = analytic.solve_well(
+            it_load, columns["client_ambient_temp"], columns["client_energy_cost"],
+            columns["client_water_cost"], columns["client_evaporation_rate"], constants)
+    else:
+        solve = solvers.get_backend(engine)
+        depth, total = np.full(n, np.nan), np.full(n, np.nan)
+        flow = np.full((n, 12), np.nan)
+        feasible = np.zeros(n, dtype=bool)
+        for i in range(n):
+            cell = {name: (float(v[i]) if np.ndim(v) else v) for name, v in constants.items()}
+            T_surface = float(columns["client_ambient_temp"][i])
+            solution = solve(
+                cell["T_dc_target"] - T_surface, T_surface, it_load[i].tolist(),
+                float(columns["client_energy_cost"][i]), float(columns["client_water_cost"][i]),
+                float(columns["client_evaporation_rate"][i]), constants=cell)
+            if solution["ok"]:
+                depth[i], flow[i], total[i] = solution["depth"], solution["flow_rates"], solution["objective"]
+                feasible[i] = True
+
+    pumped = np.sum(flow, axis=1)
+    k_energy = constants["g"] * constants["rho"] * constants["Delta_t"] / (1000 * constants["eta"])
+    conventional_cost = (columns["client_annual_energy_conventional"] * columns["client_energy_cost"]
+                         + columns["client_annual_water_conventional"] * columns["client_water_cost"])
+    out = {
+        "savings": conventional_cost - total,
+        "depth": depth,
+        "total_cost": total,
+        "energy": pumped * depth * k_energy,
+        "net_water": constants["V_initial"] + columns["client_evaporation_rate"] * pumped * constants["Delta_t"],
+        "feasible": feasible,
+    }
+    for name in SWEEP_OUTPUTS[:-1]:
+        out[name] = np.where(feasible, out[name], np.nan)
+    if flows:
+        out["flow"] = np.where(feasible[:, None], flow, np.nan)
+    return out
+
+
+def to_jsonable(arr):
+    # NaN (infeasible cell) is not valid JSON, so it is sent as null
+    arr = np.asarray(arr)
+    if arr.dtype.kind != "f":
+        return arr.tolist()
+    return np.where(np.isnan(arr), None, arr).tolist()
+
+
+def _get_pool(workers):
+    # One long-lived pool per process; spawn keeps solver state out of children
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def iter_sweep(axes, base, engine=None, workers=None, chunk_size=None, max_cells=None):
+    """Solve every cell of a grid, yielding partial results as blocks finish.
+
+    axes maps client_* fields or one of SWEEP_CONSTANTS to a list of values or
+    {"start", "stop", "num"}; base supplies the non-swept client inputs. The
+    first item yielded describes the grid; each later item holds the flat
+    (C-order) cell indices of one finished block and its SWEEP_OUTPUTS arrays.
+    """
+    engine = engine or config.ENGINE
+    if engine == "crosscheck":
+        engine = "gurobi"
+    solvers.get_backend(engine)
+    values, shape = _grid(axes, base)
+    n_cells = int(np.prod(shape))
+    max_cells = config.SWEEP_MAX_CELLS if max_cells is None else max_cells
+    if n_cells > max_cells:
+        raise ValueError(f"Sweep of {n_cells} cells exceeds the limit of {max_cells}")
+    yield {"axes": {name: v.tolist() for name, v in values.items()}, "shape": list(shape)}
+
+    mesh = np.meshgrid(*values.values(), indexing="ij")
+    columns = {name: m.ravel() for name, m in zip(values, mesh)}
+    for field in CLIENT_FIELDS:
+        if field not in columns:
+            columns[field] = np.full(n_cells, float(base[field]))
+    constants = dict(MODEL_CONSTANTS)
+
+    workers = config.SWEEP_WORKERS if workers is None else workers
+    chunk_size = chunk_size or (config.SWEEP_CHUNK_NUMPY if engine == "numpy" else config.SWEEP_CHUNK_GUROBI)
+    blocks = [np.arange(lo, min(lo + chunk_size, n_cells)) for lo in range(0, n_cells, chunk_size)]
+
+    if workers <= 1 or len(blocks) == 1:
+        for idx in blocks:
+            yield idx, _solve_cells(engine, {k: v[idx] for k, v in columns.items()}, constants)
+        return
+
+    pool = _get_pool(workers)
+    futures = {
+        pool.submit(_solve_cells, engine, {k: v[idx] for k, v in columns.items()}, constants): idx
+        for idx in blocks
+    }
+    try:
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def run_sweep(axes, base, engine=None, workers=None, chunk_size=None, max_cells=None):
+    """Solve a full grid and return dense arrays shaped like the axes."""
+    started = time.perf_counter()
+    blocks = iter_sweep(axes, base, engine, workers, chunk_size, max_cells)
+    grid = next(blocks)
+    n_cells = int(np.prod(grid["shape"]))
+    dense = {name: np.full(n_cells, np.nan) for name in SWEEP_OUTPUTS[:-1]}
+    dense["feasible"] = np.zeros(n_cells, dtype=bool)
+    for idx, out in blocks:
+        for name in SWEEP_OUTPUTS:
+            dense[name][idx] = out[name]
+    grid.update({name: arr.reshape(grid["shape"]) for name, arr in dense.items()})
+    grid["elapsed"] = time.perf_counter() - started
+    return grid
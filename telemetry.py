@@ -0,0 +1,219 @@
+import json
+import math
+import threading
+import time
+
+# Reading kinds accepted by the ingest endpoint and their units.
+# pipe_status is 0 for intact and non-zero when a leak is reported;
+# water_saving is the site's current saving against the conventional plant.
+SENSOR_KINDS = {
+    "flow": "m³/s",
+    "pressure": "kPa",
+    "tank_level": "%",
+    "temperature": "°C",
+    "pipe_status": "",
+    "water_saving": "L/h",
+}
+
+# Worst status wins when sensors of one kind are summarised
+_SEVERITY = {"ok": 0, "warn": 1, "stale": 1, "alarm": 2}
+
+
+def parse_readings(payload, max_items=None):
+    """Validate an ingest body: a list of readings or {"readings": [...]}.
+
+    Each reading is {"sensor": id, "kind": one of SENSOR_KINDS, "value": x}
+    with an optional "ts" (Unix seconds, defaults to the time of receipt).
+    """
+    readings = payload.get("readings") if isinstance(payload, dict) else payload
+    if not isinstance(readings, list):
+        raise ValueError("Expected a list of readings")
+    if max_items is not None and len(readings) > max_items:
+        raise ValueError(f"Batch of {len(readings)} readings exceeds the limit of {max_items}")
+    now = time.time()
+    parsed = []
+    for i, r in enumerate(readings):
+        try:
+            kind = r["kind"]
+            if kind not in SENSOR_KINDS:
+                raise ValueError(f"unknown kind '{kind}'")
+            value = float(r["value"])
+            ts = float(r.get("ts", now))
+            if not (math.isfinite(value) and math.isfinite(ts)):
+                raise ValueError("value and ts must be finite")
+            sensor = str(r["sensor"])
+            if not sensor.strip("."):
+                raise ValueError(f"invalid sensor id '{sensor}'")
+            parsed.append((sensor, kind, value, ts))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Reading {i}: {e}") from None
+    return parsed
+
+
+class TelemetryHub:
+    """Latest sensor state fanned out to any number of live dashboards.
+
+    Ingest only updates state; a single publisher thread builds one
+    serialised snapshot per push interval when something changed, and every
+    connected stream is woken to send those same bytes. The cost of a push
+    is therefore independent of the number of open dashboards. Optional
+    detectors (detect.Detectors) see every accepted reading and set the
+    sensor statuses and warnings.
+    """
+
+    def __init__(self, push_interval=1.0, keepalive=15.0, stale_after=30.0, detectors=None):
+        self.push_interval = push_interval
+        self.keepalive = keepalive
+        self.stale_after = stale_after
+        self._sensors = {}
+        self._saving = {"rate": 0.0, "cumulative": 0.0, "ts": None}
+        self.detectors = detectors
+        self._dirty = True
+        self._version = 0
+        self._event = None
+        self._snapshot = None
+        self._subscribers = 0
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._published = threading.Condition(self._lock)
+        self._publisher = None
+
+    def ingest(self, readings):
+        with self._lock:
+            for sensor, kind, value, ts in readings:
+                current = self._sensors.get(sensor)
+                if current is not None and ts < current["ts"]:
+                    continue
+                self._sensors[sensor] = {"kind": kind, "value": value, "ts": ts}
+                if self.detectors is not None:
+                    self.detectors.update(sensor, kind, value, ts)
+                if kind == "water_saving":
+                    self._accumulate_saving(value, ts)
+            self._dirty = True
+            self._changed.notify()
+        return len(readings)
+
+    def snapshot(self):
+        """The current state; pushes to streams stay with the publisher thread."""
+        with self._lock:
+            if self._snapshot is None or self._dirty:
+                # Built fresh without publishing, so polling never adds events
+                return self._build()
+            return self._snapshot
+
+    def stream(self):
+        """Yield server-sent events: the current snapshot, then each new one."""
+        self._ensure_publisher()
+        with self._lock:
+            self._subscribers += 1
+            if self._event is None:
+                self._publish()
+            version, event = self._version, self._event
+        try:
+            yield event
+            while True:
+                with self._lock:
+                    self._published.wait_for(lambda: self._version != version, timeout=self.keepalive)
+                    fresh = self._version != version
+                    version, event = self._version, self._event
+                # A comment line keeps proxies from closing an idle stream
+                yield event if fresh else ": keepalive\n\n"
+        finally:
+            with self._lock:
+                self._subscribers -= 1
+
+    def detector_state(self):
+        with self._lock:
+            return self.detectors.state() if self.detectors is not None else None
+
+    def stats(self):
+        with self._lock:
+            return {"sensors": len(self._sensors), "subscribers": self._subscribers,
+                    "version": self._version}
+
+    def _accumulate_saving(self, rate, ts):
+        # Caller holds the lock; integrates the saving rate (L/h) over time
+        saving = self._saving
+        if saving["ts"] is not None and ts > saving["ts"]:
+            saving["cumulative"] += saving["rate"] * (ts - saving["ts"]) / 3600.0
+        saving["rate"], saving["ts"] = rate, ts
+
+    def _status(self, sensor_id, sensor, now):
+        if now - sensor["ts"] > self.stale_after:
+            return "stale", f"no reading for {now - sensor['ts']:.0f} s"
+        if sensor["kind"] == "pipe_status" and sensor["value"] != 0:
+            return "alarm", "leak reported"
+        if self.detectors is not None:
+            return self.detectors.status(sensor_id)
+        return "ok", None
+
+    def _build(self):
+        # Caller holds the lock; the state as of now, tagged with the last published version
+        now = time.time()
+        sensors = {}
+        summary = {}
+        warnings = []
+        for sensor_id, s in sorted(self._sensors.items()):
+            status, reason = self._status(sensor_id, s, now)
+            sensors[sensor_id] = dict(s, status=status, reason=reason)
+            group = summary.setdefault(s["kind"], {"values": [], "status": "ok"})
+            group["values"].append(s["value"])
+            if _SEVERITY[status] > _SEVERITY[group["status"]]:
+                group["status"] = status
+            if reason:
+                warnings.append(f"{sensor_id}: {reason}")
+        for kind, group in summary.items():
+            values = group.pop("values")
+            group["value"] = max(values) if kind == "pipe_status" else sum(values) / len(values)
+            group["unit"] = SENSOR_KINDS[kind]
+            group["sensors"] = len(values)
+
+        # The mass balance speaks for the pipes even without a leak sensor
+        balance = self.detectors.mass_balance if self.detectors is not None else None
+        if balance is not None and balance.level is not None:
+            pipes = summary.setdefault("pipe_status", {"status": "ok", "value": 0.0,
+                                                       "unit": "", "sensors": 0})
+            if _SEVERITY[balance.status] > _SEVERITY[pipes["status"]]:
+                pipes["status"] = balance.status
+            if balance.reason:
+                warnings.append(f"mass balance: {balance.reason}")
+
+        return {
+            "version": self._version,
+            "ts": now,
+            "sensors": sensors,
+            "summary": summary,
+            "savings": {"rate_lph": self._saving["rate"], "cumulative_l": self._saving["cumulative"]},
+            "warnings": warnings,
+            "mass_balance": balance.state() if balance is not None else None,
+        }
+
+    def _publish(self):
+        # Caller holds the lock
+        self._version += 1
+        self._snapshot = self._build()
+        self._event = f"id: {self._version}\nevent: snapshot\ndata: {json.dumps(self._snapshot)}\n\n"
+        self._dirty = False
+        self._published.notify_all()
+
+    def _ensure_publisher(self):
+        with self._lock:
+            if self._publisher is None:
+                self._publisher = threading.Thread(target=self._run, name="pipelong-telemetry",
+                                                   daemon=True)
+                self._publisher.start()
+
+    def _run(self):
+        # Coalesce ingests into at most one push per interval; staleness is
+        # re-evaluated on idle ticks so silent sensors still change colour
+        last = 0.0
+        while True:
+            with self._lock:
+                self._changed.wait_for(lambda: self._dirty, timeout=self.stale_after / 2)
+                wait = self.push_interval - (time.monotonic() - last)
+            if wait > 0:
+                time.sleep(wait)
+            with self._lock:
+                if self._subscribers:
+                    self._publish()
+            last = time.monotonic()
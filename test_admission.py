@@ -0,0 +1,138 @@
+import threading
+import time
+
+import pytest
+
+import app
+from admission import Admission, Rejected, SingleFlight
+
+
+def _start(fn, *args):
+    out = {}
+
+    def run():
+        try:
+            out["result"] = fn(*args)
+        except Exception as e:
+            out["error"] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, out
+
+
+def _wait_for_waiters(flight, key, n):
+    deadline = time.monotonic() + 5.0
+    while True:
+        with flight._lock:
+            call = flight._calls.get(key)
+            if call is not None and call.waiters >= n:
+                return
+        assert time.monotonic() < deadline, "followers never joined"
+        time.sleep(0.005)
+
+
+def test_followers_share_the_leaders_result():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def solve():
+        calls.append(1)
+        release.wait(5.0)
+        return "solved"
+
+    leader = _start(flight.do, "k", solve)
+    _wait_for_waiters(flight, "k", 0)
+    followers = [_start(flight.do, "k", solve) for _ in range(3)]
+    _wait_for_waiters(flight, "k", 3)
+    release.set()
+    for thread, out in [leader] + followers:
+        thread.join(5.0)
+    assert len(calls) == 1
+    assert leader[1]["result"] == ("solved", False)
+    assert all(out["result"] == ("solved", True) for _, out in followers)
+    assert flight.stats() == {"in_flight": 0, "coalesced": 3}
+
+
+def test_follower_retries_after_the_leader_is_rejected():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def rejected():
+        release.wait(5.0)
+        raise Rejected("over the limit", 429)
+
+    leader = _start(flight.do, "k", rejected)
+    _wait_for_waiters(flight, "k", 0)
+    follower = _start(flight.do, "k", lambda: "own solve")
+    _wait_for_waiters(flight, "k", 1)
+    release.set()
+    leader[0].join(5.0)
+    follower[0].join(5.0)
+    assert isinstance(leader[1]["error"], Rejected)
+    assert follower[1]["result"] == ("own solve", False)
+    assert flight.stats()["coalesced"] == 0
+
+
+def test_leaders_real_errors_are_shared():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5.0)
+        raise ValueError("bad input")
+
+    leader = _start(flight.do, "k", failing)
+    _wait_for_waiters(flight, "k", 0)
+    follower = _start(flight.do, "k", lambda: "never")
+    _wait_for_waiters(flight, "k", 1)
+    release.set()
+    leader[0].join(5.0)
+    follower[0].join(5.0)
+    assert isinstance(follower[1]["error"], ValueError)
+
+
+def test_client_over_its_limit_is_429():
+    admission = Admission(limit=4, per_client=1, wait=0.0)
+    admission.acquire("a")
+    with pytest.raises(Rejected) as e:
+        admission.acquire("a")
+    assert e.value.status == 429
+    admission.acquire("b")  # other clients are unaffected
+    assert admission.stats()["rejected"] == {"client": 1, "busy": 0}
+
+
+def test_server_full_is_503_after_the_wait():
+    admission = Admission(limit=2, per_client=0, wait=0.05)
+    admission.acquire("a")
+    admission.acquire("b")
+    started = time.monotonic()
+    with pytest.raises(Rejected) as e:
+        admission.acquire("c")
+    assert e.value.status == 503
+    assert time.monotonic() - started >= 0.05
+    admission.release("a")
+    admission.acquire("c")
+    assert admission.stats()["running"] == 2
+
+
+def test_waiting_caller_gets_a_released_slot():
+    admission = Admission(limit=1, per_client=0, wait=5.0)
+    admission.acquire("a")
+    thread, out = _start(admission.run, "b", lambda: "ran")
+    time.sleep(0.05)
+    admission.release("a")
+    thread.join(5.0)
+    assert out["result"] == "ran"
+    assert admission.stats()["running"] == 0
+
+
+def test_http_rejection_carries_status_and_retry_after(monkeypatch):
+    busy = Admission(limit=1, per_client=0, wait=0.0)
+    busy.acquire("someone else")
+    monkeypatch.setattr(app, "admission", busy)
+    client = app.app.test_client()
+    response = client.post("/portfolio", json={"sites": []})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
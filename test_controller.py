@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+import analytic
+from controller import FlowController, plan_flows
+from model import MODEL_CONSTANTS
+
+
+def _controller(**kwargs):
+    # A generous budget so a slow test machine never takes the fallback path
+    return FlowController(40.0, dict(MODEL_CONSTANTS), budget=5.0, **kwargs)
+
+
+def test_interval_cost_matches_the_well_model():
+    interval = 900.0
+    controller = _controller(horizon=1, interval=interval)
+    result = controller.step({"it_load": 500.0, "ambient_temp": 24.0, "evaporation_rate": 0.03,
+                              "energy_cost": 0.15, "water_cost": 2.0, "tank_level": 50.0})
+    assert result["status"] == "optimal"
+    q = result["setpoint"]
+
+    constants = dict(MODEL_CONSTANTS, Delta_t=interval / 3600.0)
+    (_, _, _, w0, w1), _ = analytic.well_terms([500.0], 24.0, 0.15, 2.0, 0.03, constants)
+    assert result["cost"] == pytest.approx(float(w0[0, 0] + w1[0, 0] * 40.0) * q, rel=1e-12)
+    assert result["water_m3"] == pytest.approx(0.03 * q * interval / 3600.0, rel=1e-12)
+    drop = result["water_m3"] / controller.tank_capacity * 100.0
+    assert result["tank_level"][0] == pytest.approx(50.0 - drop, rel=1e-12)
+
+
+def test_setpoint_meets_the_cooling_constraint():
+    c = MODEL_CONSTANTS
+    result = _controller().step({"it_load": 800.0, "ambient_temp": 26.0})
+    cooling = c["K_well"] * (c["T_dc_target"] - 26.0 + c["alpha"] * 40.0) * result["setpoint"]
+    assert cooling == pytest.approx(800.0, rel=1e-9)
+
+
+def test_plan_respects_the_ramp_limit():
+    plan = plan_flows([0.1, 0.1, 3.0, 0.1], q_prev=0.1, max_step=0.5, q_max=6.0)
+    assert np.all(np.abs(np.diff(np.concatenate([[0.1], plan]))) <= 0.5 + 1e-12)
+    assert plan[2] == pytest.approx(1.6)
@@ -0,0 +1,94 @@
+import time
+
+import numpy as np
+
+from detect import ChannelDetector, Detectors, MassBalance
+from telemetry import TelemetryHub, parse_readings
+
+
+def _steady(detector, n=200, mean=10.0, sd=0.1, seed=0):
+    rng = np.random.default_rng(seed)
+    for ts, value in enumerate(rng.normal(mean, sd, n)):
+        detector.update(float(value), float(ts))
+    return n
+
+
+def test_steady_channel_stays_ok():
+    detector = ChannelDetector()
+    _steady(detector)
+    assert detector.status == "ok"
+    assert abs(detector.mean - 10.0) < 0.05
+    assert 0.05 < detector.std() < 0.2
+
+
+def test_spike_alarms_and_is_held():
+    detector = ChannelDetector(hold=60.0)
+    ts = _steady(detector)
+    assert detector.update(20.0, ts) == "alarm"
+    assert "spike" in detector.reason
+    # The baseline barely moves, and the alarm is held for hold seconds
+    assert abs(detector.mean - 10.0) < 0.1
+    assert detector.update(10.0, ts + 1) == "alarm"
+    assert detector.update(10.0, ts + 61) == "ok"
+
+
+def test_sustained_shift_warns():
+    detector = ChannelDetector()
+    ts = _steady(detector)
+    statuses = [detector.update(10.3, ts + i) for i in range(30)]
+    assert "alarm" not in statuses
+    assert statuses[-1] == "warn"
+    assert "shift up" in detector.reason
+
+
+def _run_loop(balance, windows, flow=0.01, leak_per_window=0.0, level=50.0, start=0.0):
+    # One flow reading per minute and a tank reading every 5 minutes
+    ts = start
+    for _ in range(windows):
+        for _ in range(5):
+            balance.update_flow("pump", flow, ts)
+            ts += 60.0
+        level -= leak_per_window / balance.tank_capacity * 100.0
+        balance.update_level(level, ts)
+    return ts, level
+
+
+def test_closed_loop_without_loss_is_ok():
+    balance = MassBalance(tank_capacity=1000.0)
+    balance.update_level(50.0, 0.0)
+    _run_loop(balance, 20)
+    assert balance.status == "ok"
+    assert abs(balance.drift) < 1e-9
+
+
+def test_mass_balance_raises_a_leak_and_recovers():
+    balance = MassBalance(tank_capacity=1000.0, tolerance=0.01, hold=60.0)
+    balance.update_level(50.0, 0.0)
+    ts, level = _run_loop(balance, 3, leak_per_window=0.5)
+    assert balance.status == "alarm"
+    assert "losing" in balance.reason
+    assert abs(balance.drift - 6.0) < 1e-6  # 0.5 m³ per 5 minutes
+    ts, level = _run_loop(balance, 40, level=level, start=ts)
+    assert balance.status == "ok"
+
+
+def test_expected_evaporation_is_not_a_leak():
+    balance = MassBalance(tank_capacity=1000.0, loss_fraction=0.1)
+    balance.update_level(50.0, 0.0)
+    # 0.01 m³/s for 300 s pumps 3 m³, of which a tenth may evaporate
+    _run_loop(balance, 20, leak_per_window=0.3)
+    assert balance.status == "ok"
+
+
+def test_hub_reports_detector_statuses():
+    hub = TelemetryHub(detectors=Detectors(MassBalance(tank_capacity=1000.0)))
+    rng = np.random.default_rng(1)
+    start = time.time() - 100.0
+    readings = [{"sensor": "f1", "kind": "flow", "value": float(v), "ts": start + i}
+                for i, v in enumerate(rng.normal(1.0, 0.01, 100))]
+    readings.append({"sensor": "f1", "kind": "flow", "value": 5.0, "ts": start + 100.0})
+    hub.ingest(parse_readings(readings))
+    snapshot = hub.snapshot()
+    assert snapshot["sensors"]["f1"]["status"] == "alarm"
+    assert snapshot["summary"]["flow"]["status"] == "alarm"
+    assert any(w.startswith("f1: spike") for w in snapshot["warnings"])
@@ -0,0 +1,59 @@
+import pytest
+
+import bench
+import model
+import solvers
+
+# The numpy closed form is exact; HiGHS searches the depth to HIGHS_DEPTH_TOL
+# and Gurobi solves the bilinear model to its own tolerances
+RTOL = {"numpy": 1e-7, "highs": 1e-5, "gurobi": 1e-7}
+
+BASELINE = {
+    "client_annual_energy_conventional": 500000,
+    "client_annual_water_conventional": 2000,
+    "client_avg_IT_load": 1000,
+    "client_evaporation_rate": 0.02,
+    "client_energy_cost": 0.12,
+    "client_water_cost": 1.5,
+    "client_ambient_temp": 20,
+}
+BASELINE_COST = 10406.974
+
+
+def _engines():
+    engines = ["numpy", "highs"]
+    if "gurobi" in solvers.available_backends():
+        engines.append("gurobi")
+    return engines
+
+
+def _cases(n=20, seed=3):
+    for data in bench.make_inputs(n, None, seed=seed):
+        data.pop("engine")
+        yield data
+
+
+@pytest.mark.parametrize("engine", _engines())
+def test_baseline_monthly_cost(engine):
+    results = model.run_model(dict(BASELINE), engine=engine)
+    assert results["total_cost_new"] == pytest.approx(BASELINE_COST, rel=RTOL[engine], abs=1e-3)
+
+
+@pytest.mark.parametrize("engine", [e for e in _engines() if e != "numpy"])
+def test_engine_matches_numpy(engine):
+    for data in _cases():
+        expected = model.run_model(dict(data), engine="numpy")
+        results = model.run_model(dict(data), engine=engine)
+        assert ("error" in results) == ("error" in expected), data
+        if "error" in expected:
+            continue
+        assert results["total_cost_new"] == pytest.approx(expected["total_cost_new"], rel=RTOL[engine]), data
+        assert results["optimal_energy_new"] == pytest.approx(expected["optimal_energy_new"], rel=1e-3, abs=1e-6), data
+
+
+@pytest.mark.parametrize("horizon", ["daily", "hourly"])
+def test_highs_matches_numpy_on_longer_horizons(horizon):
+    data = dict(BASELINE, horizon=horizon)
+    expected = model.run_model(dict(data), engine="numpy")
+    results = model.run_model(dict(data), engine="highs")
+    assert results["total_cost_new"] == pytest.approx(expected["total_cost_new"], rel=RTOL["highs"])
@@ -0,0 +1,96 @@
+import csv
+import io
+
+import pytest
+
+import app
+from history import RunStore
+
+
+def _results(cost):
+    return {"total_cost_new": cost, "conventional_cost": 2 * cost, "savings": cost,
+            "optimal_energy_new": 10.0, "optimal_net_water_new": 1.0,
+            "flow_data": [{"flow_rate": 0.5}, {"flow_rate": 0.25}]}
+
+
+def _inputs(i):
+    return {"site": f"s{i % 3}", "client_avg_IT_load": 100.0 + i, "client_ambient_temp": 20.0,
+            "client_energy_cost": 0.1, "client_water_cost": 2.0}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = RunStore(str(tmp_path / "runs.sqlite3"), interval=0.0)
+    for i in range(25):
+        store.record(_inputs(i), _results(float(i)), "numpy", {"solve": 0.001}, 0.002)
+    store.record(_inputs(99), {"error": "no feasible depth", "status": "infeasible"}, "highs")
+    store.flush()
+    yield store
+    store.close()
+
+
+def test_cursor_pages_through_every_run_newest_first(store):
+    seen, before = [], None
+    while True:
+        runs, before = store.query(limit=10, before=before)
+        seen.extend(run["id"] for run in runs)
+        if before is None:
+            break
+    assert seen == sorted(seen, reverse=True)
+    assert len(seen) == len(set(seen)) == 26
+
+
+def test_filters(store):
+    runs, _ = store.query({"site": "s1"})
+    assert {run["site"] for run in runs} == {"s1"} and len(runs) == 8
+    runs, _ = store.query({"min_it_load": 110, "max_it_load": 114.5})
+    assert sorted(run["client_avg_IT_load"] for run in runs) == [110, 111, 112, 113, 114]
+    runs, _ = store.query({"status": "infeasible"})
+    assert len(runs) == 1 and runs[0]["engine"] == "highs" and runs[0]["total_cost"] is None
+    with pytest.raises(ValueError):
+        store.query({"colour": "blue"})
+
+
+def test_get_decodes_the_json_columns(store):
+    run = store.get(store.query(limit=1)[0][0]["id"] - 1)
+    assert run["flow_rates"] == [0.5, 0.25]
+    assert run["timings"] == {"solve": 0.001}
+    assert run["inputs"]["site"] == "s0"
+    assert store.get(10 ** 9) is None
+
+
+def test_csv_export_streams_every_matching_row(store):
+    rows = list(csv.DictReader(io.StringIO("".join(store.export_csv({"engine": "numpy"}, batch=4)))))
+    assert len(rows) == 25
+    assert [int(row["id"]) for row in rows] == sorted(int(row["id"]) for row in rows)
+    assert float(rows[3]["total_cost"]) == 3.0
+
+
+def test_batches_are_split_into_runs(store):
+    payload = {"client_avg_IT_load": [1.0, 2.0], "site": ["b", "b"]}
+    store.record_batch(payload, [_results(1.0), _results(2.0)], "numpy")
+    store.flush()
+    assert len(store.query({"site": "b"})[0]) == 2
+
+
+def test_a_failed_write_does_not_stop_the_writer(store):
+    store.record(_inputs(1), {"total_cost_new": 1.0}, "numpy")  # no flow_data
+    store.flush()
+    store.record(_inputs(2), _results(2.0), "numpy")
+    store.flush()
+    assert store.stats() == {"pending": 0, "written": 27, "dropped": 1}
+
+
+def test_http_paging_and_export(monkeypatch, store):
+    monkeypatch.setattr(app, "run_store", store)
+    client = app.app.test_client()
+    page = client.get("/runs?limit=20&engine=numpy").get_json()
+    assert page["count"] == 20
+    rest = client.get(f"/runs?limit=20&engine=numpy&before={page['next']}").get_json()
+    assert rest["count"] == 5 and rest["next"] is None
+    assert client.get("/runs?colour=blue").status_code == 200  # unknown query args are ignored
+    assert client.get("/runs?min_it_load=x").status_code == 400
+    export = client.get("/runs/export?site=s2")
+    assert export.status_code == 200
+    assert len(export.get_data(as_text=True).strip().splitlines()) == 1 + 8
+    assert client.get("/runs/export?format=xml").status_code == 400
@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+import app
+from jobs import JobQueue, QueueFull
+
+
+def _wait(queue, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while queue.get(job_id).status in ("queued", "running"):
+        assert time.monotonic() < deadline, "job did not finish"
+        time.sleep(0.01)
+    return queue.get(job_id)
+
+
+@pytest.fixture
+def gate():
+    release = threading.Event()
+    yield release
+    release.set()
+
+
+def test_cancel_queued_job_never_runs(gate):
+    queue = JobQueue(workers=1)
+    ran = []
+    blocker = queue.submit("block", gate.wait, 5.0)
+    waiting = queue.submit("run", ran.append, "ran")
+    assert queue.cancel(waiting.id).status == "cancelled"
+    gate.set()
+    assert _wait(queue, blocker.id).status == "done"
+    assert ran == []
+    assert queue.stats()["pending"] == 0
+
+
+def test_cancel_running_job_discards_its_result(gate):
+    queue = JobQueue(workers=1)
+    started = threading.Event()
+
+    def solve():
+        started.set()
+        gate.wait(5.0)
+        return {"total_cost_new": 1.0}
+
+    job = queue.submit("run", solve)
+    assert started.wait(5.0)
+    queue.cancel(job.id)
+    gate.set()
+    job = _wait(queue, job.id)
+    assert job.status == "cancelled"
+    assert job.result is None
+
+
+def test_queue_full_raises(gate):
+    queue = JobQueue(workers=1, max_pending=2)
+    queue.submit("block", gate.wait, 5.0)
+    queue.submit("block", gate.wait, 5.0)
+    with pytest.raises(QueueFull):
+        queue.submit("block", gate.wait, 5.0)
+
+
+def test_finished_jobs_expire():
+    queue = JobQueue(workers=1, retention=0.05)
+    job = queue.submit("run", lambda: 42)
+    assert _wait(queue, job.id).result == 42
+    time.sleep(0.1)
+    assert queue.get(job.id) is None
+
+
+def test_http_queue_full_is_429(monkeypatch, gate):
+    monkeypatch.setattr(app, "job_queue", JobQueue(workers=1, max_pending=1))
+    monkeypatch.setitem(app.JOB_KINDS, "sweep", lambda data: gate.wait(5.0))
+    client = app.app.test_client()
+    body = {"kind": "sweep", "payload": {"axes": {}}}
+    first = client.post("/jobs", json=body)
+    assert first.status_code == 202
+    second = client.post("/jobs", json=body)
+    assert second.status_code == 429
+    assert second.headers["Retry-After"] == "1"
+    assert client.delete(f"/jobs/{first.get_json()['job_id']}").status_code == 200
+
+
+@pytest.mark.parametrize("body", [
+    {"kind": "run-model"},
+    {"kind": "run-model", "payload": {"client_avg_IT_load": 300}},
+    {"kind": "portfolio", "payload": {}},
+    {"kind": "batch", "payload": {"engine": "numpy"}},
+    {"kind": "nope", "payload": {}},
+])
+def test_http_bad_job_is_400(body):
+    assert app.app.test_client().post("/jobs", json=body).status_code == 400
+
+
+def test_http_unknown_job_is_404():
+    client = app.app.test_client()
+    assert client.get("/jobs/missing").status_code == 404
+    assert client.delete("/jobs/missing").status_code == 404
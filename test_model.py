@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+import graph
+import model
+
+SITE = {
+    "client_annual_energy_conventional": 120000, "client_annual_water_conventional": 600,
+    "client_avg_IT_load": 300, "client_evaporation_rate": 0.04, "client_energy_cost": 0.18,
+    "client_water_cost": 2.25, "client_ambient_temp": 27.5,
+}
+
+
+def _values(constants):
+    values = model._parse_site(SITE)
+    values.update(engine="numpy", surrogate=None, constants=constants,
+                  baseline_version=model._baseline_version())
+    return values
+
+
+def test_period_stage_uses_the_constants_it_is_keyed_on():
+    constants = dict(model.MODEL_CONSTANTS, eta=model.MODEL_CONSTANTS["eta"] / 2)
+    stages, _ = model._GRAPH.evaluate(_values(constants))
+    solution = stages["solve"]
+    c = constants
+    expected = (c["g"] * c["rho"] * c["Delta_t"] / (1000 * c["eta"])
+                * solution["depth"] * np.sum(solution["flow_rates"]))
+    assert stages["periods"]["optimal_energy_new"] == pytest.approx(expected, rel=1e-12)
+
+
+def test_editing_conventional_figures_reuses_the_solve():
+    memo = graph.Memo()
+    first = model.run_model(dict(SITE), engine="numpy", memo=memo)
+    versions = {name: memo.stages[name][1] for name in ("solve", "periods")}
+    second = model.run_model(dict(SITE, client_annual_energy_conventional=150000), engine="numpy", memo=memo)
+    assert {name: memo.stages[name][1] for name in ("solve", "periods")} == versions
+    assert second["total_cost_new"] == first["total_cost_new"]
+    assert second["savings"] == pytest.approx(first["savings"] + 30000 * SITE["client_energy_cost"])
@@ -0,0 +1,51 @@
+import os
+
+import pandas as pd
+import pytest
+
+import optimise
+from model import CLIENT_FIELDS
+
+SITE = {
+    "client_annual_energy_conventional": 120000, "client_annual_water_conventional": 600,
+    "client_avg_IT_load": 300, "client_evaporation_rate": 0.04, "client_energy_cost": 0.18,
+    "client_water_cost": 2.25, "client_ambient_temp": 27.5,
+}
+
+
+@pytest.fixture
+def sites(tmp_path):
+    path = tmp_path / "sites.csv"
+    pd.DataFrame([dict(SITE, client_avg_IT_load=100.0 + 10 * i) for i in range(10)])[list(CLIENT_FIELDS)].to_csv(
+        path, index=False)
+    return str(path)
+
+
+def test_rerun_resumes_from_the_checkpoint(sites, tmp_path):
+    out = str(tmp_path / "out")
+    first = optimise.run(sites, out, engine="numpy", workers=1, chunk_rows=4, fmt="npz")
+    assert (first["rows"], first["solved"]) == (10, 10)
+    again = optimise.run(sites, out, engine="numpy", workers=1, chunk_rows=4, fmt="npz")
+    assert (again["rows"], again["solved"]) == (10, 0)
+
+
+def test_part_files_without_a_checkpoint_are_kept(sites, tmp_path):
+    out = tmp_path / "out"
+    out.mkdir()
+    for name in ("part-000000.parquet", "part-000001.parquet", "notes.txt"):
+        (out / name).write_text("someone else's data")
+    with pytest.raises(ValueError, match="part-000000.parquet, part-000001.parquet"):
+        optimise.run(sites, str(out), engine="numpy", workers=1, chunk_rows=4, fmt="npz")
+    assert sorted(os.listdir(out)) == ["notes.txt", "part-000000.parquet", "part-000001.parquet"]
+
+    report = optimise.run(sites, str(out), engine="numpy", workers=1, chunk_rows=4, fmt="npz", restart=True)
+    assert report["rows"] == 10
+    assert "part-000000.parquet" not in os.listdir(out) and "notes.txt" in os.listdir(out)
+
+
+def test_cli_refuses_with_exit_code_2(sites, tmp_path, capsys):
+    out = tmp_path / "out"
+    out.mkdir()
+    (out / "part-000000.npz").write_bytes(b"")
+    assert optimise.main([sites, "-o", str(out), "--engine", "numpy", "--workers", "1", "-q"]) == 2
+    assert "--restart would remove part-000000.npz" in capsys.readouterr().err
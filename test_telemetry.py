@@ -0,0 +1,30 @@
+import time
+
+from telemetry import TelemetryHub, parse_readings
+
+
+def test_snapshot_does_not_publish():
+    hub = TelemetryHub(push_interval=60.0)
+    hub.ingest(parse_readings([{"sensor": "f1", "kind": "flow", "value": 1.5}]))
+    for value in (2.0, 2.5, 3.0):
+        hub.ingest(parse_readings([{"sensor": "f1", "kind": "flow", "value": value}]))
+        snapshot = hub.snapshot()
+        assert snapshot["sensors"]["f1"]["value"] == value
+    assert snapshot["version"] == 0
+    assert hub.stats()["version"] == 0
+
+
+def test_stream_pushes_at_most_once_per_interval():
+    hub = TelemetryHub(push_interval=1.0, keepalive=5.0)
+    stream = hub.stream()
+    assert next(stream).startswith("id: 1\n")
+    started = time.monotonic()
+    for value in range(50):
+        hub.ingest(parse_readings([{"sensor": "f1", "kind": "flow", "value": value}]))
+        assert hub.snapshot()["sensors"]["f1"]["value"] == value
+    # Polling added nothing: at most the publisher's one push in the interval
+    assert time.monotonic() - started < 1.0
+    assert hub.stats()["version"] <= 2
+    second = next(stream)
+    assert second.startswith("id: 2\n")
+    stream.close()
@@ -0,0 +1,92 @@
+import glob
+import os
+
+import numpy as np
+import pytest
+
+import app
+from timeseries import SEGMENT_BUCKETS, SeriesStore
+
+LEVELS = ((1, 1000), (10, 1000), (100, 1000))
+
+
+def _fill(store, channel, ts):
+    store.append_many((channel, t, float(t)) for t in ts)
+
+
+def test_rollups_match_the_raw_samples():
+    store = SeriesStore(LEVELS)
+    _fill(store, "flow", range(1000))
+    coarse = store.query("flow", 0, 1000, step=100)
+    assert list(coarse["count"]) == [100] * 10
+    assert list(coarse["sum"]) == [sum(range(i, i + 100)) for i in range(0, 1000, 100)]
+    assert coarse["min"][3] == 300 and coarse["max"][3] == 399
+    summary = store.aggregate("flow", 5, 995)
+    assert summary["count"] == 990
+    assert summary["sum"] == sum(range(5, 995))
+    assert (summary["min"], summary["max"]) == (5, 994)
+
+
+def test_query_picks_the_finest_level_within_max_points():
+    store = SeriesStore(LEVELS)
+    _fill(store, "flow", range(1000))
+    assert store.query("flow", 0, 1000, max_points=1000)["step"] == 1
+    assert store.query("flow", 0, 1000, max_points=100)["step"] == 10
+    with pytest.raises(ValueError):
+        store.query("flow", 0, 1000, step=7)
+    with pytest.raises(KeyError):
+        store.query("pressure", 0, 1000)
+
+
+def test_segments_replay_after_restart(tmp_path):
+    store = SeriesStore(LEVELS, directory=str(tmp_path))
+    _fill(store, "flow", range(500))
+    store.close()
+
+    store = SeriesStore(LEVELS, directory=str(tmp_path))
+    assert store.aggregate("flow", 0, 500)["sum"] == sum(range(500))
+    # A late sample for a bucket already on disk is written as a delta
+    store.append("flow", 250, 1000.0)
+    _fill(store, "flow", range(500, 600))
+    store.close()
+
+    store = SeriesStore(LEVELS, directory=str(tmp_path))
+    summary = store.aggregate("flow", 0, 600)
+    assert summary["count"] == 601
+    assert summary["sum"] == sum(range(600)) + 1000.0
+    assert store.query("flow", 200, 300, step=100)["max"][0] == 1000.0
+    store.close()
+
+
+def test_old_segments_are_pruned(tmp_path):
+    store = SeriesStore(((1, SEGMENT_BUCKETS),), directory=str(tmp_path))
+    for first in range(0, 3 * SEGMENT_BUCKETS, 1024):
+        _fill(store, "flow", range(first, first + 1024))
+    store.close()
+    names = sorted(os.path.basename(p) for p in glob.glob(str(tmp_path / "flow" / "*.seg")))
+    assert names == ["1-1.seg", "1-2.seg"]
+
+
+def test_channel_names_stay_under_the_root(tmp_path):
+    root = tmp_path / "inner"
+    store = SeriesStore(LEVELS, directory=str(root))
+    for name in ("..", ".", "a/b", ".hidden"):
+        store.append(name, 0, 1.0)
+    with pytest.raises(ValueError):
+        store.append("", 0, 1.0)
+    store.close()
+    assert sorted(os.listdir(tmp_path)) == ["inner"]
+    assert SeriesStore(LEVELS, directory=str(root)).channels() == [".", "..", ".hidden", "a/b"]
+
+
+def test_http_range_needs_start_and_end(monkeypatch):
+    store = SeriesStore(LEVELS)
+    _fill(store, "flow", np.arange(100))
+    monkeypatch.setattr(app, "series_store", store)
+    client = app.app.test_client()
+    assert client.get("/timeseries/flow").status_code == 400
+    assert client.get("/timeseries/flow?start=0&end=x").status_code == 400
+    assert client.get("/timeseries/flow?start=0&end=100&step=x").status_code == 400
+    assert client.get("/timeseries/other?start=0&end=100").status_code == 404
+    result = client.get("/timeseries/flow?start=0&end=100&step=10").get_json()
+    assert result["count"] == [10] * 10
@@ -0,0 +1,353 @@
+import calendar
+import glob
+import os
+import threading
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+# =============================================================================
+# Fixed-memory time-series store with multi-resolution rollups
+# =============================================================================
+# Every channel keeps one ring buffer per resolution level (1 s, 1 min, 1 h by
+# default). A ring slot holds the count, sum, min and max of one time bucket,
+# so memory per channel is fixed by the level capacities and every sample
+# updates each level in O(1). Range totals are assembled from the coarsest
+# buckets that fit the range, so a month costs ~700 hourly buckets, not
+# 2.6 million raw samples.
+#
+# On disk (optional), each level appends records for buckets as they close
+# to <dir>/<channel>/<step>-<segment>.seg. A sample that lands in an already
+# written bucket is appended as a delta record; replaying a level merges all
+# of its records. Segment files older than a level's retention are deleted.
+
+# (step seconds, buckets kept): 6 hours of 1 s, 7 days of 1 min, 2 years of 1 h
+DEFAULT_LEVELS = ((1, 21600), (60, 10080), (3600, 17568))
+SEGMENT_BUCKETS = 4096
+
+RECORD = np.dtype([("bucket", "<i8"), ("count", "<u4"), ("sum", "<f8"),
+                   ("min", "<f8"), ("max", "<f8")])
+
+
+def parse_levels(spec):
+    """Parse "step:buckets,step:buckets,..." (e.g. "1:21600,60:10080,3600:17568")."""
+    if not spec:
+        return DEFAULT_LEVELS
+    levels = []
+    for part in spec.split(","):
+        step, capacity = part.split(":")
+        levels.append((int(step), int(capacity)))
+    return tuple(levels)
+
+
+def _combine(records):
+    # Merge records that share a bucket; the result is sorted by bucket
+    records = records[np.argsort(records["bucket"], kind="stable")]
+    buckets, start = np.unique(records["bucket"], return_index=True)
+    out = np.empty(len(buckets), RECORD)
+    out["bucket"] = buckets
+    out["count"] = np.add.reduceat(records["count"], start)
+    out["sum"] = np.add.reduceat(records["sum"], start)
+    out["min"] = np.minimum.reduceat(records["min"], start)
+    out["max"] = np.maximum.reduceat(records["max"], start)
+    return out
+
+
+def _summary(records):
+    count = int(records["count"].sum())
+    total = float(records["sum"].sum())
+    return {
+        "count": count,
+        "sum": total,
+        "min": float(records["min"].min()) if count else None,
+        "max": float(records["max"].max()) if count else None,
+        "mean": total / count if count else None,
+    }
+
+
+class _Level:
+    def __init__(self, step, capacity):
+        self.step = step
+        self.capacity = capacity
+        self.bucket = np.full(capacity, -1, dtype=np.int64)
+        self.count = np.zeros(capacity, dtype=np.uint32)
+        self.sum = np.zeros(capacity)
+        self.min = np.full(capacity, np.inf)
+        self.max = np.full(capacity, -np.inf)
+        self.newest = None
+        # Buckets at or after open_from have not been written to disk yet
+        self.open_from = None
+
+    def oldest(self):
+        return None if self.newest is None else self.newest - self.capacity + 1
+
+    def fold(self, records):
+        """Merge combined records; return the records that should be persisted."""
+        prev = self.newest
+        newest = int(records["bucket"][-1]) if prev is None else max(prev, int(records["bucket"][-1]))
+        records = records[records["bucket"] > newest - self.capacity]
+        b = records["bucket"]
+        slots = b % self.capacity
+        # A slot holding an older bucket is recycled (that bucket fell out of
+        # retention); within retention no two buckets share a slot
+        stale = self.bucket[slots] != b
+        s = slots[stale]
+        self.bucket[s] = b[stale]
+        self.count[s] = 0
+        self.sum[s] = 0.0
+        self.min[s] = np.inf
+        self.max[s] = -np.inf
+        self.count[slots] += records["count"]
+        self.sum[slots] += records["sum"]
+        self.min[slots] = np.minimum(self.min[slots], records["min"])
+        self.max[slots] = np.maximum(self.max[slots], records["max"])
+        self.newest = newest
+
+        open_from = int(b[0]) if self.open_from is None else self.open_from
+        delta = records[b < open_from]
+        closing = b[(b >= open_from) & (b < newest)]
+        if prev is not None and open_from <= prev < newest and prev >= self.oldest():
+            closing = np.union1d(closing, [prev])
+        self.open_from = max(open_from, newest)
+        return np.concatenate([delta, self.records(closing)])
+
+    def seal(self):
+        # Everything held so far is on disk; later samples are written as deltas
+        if self.newest is not None:
+            self.open_from = self.newest + 1
+
+    def records(self, buckets):
+        buckets = np.asarray(buckets, dtype=np.int64)
+        slots = buckets % self.capacity
+        valid = self.bucket[slots] == buckets
+        slots = slots[valid]
+        out = np.empty(len(slots), RECORD)
+        out["bucket"] = buckets[valid]
+        out["count"] = self.count[slots]
+        out["sum"] = self.sum[slots]
+        out["min"] = self.min[slots]
+        out["max"] = self.max[slots]
+        return out
+
+    def window(self, first, last):
+        # Records for buckets first..last (inclusive) still held
+        if self.newest is None:
+            return np.empty(0, RECORD)
+        first = max(first, self.oldest())
+        last = min(last, self.newest)
+        if last < first:
+            return np.empty(0, RECORD)
+        return self.records(np.arange(first, last + 1))
+
+
+class SeriesStore:
+    """Per-channel ring buffers with 1 s / 1 min / 1 h style rollups.
+
+    levels is a sequence of (step seconds, buckets kept), finest first, where
+    each step divides the next. With a directory, closed buckets are appended
+    to segment files there and reloaded on start; the still-open bucket of
+    each level is written by close().
+    """
+
+    def __init__(self, levels=DEFAULT_LEVELS, directory=None):
+        self.levels = tuple(sorted(levels))
+        for (fine, _), (coarse, _) in zip(self.levels, self.levels[1:]):
+            if coarse % fine:
+                raise ValueError(f"Rollup step {coarse} s is not a multiple of {fine} s")
+        self.directory = directory
+        self._channels = {}
+        self._files = {}
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+
+    def _channel(self, name):
+        channel = self._channels.get(name)
+        if channel is None:
+            channel = self._channels[name] = [_Level(step, capacity) for step, capacity in self.levels]
+        return channel
+
+    def channels(self):
+        with self._lock:
+            return sorted(self._channels)
+
+    def append(self, channel, ts, value):
+        self.append_many([(channel, ts, value)])
+
+    def append_many(self, samples):
+        """Add (channel, ts, value) samples; ts is in Unix seconds."""
+        by_channel = {}
+        for channel, ts, value in samples:
+            by_channel.setdefault(channel, []).append((ts, value))
+        if self.directory:
+            for name in by_channel:
+                self._path(name, 0, 0)  # raises before any state changes for a name outside the root
+        with self._lock:
+            for name, points in by_channel.items():
+                ts, values = np.asarray(points, dtype=float).T
+                records = np.empty(len(ts), RECORD)
+                records["bucket"] = np.floor(ts / self.levels[0][0]).astype(np.int64)
+                records["count"] = 1
+                records["sum"] = records["min"] = records["max"] = values
+                self._fold(name, records)
+            self._flush()
+
+    def _fold(self, name, records, persist=True):
+        # Caller holds the lock. Each level's records are rolled up from the
+        # level below rather than from the raw samples.
+        previous_step = self.levels[0][0]
+        for level in self._channel(name):
+            if level.step != previous_step:
+                records = records.copy()
+                records["bucket"] //= level.step // previous_step
+            records = _combine(records)
+            previous_step = level.step
+            closed = level.fold(records)
+            if persist and self.directory and len(closed):
+                self._write(name, level, closed)
+
+    def query(self, channel, start, end, step=None, max_points=1000):
+        """Buckets covering [start, end) at one resolution.
+
+        Without step, the finest level that still holds start and needs at
+        most max_points buckets is used (the coarsest one otherwise).
+        """
+        with self._lock:
+            levels = self._channels.get(channel)
+            if levels is None:
+                raise KeyError(channel)
+            if step is not None:
+                matching = [lv for lv in levels if lv.step == step]
+                if not matching:
+                    raise ValueError(f"No {step} s rollup (have {[lv.step for lv in levels]})")
+                level = matching[0]
+            else:
+                level = levels[-1]
+                for lv in levels:
+                    held = lv.newest is not None and start // lv.step >= lv.oldest()
+                    if held and (end - start) / lv.step <= max_points:
+                        level = lv
+                        break
+            records = level.window(int(start // level.step), int(-(-end // level.step)) - 1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = records["sum"] / records["count"]
+        return {
+            "step": level.step,
+            "ts": records["bucket"] * level.step,
+            "count": records["count"],
+            "sum": records["sum"],
+            "min": records["min"],
+            "max": records["max"],
+            "mean": mean,
+        }
+
+    def aggregate(self, channel, start, end):
+        """Count, sum, min, max and mean over [start, end).
+
+        The range is split into the coarsest whole buckets that fit, with the
+        ragged edges filled from finer levels; where no finer level still
+        holds an edge, the overlapping coarse bucket is used whole.
+        """
+        with self._lock:
+            levels = self._channels.get(channel)
+            if levels is None:
+                raise KeyError(channel)
+            parts = []
+            self._collect(levels, len(levels) - 1, start, end, parts)
+        return _summary(np.concatenate(parts) if parts else np.empty(0, RECORD))
+
+    def _collect(self, levels, i, lo, hi, parts):
+        if hi <= lo:
+            return
+        level = levels[i]
+        step = level.step
+        finer = levels[i - 1] if i > 0 else None
+        finer_holds = (finer is not None and finer.newest is not None
+                       and lo // finer.step >= finer.oldest())
+        if not finer_holds:
+            parts.append(level.window(int(lo // step), int(-(-hi // step)) - 1))
+            return
+        a = -(-lo // step) * step
+        b = hi // step * step
+        if a < b:
+            parts.append(level.window(int(a // step), int(b // step) - 1))
+            self._collect(levels, i - 1, lo, a, parts)
+            self._collect(levels, i - 1, b, hi, parts)
+        else:
+            self._collect(levels, i - 1, lo, hi, parts)
+
+    def monthly(self, channel, year):
+        """Aggregates for each calendar month (UTC) of year."""
+        bounds = [calendar.timegm((year, month, 1, 0, 0, 0)) for month in range(1, 13)]
+        bounds.append(calendar.timegm((year + 1, 1, 1, 0, 0, 0)))
+        return [self.aggregate(channel, lo, hi) for lo, hi in zip(bounds, bounds[1:])]
+
+    # ---- persistence ------------------------------------------------------
+
+    def _path(self, name, step, segment):
+        # quote() leaves "." alone: "." and ".." would name the root or its
+        # parent, and glob("*") in _load skips other dot-leading names
+        encoded = quote(name, safe="")
+        if encoded.startswith("."):
+            encoded = "%2E" + encoded[1:]
+        root = os.path.realpath(self.directory)
+        channel_dir = os.path.realpath(os.path.join(root, encoded))
+        if not encoded or os.path.dirname(channel_dir) != root:
+            raise ValueError(f"Channel name {name!r} does not map to a directory under {self.directory}")
+        return os.path.join(channel_dir, f"{step}-{segment}.seg")
+
+    def _write(self, name, level, records):
+        # Caller holds the lock
+        segments = records["bucket"] // SEGMENT_BUCKETS
+        for segment in np.unique(segments):
+            key = (name, level.step)
+            current = self._files.get(key)
+            if current is None or current[0] != segment:
+                if current is not None:
+                    current[1].close()
+                path = self._path(name, level.step, segment)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self._files[key] = current = (segment, open(path, "ab"))
+                self._prune(name, level)
+            current[1].write(records[segments == segment].tobytes())
+
+    def _flush(self):
+        for _, f in self._files.values():
+            f.flush()
+
+    def _prune(self, name, level):
+        oldest = level.oldest()
+        for path in glob.glob(self._path(name, level.step, "*")):
+            segment = int(os.path.basename(path).split("-", 1)[1].split(".")[0])
+            if (segment + 1) * SEGMENT_BUCKETS <= oldest:
+                os.remove(path)
+
+    def _load(self):
+        for channel_dir in sorted(glob.glob(os.path.join(self.directory, "*"))):
+            name = unquote(os.path.basename(channel_dir))
+            for level in self._channel(name):
+                paths = glob.glob(os.path.join(channel_dir, f"{level.step}-*.seg"))
+                chunks = []
+                for path in paths:
+                    with open(path, "rb") as f:
+                        raw = f.read()
+                    # A crash may leave a partial record at the end of a file
+                    chunks.append(np.frombuffer(raw[:len(raw) - len(raw) % RECORD.itemsize], RECORD))
+                records = np.concatenate(chunks) if chunks else np.empty(0, RECORD)
+                if len(records):
+                    level.fold(_combine(records))
+                    level.seal()
+
+    def close(self):
+        """Write every level's open bucket and close the segment files."""
+        with self._lock:
+            if self.directory:
+                for name, levels in self._channels.items():
+                    for level in levels:
+                        if level.newest is not None and level.open_from <= level.newest:
+                            self._write(name, level, level.records([level.newest]))
+                        level.seal()
+            for _, f in self._files.values():
+                f.close()
+            self._files.clear()
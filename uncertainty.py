@@ -0,0 +1,129 @@
+import time
+
+import numpy as np
+
+import config
+from model import CLIENT_FIELDS, MODEL_CONSTANTS
+from sweep import SWEEP_CONSTANTS, _solve_cells
+
+# =============================================================================
+# Monte Carlo uncertainty analysis of the monthly well model
+# =============================================================================
+# Uncertain inputs (client fields or one of SWEEP_CONSTANTS, e.g. alpha) are
+# sampled from simple distributions, and every block of draws is solved in
+# one vectorised closed-form call (the numpy engine), so 10^5 draws cost a
+# few seconds rather than 10^5 solver calls. Results are quantiles, means
+# and histograms of savings, cost, depth, energy and water.
+
+MC_OUTPUTS = ("savings", "total_cost", "depth", "energy", "net_water")
+QUANTILES = (0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95)
+
+
+def _sampler(name, spec):
+    """Return draw(rng, n) for a distribution spec.
+
+    Specs: {"dist": "normal", "mean", "sd"}, {"dist": "lognormal", "mean",
+    "sigma"} (mean and sigma of the underlying normal), {"dist": "uniform",
+    "low", "high"} or {"dist": "triangular", "low", "mode", "high"}, each
+    with optional "min" and "max" to clip samples to a physical range.
+    """
+    try:
+        dist = spec.get("dist", "normal")
+        if dist == "normal":
+            mean, sd = float(spec["mean"]), float(spec["sd"])
+            draw = lambda rng, n: rng.normal(mean, sd, n)
+        elif dist == "lognormal":
+            mean, sigma = float(spec["mean"]), float(spec["sigma"])
+            draw = lambda rng, n: rng.lognormal(mean, sigma, n)
+        elif dist == "uniform":
+            low, high = float(spec["low"]), float(spec["high"])
+            draw = lambda rng, n: rng.uniform(low, high, n)
+        elif dist == "triangular":
+            low, mode, high = float(spec["low"]), float(spec["mode"]), float(spec["high"])
+            draw = lambda rng, n: rng.triangular(low, mode, high, n)
+        else:
+            raise ValueError(f"unknown distribution '{dist}'")
+        lo, hi = spec.get("min"), spec.get("max")
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        raise ValueError(f"Invalid distribution for '{name}': {e}") from None
+    if lo is None and hi is None:
+        return draw
+    lo = -np.inf if lo is None else float(lo)
+    hi = np.inf if hi is None else float(hi)
+    return lambda rng, n: np.clip(draw(rng, n), lo, hi)
+
+
+def _summary(values, bins):
+    # values holds the feasible draws of one output
+    if not len(values):
+        return {"mean": None, "std": None, "min": None, "max": None, "quantiles": {}, "histogram": None}
+    counts, edges = np.histogram(values, bins=bins)
+    return {
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "quantiles": {f"p{round(q * 100)}": float(v) for q, v in zip(QUANTILES, np.quantile(values, QUANTILES))},
+        "histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+    }
+
+
+def iter_uncertainty(base, distributions, draws=100000, seed=None, bins=50, chunk_size=None):
+    """Evaluate draws in blocks, yielding progress after each and the result last.
+
+    base supplies every client field; distributions maps client fields or
+    SWEEP_CONSTANTS to distribution specs (see _sampler). Progress items are
+    {"type": "progress", "done", "total", "mean_savings", "p50_savings"};
+    the final item is {"type": "result", ...}.
+    """
+    started = time.perf_counter()
+    unknown = set(distributions) - set(CLIENT_FIELDS) - set(SWEEP_CONSTANTS)
+    if unknown:
+        raise ValueError(f"Cannot sample: {', '.join(sorted(unknown))}")
+    missing = [f for f in CLIENT_FIELDS if f not in distributions and f not in base]
+    if missing:
+        raise ValueError(f"Missing base values for: {', '.join(missing)}")
+    draws = int(draws)
+    if not 0 < draws <= config.MC_MAX_DRAWS:
+        raise ValueError(f"draws must be between 1 and {config.MC_MAX_DRAWS}")
+    samplers = {name: _sampler(name, spec) for name, spec in distributions.items()}
+    chunk_size = chunk_size or config.MC_CHUNK
+    rng = np.random.default_rng(seed)
+    constants = dict(MODEL_CONSTANTS)
+
+    outputs = {name: np.empty(draws) for name in MC_OUTPUTS}
+    feasible = np.zeros(draws, dtype=bool)
+    for lo in range(0, draws, chunk_size):
+        n = min(chunk_size, draws - lo)
+        columns = {field: np.full(n, float(base[field])) for field in CLIENT_FIELDS if field not in samplers}
+        columns.update({name: draw(rng, n) for name, draw in samplers.items()})
+        out = _solve_cells("numpy", columns, constants)
+        for name in MC_OUTPUTS:
+            outputs[name][lo:lo + n] = out[name]
+        feasible[lo:lo + n] = out["feasible"]
+        savings = outputs["savings"][:lo + n][feasible[:lo + n]]
+        yield {
+            "type": "progress",
+            "done": lo + n,
+            "total": draws,
+            "mean_savings": float(savings.mean()) if len(savings) else None,
+            "p50_savings": float(np.median(savings)) if len(savings) else None,
+        }
+
+    savings = outputs["savings"][feasible]
+    yield {
+        "type": "result",
+        "draws": draws,
+        "seed": seed,
+        "feasible_fraction": float(feasible.mean()),
+        "prob_positive_savings": float((savings > 0).mean()) if len(savings) else None,
+        "outputs": {name: _summary(outputs[name][feasible], bins) for name in MC_OUTPUTS},
+        "elapsed": time.perf_counter() - started,
+    }
+
+
+def run_uncertainty(base, distributions, draws=100000, seed=None, bins=50, chunk_size=None):
+    """Evaluate every draw and return the final summary."""
+    for item in iter_uncertainty(base, distributions, draws, seed, bins, chunk_size):
+        pass
+    return item